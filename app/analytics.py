@@ -0,0 +1,350 @@
+# app/analytics.py
+"""
+In-memory columnar analytics over feedback, for ad-hoc group-bys.
+
+The loader (app.store_loader, snapshot "analytics") keeps one compact NumPy
+column per feedback attribute, sorted by feedback id:
+
+    id int64, product_idx int32, user_id int32, rating int8, label int8,
+    month int16, text_length int32
+
+plus per-product dictionary-encoded country / city / province codes
+(int32 indexes into string dictionaries kept in the snapshot meta).
+A 50M-review table is ~1.2 GB of columns, shared by all workers via mmap.
+
+Group-bys turn each requested dimension into a small int code per row,
+fold them into one key with ravel_multi_index, and compute all metrics
+with three np.bincount passes (label and rating histograms per key, summed
+text length), no SQL involved.
+
+Refresh is incremental: new feedback (id > last loaded id) is appended,
+and after a scoring run only rows that were unscored get their label
+re-read (or every label with relabel=True, e.g. after --rescore).
+"""
+LABELS = [None, "positive", "neutral", "negative"]   # label code -> sentiment_label
+LABEL_CODES = {v: i for i, v in enumerate(LABELS)}
+
+# text_length bucket edges: [0,50) [50,100) ... [1600,inf)
+TEXT_LENGTH_EDGES = [50, 100, 200, 400, 800, 1600]
+TEXT_LENGTH_BUCKETS = ["<50", "50-99", "100-199", "200-399", "400-799", "800-1599", "1600+"]
+
+MAX_RATING = 5            # ratings are 0..MAX_RATING (importers drop anything else)
+MONTH_EPOCH = 1970 * 12   # month code = year * 12 + (month - 1) - MONTH_EPOCH
+
+LOAD_BATCH = 50_000
+IN_BATCH = 5_000
+MAX_DENSE_KEYS = 20_000_000  # above this many key combinations fall back to np.unique
+
+# per-feedback columns kept in the snapshot (product_idx is derived)
+COLUMNS = {"id": "int64", "user_id": "int32", "rating": "int8",
+           "label": "int8", "month": "int16", "text_length": "int32"}
+
+# dimensions accepted by group_by()
+DIMENSIONS = (
+    "country", "city", "province", "product_id", "user_id",
+    "rating", "label", "month", "year", "text_length_bucket",
+)
+
+
+def month_code(dt):
+    if dt is None:
+        return -1
+    return dt.year * 12 + dt.month - 1 - MONTH_EPOCH
+
+
+def month_label(code):
+    y, m = divmod(int(code) + MONTH_EPOCH, 12)
+    return f"{y:04d}-{m + 1:02d}"
+
+
+# =========================
+# BUILD (loader process)
+# =========================
+def _dictionary_encode(values, dictionary, index):
+    """Codes for `values`, extending `dictionary`/`index` with unseen strings (None -> -1)."""
+    import numpy as np
+
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is None:
+            codes[i] = -1
+            continue
+        code = index.get(v)
+        if code is None:
+            code = index[v] = len(dictionary)
+            dictionary.append(v)
+        codes[i] = code
+    return codes
+
+
+def build(db, previous=None, relabel=False):
+    """
+    (arrays, meta) for the "analytics" snapshot.
+
+    With a previous snapshot, only feedback newer than it is read; labels are
+    re-read for previously unscored rows, or for every row if `relabel`.
+    """
+    import numpy as np
+    from .models import Feedback, Product
+
+    # ---- products: small, always rebuilt (dictionaries are append-only so
+    # codes stay stable across refreshes)
+    meta_prev = previous.meta if previous is not None else {}
+    dicts = {k: list(meta_prev.get("dictionaries", {}).get(k, [])) for k in ("country", "city", "province")}
+    prods = db.query(Product.id, Product.country, Product.city, Product.province).order_by(Product.id).all()
+    arrays = {"product_ids": np.array([p.id for p in prods], dtype=np.int64)}
+    for k in dicts:
+        index = {v: i for i, v in enumerate(dicts[k])}
+        arrays[f"product_{k}"] = _dictionary_encode([getattr(p, k) for p in prods], dicts[k], index)
+
+    # ---- feedback columns: previous snapshot + rows after its last id
+    old_n = len(previous["id"]) if previous is not None else 0
+    last_id = int(previous["id"][-1]) if old_n else 0
+
+    parts = {c: [] for c in COLUMNS}
+    new_pids = []
+    while True:
+        rows = (
+            db.query(Feedback.id, Feedback.product_id, Feedback.user_id, Feedback.rating,
+                     Feedback.sentiment_label, Feedback.review_date, Feedback.text_length)
+            .filter(Feedback.id > last_id)
+            .order_by(Feedback.id)
+            .limit(LOAD_BATCH)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        parts["id"].append(np.array([r.id for r in rows], dtype=np.int64))
+        parts["user_id"].append(np.array([r.user_id if r.user_id is not None else -1 for r in rows], dtype=np.int32))
+        # out-of-range ratings (older imports) count as "no rating"; group_by relies on 0..MAX_RATING
+        parts["rating"].append(np.array([r.rating if r.rating is not None and 0 <= r.rating <= MAX_RATING else -1
+                                         for r in rows], dtype=np.int8))
+        parts["label"].append(np.array([LABEL_CODES.get(r.sentiment_label, 0) for r in rows], dtype=np.int8))
+        parts["month"].append(np.array([month_code(r.review_date) for r in rows], dtype=np.int16))
+        parts["text_length"].append(np.array([r.text_length or 0 for r in rows], dtype=np.int32))
+        new_pids.append(np.array([r.product_id for r in rows], dtype=np.int64))
+
+    for c, dtype in COLUMNS.items():
+        chunks = ([np.asarray(previous[c])] if old_n else []) + parts[c]
+        # concatenate copies, so the label column below is writable
+        arrays[c] = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+    new_rows = len(arrays["id"]) - old_n
+
+    # product position per row, re-derived since new products may shift positions
+    pids = [np.asarray(previous["product_ids"])[previous["product_idx"]]] if old_n else []
+    pids = np.concatenate(pids + new_pids) if pids or new_pids else np.empty(0, dtype=np.int64)
+    arrays["product_idx"] = np.searchsorted(arrays["product_ids"], pids).astype(np.int32)
+
+    # ---- labels changed by scoring since the previous snapshot
+    relabeled = 0
+    label = arrays["label"]
+    if relabel and old_n:
+        # every old row: walk id ranges
+        for start in range(0, old_n, LOAD_BATCH):
+            ids = arrays["id"][start:start + LOAD_BATCH]
+            got = dict(
+                db.query(Feedback.id, Feedback.sentiment_label)
+                .filter(Feedback.id.between(int(ids[0]), int(ids[-1])))
+                .all()
+            )
+            label[start:start + len(ids)] = [LABEL_CODES.get(got.get(int(i)), 0) for i in ids]
+        relabeled = old_n
+    elif old_n:
+        # only rows that were unscored: what a plain scoring run touches
+        todo = np.flatnonzero(label[:old_n] == 0)
+        for start in range(0, len(todo), IN_BATCH):
+            pos = todo[start:start + IN_BATCH]
+            ids = arrays["id"][pos]
+            got = dict(
+                db.query(Feedback.id, Feedback.sentiment_label)
+                .filter(Feedback.id.in_(ids.tolist()))
+                .all()
+            )
+            label[pos] = [LABEL_CODES.get(got.get(int(i)), 0) for i in ids]
+        relabeled = len(todo)
+
+    meta = {
+        "rows": int(len(arrays["id"])),
+        "appended": new_rows,
+        "relabeled": relabeled,
+        "dictionaries": dicts,
+    }
+    return arrays, meta
+
+
+# =========================
+# QUERY (API workers)
+# =========================
+def _index_of(values):
+    """value-as-string -> code lookup over a sequence of code values."""
+    index = {str(v): i for i, v in enumerate(values)}
+    return index.get
+
+
+def _int_code(value, lo, size):
+    try:
+        code = int(value) - lo
+    except (TypeError, ValueError):
+        return None
+    return code if 0 <= code < size else None
+
+
+def _dimension_codes(snap, dim):
+    """
+    (codes per row, number of codes, code -> value, value-as-string -> code
+    or None) for one dimension; -1 = missing.
+    """
+    import numpy as np
+
+    if dim in ("country", "city", "province"):
+        dictionary = snap.meta["dictionaries"][dim]
+        codes = np.asarray(snap[f"product_{dim}"])[snap["product_idx"]]
+        return codes, len(dictionary), lambda c: dictionary[c], _index_of(dictionary)
+    if dim in ("product_id", "user_id"):
+        if dim == "product_id":
+            ids = np.asarray(snap["product_ids"])
+            codes = np.asarray(snap["product_idx"])
+        else:
+            # compact to the users actually present
+            ids, codes = np.unique(snap["user_id"], return_inverse=True)
+            codes = codes.astype(np.int64)
+            if len(ids) and ids[0] == -1:
+                codes -= 1   # -1 stays "missing"
+                ids = ids[1:]
+
+        def encode(value):   # ids are sorted
+            try:
+                v = int(value)
+            except (TypeError, ValueError):
+                return None
+            c = int(np.searchsorted(ids, v))
+            return c if c < len(ids) and ids[c] == v else None
+        return codes, len(ids), lambda c: int(ids[c]), encode
+    if dim == "rating":
+        # the loader keeps ratings in 0..MAX_RATING, -1 = none
+        return (np.asarray(snap["rating"]).astype(np.int64), MAX_RATING + 1, int,
+                lambda v: _int_code(v, 0, MAX_RATING + 1))
+    if dim == "label":
+        names = [name or "unscored" for name in LABELS]
+        return (np.asarray(snap["label"]).astype(np.int64), len(LABELS), lambda c: names[c],
+                _index_of(names))
+    if dim == "month":
+        m = np.asarray(snap["month"]).astype(np.int64)
+        lo = int(m[m >= 0].min()) if (m >= 0).any() else 0
+        hi = int(m.max()) if len(m) else 0
+        size = max(0, hi - lo + 1)
+
+        def encode(value):   # "YYYY-MM"
+            y, _, mo = str(value).partition("-")
+            try:
+                code = int(y) * 12 + int(mo) - 1 - MONTH_EPOCH
+            except ValueError:
+                return None
+            return _int_code(code, lo, size) if 1 <= int(mo) <= 12 else None
+        return np.where(m >= 0, m - lo, -1), size, lambda c: month_label(c + lo), encode
+    if dim == "year":
+        m = np.asarray(snap["month"]).astype(np.int64)
+        years = np.where(m >= 0, (m + MONTH_EPOCH) // 12, -1)
+        lo = int(years[years >= 0].min()) if (years >= 0).any() else 0
+        hi = int(years.max()) if len(years) else 0
+        size = max(0, hi - lo + 1)
+        return (np.where(years >= 0, years - lo, -1), size, lambda c: c + lo,
+                lambda v: _int_code(v, lo, size))
+    if dim == "text_length_bucket":
+        codes = np.searchsorted(TEXT_LENGTH_EDGES, snap["text_length"], side="right")
+        return codes, len(TEXT_LENGTH_BUCKETS), lambda c: TEXT_LENGTH_BUCKETS[c], _index_of(TEXT_LENGTH_BUCKETS)
+    raise ValueError(f"unknown dimension {dim!r}; choose from {', '.join(DIMENSIONS)}")
+
+
+def group_by(snap, dims, filters=None, min_count=1, limit=100, order="count"):
+    """
+    Counts and means per combination of `dims` over the analytics snapshot.
+
+    filters: {dimension: value-as-string} equality filters applied first.
+    order: "count" | "avg_rating" | "positive_pct" (descending).
+    """
+    import numpy as np
+
+    n = len(snap["id"])
+    mask = np.ones(n, dtype=bool)
+    for dim, value in (filters or {}).items():
+        codes, _, _, encode = _dimension_codes(snap, dim)
+        wanted = encode(str(value))
+        if wanted is None:
+            mask[:] = False
+        else:
+            mask &= codes == wanted
+
+    dim_codes, sizes, decoders = [], [], []
+    for dim in dims:
+        codes, size, decode, _ = _dimension_codes(snap, dim)
+        mask &= codes >= 0
+        dim_codes.append(codes)
+        sizes.append(max(size, 1))
+        decoders.append(decode)
+
+    # skip the copy when nothing was filtered out
+    def pick(col):
+        col = np.asarray(col)
+        return col if all_rows else col[mask]
+    all_rows = bool(mask.all())
+
+    if dims and np.prod(sizes, dtype=np.float64) <= MAX_DENSE_KEYS:
+        keys = np.ravel_multi_index([pick(c) for c in dim_codes], sizes)
+        n_keys = int(np.prod(sizes))
+        def decode_key(k):
+            return np.unravel_index(k, sizes)
+    elif dims:
+        stacked = np.stack([pick(c) for c in dim_codes], axis=1)
+        uniq, keys = np.unique(stacked, axis=0, return_inverse=True)
+        keys = keys.ravel()
+        n_keys = len(uniq)
+        def decode_key(k):
+            return uniq[k]
+    else:
+        keys = np.zeros(int(mask.sum()), dtype=np.int64)
+        n_keys = 1
+        def decode_key(k):
+            return ()
+
+    # small-cardinality columns become per-key histograms (integer bincount,
+    # one pass each) instead of one weighted pass per metric
+    label_hist = np.bincount(keys * len(LABELS) + pick(snap["label"]),
+                             minlength=n_keys * len(LABELS)).reshape(n_keys, len(LABELS))
+    width = MAX_RATING + 2   # column 0 = no rating
+    rating_hist = np.bincount(keys * width + (pick(snap["rating"]).astype(np.int64) + 1),
+                              minlength=n_keys * width).reshape(n_keys, width)
+    length_sum = np.bincount(keys, weights=pick(snap["text_length"]), minlength=n_keys)
+
+    count = label_hist.sum(axis=1)
+    rating_n = rating_hist[:, 1:].sum(axis=1)
+    rating_sum = rating_hist[:, 1:] @ np.arange(0, MAX_RATING + 1)
+    per_label = [label_hist[:, code] for code in (1, 2, 3)]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_rating = np.where(rating_n > 0, rating_sum / rating_n, np.nan)
+        avg_length = np.where(count > 0, length_sum / count, np.nan)
+        scored = per_label[0] + per_label[1] + per_label[2]
+        positive_pct = np.where(scored > 0, per_label[0] / scored * 100.0, 0.0)
+
+    order_by = {"count": count, "avg_rating": np.nan_to_num(avg_rating, nan=-1.0), "positive_pct": positive_pct}
+    if order not in order_by:
+        raise ValueError(f"order must be one of {', '.join(order_by)}")
+    candidates = np.flatnonzero(count >= max(min_count, 1))
+    top = candidates[np.argsort(-order_by[order][candidates], kind="stable")][:limit]
+
+    out = []
+    for k in top:
+        row = {dim: decoders[i](int(c)) for i, (dim, c) in enumerate(zip(dims, decode_key(k)))}
+        row.update({
+            "count": int(count[k]),
+            "avg_rating": None if np.isnan(avg_rating[k]) else round(float(avg_rating[k]), 4),
+            "avg_text_length": round(float(avg_length[k]), 2),
+            "positive": int(per_label[0][k]),
+            "neutral": int(per_label[1][k]),
+            "negative": int(per_label[2][k]),
+            "positive_pct": round(float(positive_pct[k]), 4),
+        })
+        out.append(row)
+    return out
@@ -0,0 +1,169 @@
+# app/aspects.py
+"""
+Aspect-level sentiment: what reviews say about the room, staff, location,
+cleanliness and price of a hotel.
+
+For one review text, analyze():
+
+1. splits it into sentences with the tokenizer TextBlob itself uses
+2. scans each sentence once with MATCHER: all aspect keyword dictionaries
+   compiled into ONE regex with a named group per aspect (longest keywords
+   first, word-bounded), whatever the number of keywords
+3. scores only the sentences that matched. An aspect's label for the
+   review comes from the mean polarity of its sentences, with the
+   thresholds of analyze_sentiment.
+
+The review label comes out of the same pass, so the scorer
+(app.sentiment_analyzer) gets label and aspects from one call. That call
+is cheaper than the TextBlob call it replaces, which keeps the batch job
+at least at its old throughput. One feedback_aspects row is stored per
+(review, aspect); RollupDelta keeps product_aspects up to date from those
+rows, and /sentiment/product/{id}/aspects serves it. Changing ASPECTS or the rules
+here means bumping ASPECT_VERSION, which is part of SCORER_VERSION, so
+`score --rescore` re-extracts.
+"""
+import re
+from itertools import chain
+
+from sqlalchemy import insert
+
+from .models import FeedbackAspect
+
+ASPECT_VERSION = "aspects-1"
+
+ASPECTS = {
+    "room": [
+        "room", "rooms", "bed", "beds", "bedroom", "suite", "suites", "bathroom", "shower",
+        "pillow", "pillows", "mattress", "towels", "air conditioning", "ac unit", "view",
+        "balcony", "tv", "noise", "noisy", "quiet",
+    ],
+    "staff": [
+        "staff", "employee", "employees", "front desk", "reception", "receptionist",
+        "manager", "housekeeping", "housekeeper", "concierge", "service", "customer service",
+        "valet", "bellman", "check-in", "check in", "check-out", "checkout",
+    ],
+    "location": [
+        "location", "located", "neighborhood", "neighbourhood", "area", "downtown",
+        "walking distance", "close to", "near", "nearby", "convenient", "airport",
+        "beach", "parking", "access",
+    ],
+    "cleanliness": [
+        "clean", "cleaned", "cleaning", "cleanliness", "dirty", "filthy", "spotless",
+        "stain", "stains", "stained", "smell", "smelled", "smells", "odor", "dust", "dusty",
+        "mold", "mould", "bugs", "bed bugs", "hair", "tidy",
+    ],
+    "price": [
+        "price", "prices", "priced", "value", "cost", "costs", "expensive", "cheap",
+        "affordable", "overpriced", "rate", "rates", "fee", "fees", "money", "worth", "deal",
+        "budget",
+    ],
+}
+
+
+def _compile(aspects):
+    groups = []
+    for name, words in aspects.items():
+        alternatives = sorted({re.escape(w.lower()) for w in words}, key=len, reverse=True)
+        groups.append(f"(?P<{name}>{'|'.join(alternatives)})")
+    # \b on both sides: "rate" must not match "separate", "ac" not "place"
+    return re.compile(r"\b(?:" + "|".join(groups) + r")\b")
+
+
+MATCHER = _compile(ASPECTS)   # applied to lowercased text
+
+
+def matched_aspects(sentence):
+    """Aspects mentioned in one (lowercased) sentence."""
+    return {m.lastgroup for m in MATCHER.finditer(sentence)}
+
+
+def label_for(polarity):
+    """Same thresholds as sentiment_analyzer.analyze_sentiment."""
+    if polarity > 0.1:
+        return "positive"
+    if polarity < -0.1:
+        return "negative"
+    return "neutral"
+
+
+def _pattern():
+    # imported on first use: TextBlob pulls in NLTK (~0.5s)
+    from textblob.en import sentiment
+    return sentiment
+
+
+def _mean_polarity(assessments):
+    # pattern's avg(): unweighted mean of the assessment polarities, 0 without any
+    return sum(a[1] for a in assessments) / float(len(assessments) or 1)
+
+
+def analyze(text):
+    """
+    (review label, {aspect: label}) for one review.
+
+    TextBlob(text).sentiment runs pattern's tokenizer (which also splits
+    sentences) and then assessments() over all the words. This does the
+    same steps directly, so the review label is the one
+    analyze_sentiment() gives, without building a TextBlob, and the
+    sentence split comes for free. Only the sentences that mention an
+    aspect get a second assessments() pass (a dictionary walk, no
+    re-tokenizing).
+    """
+    if not text or not text.strip():
+        return "neutral", {}
+    sentiment = _pattern()
+    sentences = sentiment.tokenizer(text)
+    words = [[(w.lower(), None) for w in s.split()] for s in sentences]
+    label = label_for(_mean_polarity(sentiment.assessments(chain.from_iterable(words))))
+
+    by_aspect = {}
+    for s, ws in zip(sentences, words):
+        hit = matched_aspects(s.lower())
+        if not hit:
+            continue
+        p = _mean_polarity(sentiment.assessments(ws))
+        for aspect in hit:
+            by_aspect.setdefault(aspect, []).append(p)
+    return label, {a: label_for(sum(ps) / len(ps)) for a, ps in by_aspect.items()}
+
+
+# =========================
+# STORAGE (feedback_aspects)
+# =========================
+IN_BATCH = 5000
+
+
+def load(db, feedback_ids):
+    """{feedback_id: {aspect: label}} for the given reviews (no key when none was mentioned)."""
+    out = {}
+    ids = list(feedback_ids)
+    for start in range(0, len(ids), IN_BATCH):
+        for fid, aspect, label in (
+            db.query(FeedbackAspect.feedback_id, FeedbackAspect.aspect, FeedbackAspect.label)
+            .filter(FeedbackAspect.feedback_id.in_(ids[start:start + IN_BATCH]))
+        ):
+            out.setdefault(fid, {})[aspect] = label
+    return out
+
+
+def store(db, by_feedback, replace=False):
+    """
+    Write {feedback_id: {aspect: label}}. replace=True first removes the
+    rows these reviews had (rescoring).
+    """
+    if replace:
+        delete(db, list(by_feedback))
+    rows = [
+        {"feedback_id": fid, "aspect": aspect, "label": label}
+        for fid, found in by_feedback.items() for aspect, label in found.items()
+    ]
+    for start in range(0, len(rows), IN_BATCH):
+        db.execute(insert(FeedbackAspect), rows[start:start + IN_BATCH])
+
+
+def delete(db, feedback_ids):
+    ids = list(feedback_ids)
+    for start in range(0, len(ids), IN_BATCH):
+        db.query(FeedbackAspect).filter(
+            FeedbackAspect.feedback_id.in_(ids[start:start + IN_BATCH])
+        ).delete(synchronize_session=False)
@@ -0,0 +1,510 @@
+# app/cli.py
+"""
+Command line entry point for the batch jobs.
+
+    python -m app.cli --help
+    python -m app.cli import all --source data/7282_1.csv --score --workers 4
+    python -m app.cli score --rescore --max-rate 200
+    python -m app.cli bench run --rows 1000000
+    python -m app.cli partition archive --before 2015
+
+Heavy modules (pandas, TextBlob, the app's DB layer) are only imported
+inside the command that needs them, so `--help` and small commands start
+instantly. --database-url (or $DATABASE_URL) is applied before anything
+touches app.database.
+"""
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+
+from app.instrumentation import PROFILE_MODES   # light: no DB layer, pandas or TextBlob
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SOURCE = os.getenv("SOURCE_CSV", str(BASE_DIR / "data" / "7282_1.csv"))
+
+
+# =========================
+# SHARED OPTIONS
+# =========================
+source_option = click.option(
+    "--source", "source", type=click.Path(exists=True, dir_okay=False),
+    default=DEFAULT_SOURCE, show_default=True, help="Datafiniti CSV to read.",
+)
+chunk_size_option = click.option(
+    "--chunk-size", type=click.IntRange(1), default=1000, show_default=True,
+    help="Rows per read/write batch (one transaction each).",
+)
+batch_size_option = click.option(
+    "--batch-size", type=click.IntRange(1), default=500, show_default=True,
+    help="Feedback rows per scoring batch (one transaction each).",
+)
+workers_option = click.option(
+    "--workers", type=click.IntRange(1), default=1, show_default=True,
+    help="Scorer processes.",
+)
+profile_option = click.option(
+    "--profile", type=click.Choice(PROFILE_MODES), default=None,
+    help="Write a cProfile/tracemalloc snapshot of the run.",
+)
+
+
+@click.group()
+@click.option("--database-url", envvar="DATABASE_URL", default=None,
+              help="SQLAlchemy URL (default: $DATABASE_URL / .env).")
+@click.option("--dry-run", is_flag=True, help="Do all the work but roll back instead of committing.")
+@click.option("--refresh-store/--no-refresh-store", default=True, show_default=True,
+              help="Republish the shared-memory snapshots after import/score jobs.")
+@click.pass_context
+def cli(ctx, database_url, dry_run, refresh_store):
+    """Sentiment System batch jobs."""
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    ctx.obj = {"dry_run": dry_run, "refresh_store": refresh_store}
+
+
+def _refresh_store(obj, relabel=False):
+    # API workers pick the new generation up (analytics always, the rest
+    # when serving with USE_SHARED_STORE=1)
+    if obj["refresh_store"] and not obj["dry_run"]:
+        from app import store_loader
+        store_loader.refresh(relabel=relabel)
+
+
+@contextmanager
+def _job_lock(kind, **params):
+    # same lock as queued jobs of this kind (app.jobs), so a CLI run and a
+    # worker never write feedback at the same time
+    from app import jobs
+    try:
+        with jobs.cli_job(kind, dict(params, cli=True)):
+            yield
+    except jobs.JobLocked as e:
+        raise click.ClickException(str(e))
+
+
+# =========================
+# IMPORT
+# =========================
+@cli.group("import")
+def import_group():
+    """Load the CSV into products / users / feedback."""
+
+
+@import_group.command("all")
+@source_option
+@chunk_size_option
+@workers_option
+@profile_option
+@click.option("--score", is_flag=True, help="Label sentiment during import (skips the later scoring pass).")
+@click.option("--dedup", type=click.Choice(("link", "skip", "off")), default=None,
+              help="Near-duplicate reviews: link to the original, skip, or off (default: $DEDUP_POLICY or link).")
+@click.pass_obj
+def import_all_cmd(obj, source, chunk_size, workers, profile, score, dedup):
+    """Products, users and feedback in one pass (app.import_all)."""
+    from app import import_all
+    with _job_lock("import", source=source, chunk_size=chunk_size, score=score, workers=workers,
+                   dry_run=obj["dry_run"], dedup=dedup):
+        import_all.main(
+            csv_path=source, chunk_size=chunk_size, score=score, workers=workers,
+            profile=profile, dry_run=obj["dry_run"], dedup=dedup,
+        )
+        _refresh_store(obj)
+
+
+@import_group.command("products")
+@source_option
+@chunk_size_option
+@click.pass_obj
+def import_products_cmd(obj, source, chunk_size):
+    """Products only (app.import_products)."""
+    from app import import_products
+    with _job_lock("import", source=source, chunk_size=chunk_size, dry_run=obj["dry_run"], only="products"):
+        import_products.main(csv_path=source, chunk_size=chunk_size, dry_run=obj["dry_run"])
+        _refresh_store(obj)
+
+
+@import_group.command("feedback")
+@source_option
+@chunk_size_option
+@click.pass_obj
+def import_feedback_cmd(obj, source, chunk_size):
+    """Users and feedback for already imported products (app.import_feedback)."""
+    from app import import_feedback
+    with _job_lock("import", source=source, chunk_size=chunk_size, dry_run=obj["dry_run"], only="feedback"):
+        import_feedback.main(csv_path=source, chunk_size=chunk_size, dry_run=obj["dry_run"])
+        _refresh_store(obj)
+
+
+# =========================
+# SCORING
+# =========================
+@cli.command("score")
+@batch_size_option
+@workers_option
+@profile_option
+@click.option("--rescore", is_flag=True, help="Rescore rows with a missing/outdated scorer version.")
+@click.option("--verify-text", is_flag=True, help="With --rescore, also sweep all rows for text changes.")
+@click.option("--max-rate", type=float, default=None, help="With --rescore, max rows per second.")
+@click.pass_obj
+def score_cmd(obj, batch_size, workers, profile, rescore, verify_text, max_rate):
+    """Label feedback sentiment (app.sentiment_analyzer)."""
+    from app import sentiment_analyzer
+    with _job_lock("score", rescore=rescore, verify_text=verify_text, max_rate=max_rate,
+                   batch_size=batch_size, workers=workers, dry_run=obj["dry_run"]):
+        if rescore:
+            sentiment_analyzer.rescore(
+                batch_size=batch_size, max_rows_per_sec=max_rate, verify_text=verify_text,
+                profile=profile, workers=workers, dry_run=obj["dry_run"],
+            )
+        else:
+            sentiment_analyzer.main(
+                profile=profile, workers=workers, batch_size=batch_size, dry_run=obj["dry_run"],
+            )
+        _refresh_store(obj, relabel=rescore)
+
+
+# =========================
+# GEO
+# =========================
+@cli.group("geo")
+def geo_group():
+    """Product geohash index (app.geo)."""
+
+
+@geo_group.command("backfill")
+@chunk_size_option
+def geo_backfill_cmd(chunk_size):
+    """Fill Product.geohash for rows imported before the column existed."""
+    from app.database import SessionLocal
+    from app.geo import backfill_geohash
+    db = SessionLocal()
+    try:
+        print(f"✅ Geohash set on {backfill_geohash(db, chunk_size)} products")
+    finally:
+        db.close()
+
+
+# =========================
+# ROLLUPS
+# =========================
+@cli.group("rollup")
+def rollup_group():
+    """Pre-aggregated sentiment tables (app.rollups)."""
+
+
+@rollup_group.command("rebuild")
+@click.argument("names", nargs=-1)
+@chunk_size_option
+def rollup_rebuild_cmd(names, chunk_size):
+    """Link categories for older products, then recompute rollups from scratch (default: all)."""
+    from app import rollups
+    unknown = set(names) - set(rollups.REBUILDERS)
+    if unknown:
+        raise click.BadParameter(f"unknown rollup(s): {', '.join(sorted(unknown))}")
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        archived = rollups.archived_years(db)
+        if archived:
+            print(f"⚠️  years {', '.join(map(str, archived))} are archived; rebuilt rollups other than "
+                  f"sentiment_monthly will not count them (see `partition restore`)")
+        print(f"✅ Categories linked for {rollups.link_missing_categories(db, chunk_size)} products")
+        for table, rows in rollups.rebuild(db, names or None).items():
+            print(f"✅ {table} rebuilt: {rows} rows")
+    finally:
+        db.close()
+
+
+# =========================
+# PARTITIONS / COLD STORAGE
+# =========================
+@cli.group("partition")
+def partition_group():
+    """review_date partitions and archived years of feedback (app.partitioning)."""
+
+
+@partition_group.command("mysql-ddl")
+@click.argument("first_year", type=int)
+@click.argument("last_year", type=int)
+@click.option("--execute", is_flag=True, help="Run the statements instead of printing them.")
+def partition_mysql_ddl_cmd(first_year, last_year, execute):
+    """Print (or run) the ALTERs that range-partition feedback by review year on MySQL."""
+    from sqlalchemy import text
+    from app import partitioning
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        if execute and db.get_bind().dialect.name != "mysql":
+            raise click.UsageError("--execute needs a MySQL database")
+        try:
+            statements = partitioning.mysql_partition_ddl(db, first_year, last_year)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        for statement in statements:
+            print(statement + ";")
+            if execute:
+                db.execute(text(statement))
+        if execute:
+            db.commit()
+            print(f"✅ feedback partitioned: {', '.join(partitioning.mysql_partitions(db))}")
+    finally:
+        db.close()
+
+
+@partition_group.command("add-year")
+@click.argument("year", type=int)
+def partition_add_year_cmd(year):
+    """Give YEAR its own partition (split off pmax)."""
+    from app import partitioning
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        if not partitioning.mysql_partitions(db):
+            raise click.UsageError("feedback is not partitioned (MySQL only)")
+        done = partitioning.mysql_add_year(db, year)
+        print(f"✅ p{year} added" if done else f"ℹ️  p{year} already exists")
+    finally:
+        db.close()
+
+
+@partition_group.command("archive")
+@click.option("--before", "before_year", type=int, required=True,
+              help="Archive every review year older than this one.")
+@click.option("--out-dir", type=click.Path(file_okay=False), default=None,
+              help="Where the .jsonl.gz files go (default: $FEEDBACK_ARCHIVE_DIR or var/archive).")
+@click.pass_obj
+def partition_archive_cmd(obj, before_year, out_dir):
+    """Move old review years to compressed files; rollups keep their counts."""
+    from app import partitioning
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        years = partitioning.archive_before(db, before_year, out_dir)
+        print(f"✅ archived: {', '.join(map(str, years)) or 'nothing'}")
+    finally:
+        db.close()
+    if years:
+        _refresh_store(obj)
+
+
+@partition_group.command("restore")
+@click.argument("year", type=int)
+@click.pass_obj
+def partition_restore_cmd(obj, year):
+    """Load an archived year back into feedback."""
+    from app import partitioning
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        try:
+            partitioning.restore_year(db, year)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+    finally:
+        db.close()
+    _refresh_store(obj)
+
+
+@partition_group.command("list")
+def partition_list_cmd():
+    """Partitions (MySQL) and archived years."""
+    from app import partitioning
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        names = partitioning.mysql_partitions(db)
+        print(f"partitions: {', '.join(names) if names else '(none)'}")
+        for a in partitioning.archives(db):
+            state = a.method if a.archived_at is not None else "IN PROGRESS"
+            print(f"{a.year}  {a.rows:>10} rows  {a.bytes or 0:>12} bytes  {state:<15} {a.path}")
+    finally:
+        db.close()
+
+
+# =========================
+# REVIEW TEXT STORAGE
+# =========================
+@cli.group("text")
+def text_group():
+    """Review title/text side table (app.textstore)."""
+
+
+@text_group.command("migrate")
+@chunk_size_option
+@click.option("--drop-columns", is_flag=True, help="Drop feedback.title/text once copied.")
+def text_migrate_cmd(chunk_size, drop_columns):
+    """Copy feedback.title/text of an older database into feedback_text."""
+    from app import textstore
+    from app.database import Base, SessionLocal, get_engine
+    from app.models import FeedbackText
+    Base.metadata.create_all(get_engine(), tables=[FeedbackText.__table__])
+    db = SessionLocal()
+    try:
+        print(f"✅ feedback_text: {textstore.migrate(db, chunk_size, drop_columns)} rows copied")
+    finally:
+        db.close()
+
+
+# =========================
+# NEAR-DUPLICATES
+# =========================
+@cli.group("dedup")
+def dedup_group():
+    """MinHash/LSH index of review texts (app.dedup)."""
+
+
+@dedup_group.command("index")
+@chunk_size_option
+def dedup_index_cmd(chunk_size):
+    """Index feedback imported before dedup existed, linking the duplicates among it."""
+    from app import dedup
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        indexed, linked = dedup.build_index(db, chunk_size)
+        print(f"✅ {indexed} reviews indexed, {linked} linked as duplicates")
+    finally:
+        db.close()
+
+
+@dedup_group.command("stats")
+def dedup_stats_cmd():
+    """Stored duplicate rate and index size."""
+    from app import dedup
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        s = dedup.stats(db)
+        print(f"🔁 {s['linked_duplicates']} of {s['feedback']} feedback rows are linked duplicates "
+              f"({s['duplicate_pct']}%); {s['indexed']} originals indexed")
+    finally:
+        db.close()
+
+
+# =========================
+# BACKGROUND JOBS
+# =========================
+@cli.group("jobs")
+def jobs_group():
+    """Job queue behind POST /jobs/import and /jobs/score (app.jobs)."""
+
+
+@jobs_group.command("worker")
+@click.option("-p", "--processes", type=click.IntRange(1), default=1, show_default=True,
+              help="Worker processes (each runs one job at a time).")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+def jobs_worker_cmd(processes, once):
+    """Claim and run queued jobs."""
+    from app import jobs
+    jobs.work(processes=processes, once=once)
+
+
+@jobs_group.command("list")
+@click.option("--status", type=click.Choice(("queued", "running", "succeeded", "failed", "cancelled")))
+@click.option("--limit", type=click.IntRange(1), default=20, show_default=True)
+def jobs_list_cmd(status, limit):
+    """Recent jobs, newest first."""
+    from app.database import SessionLocal
+    from app.models import Job
+    db = SessionLocal()
+    try:
+        q = db.query(Job)
+        if status:
+            q = q.filter(Job.status == status)
+        for j in q.order_by(Job.id.desc()).limit(limit):
+            progress = f"{j.progress_done}/{j.progress_total or '?'}"
+            print(f"{j.id:>6}  {j.kind:<7} {j.status:<10} {progress:>15}  {j.stage or '':<12} {j.worker or ''}")
+    finally:
+        db.close()
+
+
+@jobs_group.command("cancel")
+@click.argument("job_id", type=int)
+def jobs_cancel_cmd(job_id):
+    """Cancel a queued job, or ask a running one to stop."""
+    from app import jobs
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        job = jobs.cancel(db, job_id)
+        if job is None:
+            raise click.BadParameter(f"no job {job_id}")
+        print(f"🛑 job {job.id}: {job.status}, cancel requested")
+    finally:
+        db.close()
+
+
+# =========================
+# SHARED STORE
+# =========================
+@cli.group("store")
+def store_group():
+    """Shared-memory snapshots for multi-worker serving (app.shared_store)."""
+
+
+@store_group.command("refresh")
+@click.argument("names", nargs=-1)
+@click.option("--relabel", is_flag=True, help="Re-read all sentiment labels (after a rescore).")
+def store_refresh_cmd(names, relabel):
+    """Rebuild and publish snapshots (default: all)."""
+    from app import store_loader
+    unknown = set(names) - set(store_loader.BUILDERS)
+    if unknown:
+        raise click.BadParameter(f"unknown snapshot(s): {', '.join(sorted(unknown))}")
+    store_loader.refresh(names or None, relabel=relabel)
+
+
+# =========================
+# BENCHMARKS
+# - arguments are passed through to the bench modules' own parsers
+# =========================
+@cli.group("bench")
+def bench_group():
+    """Synthetic data and end-to-end benchmarks (bench/)."""
+
+
+@bench_group.command("generate", context_settings={"ignore_unknown_options": True})
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def bench_generate_cmd(args):
+    """Write a synthetic CSV (bench.synthetic; try `-- --help`)."""
+    from bench import synthetic
+    synthetic.main(list(args))
+
+
+@bench_group.command("run", context_settings={"ignore_unknown_options": True})
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def bench_run_cmd(args):
+    """Import/scoring/API benchmark (bench.run; try `-- --help`)."""
+    from bench import run
+    run.main(list(args))
+
+
+@bench_group.command("startup", context_settings={"ignore_unknown_options": True})
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def bench_startup_cmd(args):
+    """API cold-start time and import budget check (bench.startup)."""
+    from bench import startup
+    startup.main(list(args))
+
+
+@bench_group.command("text-split", context_settings={"ignore_unknown_options": True})
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def bench_text_split_cmd(args):
+    """Aggregate scans and storage, text inline vs feedback_text (bench.text_split)."""
+    from bench import text_split
+    text_split.main(list(args))
+
+
+@bench_group.command("compare")
+@click.argument("old", type=click.Path(exists=True))
+@click.argument("new", type=click.Path(exists=True))
+def bench_compare_cmd(old, new):
+    """Diff two bench result files."""
+    from bench import compare
+    compare.main(old, new)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,380 @@
+# app/correlation.py
+"""
+Streaming correlation statistics for text_length vs rating vs sentiment.
+
+Two kinds of mergeable accumulators live in the database, one set for all
+feedback (product_id 0) and one per product:
+
+- correlation_moments: per variable pair, the count, means, sums of squared
+  deviations and the co-deviation sum (Welford's running moments). Batches
+  are folded in with Chan et al.'s parallel formula, and removed again the
+  same way when scoring changes a label, so Pearson r is exact at any time.
+- correlation_histogram: joint counts of text_length bucket x rating x
+  label. They give the binned histograms and a Spearman-style rank
+  correlation (mid-ranks of the bucketed values, so ties are by bucket).
+
+Sentiment is coded negative=-1, neutral=0, positive=1. The importer and the
+scorer update both tables through app.rollups.RollupDelta, in the same
+transaction as the feedback rows; requests read at most a few hundred
+accumulator rows and never scan feedback.
+"""
+import math
+from bisect import bisect_right
+from collections import defaultdict
+
+from sqlalchemy import bindparam, update
+
+from .analytics import LABEL_CODES, LABELS, MAX_RATING, TEXT_LENGTH_BUCKETS, TEXT_LENGTH_EDGES
+from .models import CorrelationHistogram, CorrelationMoments, Feedback
+from .upsert import insert_ignore, insert_or_add
+
+HISTOGRAM_KEY = ("product_id", "length_bin", "rating", "label")
+
+GLOBAL = 0   # product_id of the all-feedback accumulators
+NO_RATING = -1   # histogram rating of feedback without one (0 is a real rating)
+RATINGS = range(0, MAX_RATING + 1)
+PAIRS = ("length_rating", "length_sentiment", "rating_sentiment")
+SENTIMENT_VALUE = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+IN_BATCH = 5000
+REBUILD_BATCH = 20_000
+
+
+def length_bin(text_length):
+    return bisect_right(TEXT_LENGTH_EDGES, text_length or 0)
+
+
+# =========================
+# RUNNING MOMENTS
+# =========================
+class Moments:
+    """Count, means, M2 and co-moment of (x, y) points; merge/remove are exact."""
+
+    __slots__ = ("n", "mean_x", "mean_y", "m2_x", "m2_y", "c_xy")
+
+    def __init__(self, n=0, mean_x=0.0, mean_y=0.0, m2_x=0.0, m2_y=0.0, c_xy=0.0):
+        self.n, self.mean_x, self.mean_y = n, mean_x, mean_y
+        self.m2_x, self.m2_y, self.c_xy = m2_x, m2_y, c_xy
+
+    @classmethod
+    def of(cls, points):
+        """Moments of a list of (x, y), two-pass for accuracy."""
+        n = len(points)
+        if not n:
+            return cls()
+        mx = sum(x for x, _ in points) / n
+        my = sum(y for _, y in points) / n
+        return cls(
+            n, mx, my,
+            sum((x - mx) ** 2 for x, _ in points),
+            sum((y - my) ** 2 for _, y in points),
+            sum((x - mx) * (y - my) for x, y in points),
+        )
+
+    def merge(self, other):
+        """Moments of the union of both point sets."""
+        if not other.n:
+            return self
+        if not self.n:
+            return other
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        f = self.n * other.n / n
+        return Moments(
+            n,
+            self.mean_x + dx * other.n / n,
+            self.mean_y + dy * other.n / n,
+            self.m2_x + other.m2_x + dx * dx * f,
+            self.m2_y + other.m2_y + dy * dy * f,
+            self.c_xy + other.c_xy + dx * dy * f,
+        )
+
+    def remove(self, other):
+        """Moments after taking out `other`, a subset of the points (inverse of merge)."""
+        if not other.n:
+            return self
+        n = self.n - other.n
+        if n <= 0:
+            return Moments()
+        mean_x = (self.n * self.mean_x - other.n * other.mean_x) / n
+        mean_y = (self.n * self.mean_y - other.n * other.mean_y) / n
+        dx = other.mean_x - mean_x
+        dy = other.mean_y - mean_y
+        f = n * other.n / self.n
+        return Moments(
+            n, mean_x, mean_y,
+            max(0.0, self.m2_x - other.m2_x - dx * dx * f),
+            max(0.0, self.m2_y - other.m2_y - dy * dy * f),
+            self.c_xy - other.c_xy - dx * dy * f,
+        )
+
+    def pearson(self):
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+
+    def summary(self):
+        def std(m2):
+            return math.sqrt(m2 / (self.n - 1)) if self.n > 1 else None
+
+        return {
+            "n": int(self.n),
+            "pearson": self.pearson(),
+            "mean_x": self.mean_x if self.n else None,
+            "mean_y": self.mean_y if self.n else None,
+            "std_x": std(self.m2_x),
+            "std_y": std(self.m2_y),
+            # least-squares slope of y on x
+            "slope": self.c_xy / self.m2_x if self.m2_x > 0 else None,
+        }
+
+
+def _row_moments(row):
+    return Moments(row.n, row.mean_x, row.mean_y, row.m2_x, row.m2_y, row.c_xy)
+
+
+# =========================
+# DELTAS
+# =========================
+class CorrelationDelta:
+    """Points added/removed per (product_id, pair) and histogram cell changes; see RollupDelta."""
+
+    def __init__(self):
+        self.added = defaultdict(list)     # (product_id, pair) -> [(x, y)]
+        self.removed = defaultdict(list)
+        self.cells = defaultdict(int)      # (product_id, length_bin, rating, label) -> +/- count
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.cells)
+
+    def _points(self, target, product_id, text_length, rating, label, with_rating_pair=True):
+        s = SENTIMENT_VALUE.get(label)
+        for scope in (GLOBAL, product_id):
+            if rating is not None and with_rating_pair:
+                target[(scope, "length_rating")].append((text_length, rating))
+            if s is not None:
+                target[(scope, "length_sentiment")].append((text_length, s))
+                if rating is not None:
+                    target[(scope, "rating_sentiment")].append((rating, s))
+
+    def _cell(self, product_id, text_length, rating, label, d):
+        b = length_bin(text_length)
+        code = LABEL_CODES.get(label, 0)
+        for scope in (GLOBAL, product_id):
+            self.cells[(scope, b, NO_RATING if rating is None else rating, code)] += d
+
+    def add(self, product_id, text_length, rating, label):
+        self._points(self.added, product_id, text_length, rating, label)
+        self._cell(product_id, text_length, rating, label, 1)
+
+    def relabel(self, product_id, text_length, rating, old_label, new_label):
+        if old_label == new_label:
+            return
+        # length/rating moments do not depend on the label
+        self._points(self.removed, product_id, text_length, rating, old_label, with_rating_pair=False)
+        self._points(self.added, product_id, text_length, rating, new_label, with_rating_pair=False)
+        self._cell(product_id, text_length, rating, old_label, -1)
+        self._cell(product_id, text_length, rating, new_label, 1)
+
+    def apply(self, db):
+        """Fold the changes into the accumulator tables (no commit) and reset."""
+        if self.added or self.removed:
+            self._apply_moments(db)
+        if any(self.cells.values()):
+            self._apply_cells(db)
+        self.added.clear()
+        self.removed.clear()
+        self.cells.clear()
+
+    def _apply_moments(self, db):
+        keys = set(self.added) | set(self.removed)
+        scopes = sorted({pid for pid, _ in keys})
+        # empty rows first (skipped where they exist, also if another job just
+        # made them), so every key below is a locked read-modify-write
+        zero = {f: getattr(Moments(), f) for f in Moments.__slots__}
+        db.execute(insert_ignore(db, CorrelationMoments.__table__, ("product_id", "pair")),
+                   [{"product_id": pid, "pair": pair, **zero} for pid, pair in sorted(keys)])
+        existing = {}
+        for start in range(0, len(scopes), IN_BATCH):
+            rows = (
+                # plain rows, not entities: the identity map would go stale
+                # under the bulk UPDATE below
+                db.query(*CorrelationMoments.__table__.c)
+                .filter(CorrelationMoments.product_id.in_(scopes[start:start + IN_BATCH]))
+                .with_for_update()   # read-modify-write: serialize concurrent jobs per row
+            )
+            for row in rows:
+                existing[(row.product_id, row.pair)] = _row_moments(row)
+
+        updates = []
+        for key in keys:
+            m = existing.get(key, Moments())
+            m = m.merge(Moments.of(self.added.get(key, [])))
+            m = m.remove(Moments.of(self.removed.get(key, [])))
+            updates.append({"product_id": key[0], "pair": key[1], **{f: getattr(m, f) for f in Moments.__slots__}})
+        if updates:
+            db.execute(update(CorrelationMoments), updates)   # bulk UPDATE by primary key
+
+    def _apply_cells(self, db):
+        changes = {k: d for k, d in self.cells.items() if d}
+        scopes = sorted({k[0] for k in changes})
+        have = set()
+        h = CorrelationHistogram
+        for start in range(0, len(scopes), IN_BATCH):
+            have.update(
+                db.query(h.product_id, h.length_bin, h.rating, h.label)
+                .filter(h.product_id.in_(scopes[start:start + IN_BATCH]))
+                .all()
+            )
+        have = {tuple(r) for r in have}
+
+        new = [
+            {"product_id": k[0], "length_bin": k[1], "rating": k[2], "label": k[3], "count": d}
+            for k, d in changes.items() if k not in have
+        ]
+        bumps = [
+            {"p": k[0], "b": k[1], "r": k[2], "l": k[3], "d": d}
+            for k, d in changes.items() if k in have
+        ]
+        table = h.__table__
+        if new:
+            # a concurrent job may have created some of these cells since the lookup
+            db.execute(insert_or_add(db, table, HISTOGRAM_KEY, ("count",)), new)
+        if bumps:
+            db.execute(
+                table.update()
+                .where(table.c.product_id == bindparam("p"), table.c.length_bin == bindparam("b"),
+                       table.c.rating == bindparam("r"), table.c.label == bindparam("l"))
+                .values(count=table.c["count"] + bindparam("d")),
+                bumps,
+            )
+
+
+def rebuild(db):
+    """Recompute both accumulator tables from feedback; returns the number of feedback rows read."""
+    db.query(CorrelationMoments).delete(synchronize_session=False)
+    db.query(CorrelationHistogram).delete(synchronize_session=False)
+    delta = CorrelationDelta()
+    last_id = 0
+    read = 0
+    while True:
+        rows = (
+            db.query(Feedback.id, Feedback.product_id, Feedback.text_length,
+                     Feedback.rating, Feedback.sentiment_label)
+            .filter(Feedback.id > last_id)
+            .order_by(Feedback.id)
+            .limit(REBUILD_BATCH)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for r in rows:
+            delta.add(r.product_id, r.text_length or 0, r.rating, r.sentiment_label)
+        delta.apply(db)
+        read += len(rows)
+    db.commit()
+    return read
+
+
+# =========================
+# READ SIDE
+# =========================
+def _weighted_pearson(points):
+    """Pearson r of (x, y, weight) triples."""
+    m = Moments()
+    w_total = sum(w for _, _, w in points)
+    if w_total < 2:
+        return None
+    mx = sum(x * w for x, _, w in points) / w_total
+    my = sum(y * w for _, y, w in points) / w_total
+    m.n = w_total
+    m.m2_x = sum(w * (x - mx) ** 2 for x, _, w in points)
+    m.m2_y = sum(w * (y - my) ** 2 for _, y, w in points)
+    m.c_xy = sum(w * (x - mx) * (y - my) for x, y, w in points)
+    return m.pearson()
+
+
+def _midranks(weights):
+    """{value: mid-rank} for a {value: count} marginal."""
+    ranks, below = {}, 0
+    for v in sorted(weights):
+        ranks[v] = below + (weights[v] + 1) / 2
+        below += weights[v]
+    return ranks
+
+
+def binned_spearman(cells):
+    """Spearman-style rho from {(x, y): count}: Pearson of the mid-ranks of x and y."""
+    cells = {k: c for k, c in cells.items() if c > 0}
+    if not cells:
+        return None
+    wx, wy = defaultdict(int), defaultdict(int)
+    for (x, y), c in cells.items():
+        wx[x] += c
+        wy[y] += c
+    rx, ry = _midranks(wx), _midranks(wy)
+    return _weighted_pearson([(rx[x], ry[y], c) for (x, y), c in cells.items()])
+
+
+def summarize(db, product_id=None):
+    """Everything /analytics/correlation returns, for all feedback or one product."""
+    scope = GLOBAL if product_id is None else product_id
+    moments = {
+        row.pair: _row_moments(row)
+        for row in db.query(*CorrelationMoments.__table__.c).filter(CorrelationMoments.product_id == scope)
+    }
+    cells = [
+        (r.length_bin, r.rating, r.label, int(r.count))
+        for r in db.query(*CorrelationHistogram.__table__.c).filter(CorrelationHistogram.product_id == scope)
+        if r.count
+    ]
+
+    sentiment_of = {LABEL_CODES[k]: v for k, v in SENTIMENT_VALUE.items()}
+    pair_cells = {p: defaultdict(int) for p in PAIRS}
+    for b, rating, label, c in cells:
+        rated = rating != NO_RATING
+        if rated:
+            pair_cells["length_rating"][(b, rating)] += c
+        if label in sentiment_of:
+            pair_cells["length_sentiment"][(b, sentiment_of[label])] += c
+            if rated:
+                pair_cells["rating_sentiment"][(rating, sentiment_of[label])] += c
+
+    pairs = {}
+    for p in PAIRS:
+        stats = moments.get(p, Moments()).summary()
+        stats["spearman_binned"] = binned_spearman(pair_cells[p])
+        pairs[p] = stats
+
+    return {
+        "product_id": product_id,
+        "pairs": pairs,
+        "by_length": _histogram(cells, 0, list(enumerate(TEXT_LENGTH_BUCKETS)), "length_bucket"),
+        "by_rating": _histogram(cells, 1, [(NO_RATING, "none")] + [(r, str(r)) for r in RATINGS], "rating"),
+    }
+
+
+def _histogram(cells, axis, values, key):
+    """Per (value, name) of cells[axis]: review count, ratings, labels and averages."""
+    rows = []
+    for value, name in values:
+        picked = [c for c in cells if c[axis] == value]
+        if not picked:
+            continue
+        ratings = defaultdict(int)
+        labels = defaultdict(int)
+        for _, rating, label, c in picked:
+            ratings[rating] += c
+            labels[label] += c
+        rated = sum(ratings[r] for r in RATINGS)
+        scored = sum(labels[LABEL_CODES[lab]] for lab in SENTIMENT_VALUE)
+        rows.append({
+            key: name,
+            "reviews": sum(c for *_, c in picked),
+            "ratings": {str(r): ratings[r] for r in RATINGS},
+            "labels": {(LABELS[code] or "unscored"): labels[code] for code in range(len(LABELS))},
+            "avg_rating": sum(r * ratings[r] for r in RATINGS) / rated if rated else None,
+            "positive_pct": labels[LABEL_CODES["positive"]] / scored * 100.0 if scored else 0.0,
+        })
+    return rows
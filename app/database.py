@@ -1,19 +1,69 @@
-from sqlalchemy import create_engine
+from datetime import datetime
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 import os
 
-# Load .env variables
-load_dotenv()
+# The engine (and .env loading) is created on first use, not at import time:
+# the API creates it in its lifespan handler, batch jobs on their first
+# SessionLocal(). Keeps `import app.main` cheap for scale-out cold starts.
+_engine = None
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _sqlite_date_format(value, fmt):
+    # MySQL DATE_FORMAT shares %Y/%m/%d with strftime, which is all we use
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).strftime(fmt)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        from dotenv import load_dotenv
+
+        # Load .env variables
+        load_dotenv()
+        engine = create_engine(os.getenv("DATABASE_URL"))
+
+        # SQLite stand-in (benchmarks, local runs): provide the MySQL functions we call
+        if engine.dialect.name == "sqlite":
+            @event.listens_for(engine, "connect")
+            def _sqlite_functions(dbapi_conn, _):
+                dbapi_conn.create_function("date_format", 2, _sqlite_date_format)
+
+        SessionLocal.configure(bind=engine)
+        _engine = engine
+    return _engine
+
+
+def dispose_engine():
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that creates the engine on first session."""
+
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+
+def __getattr__(name):
+    # `from app.database import engine` keeps working, lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Dependency: get a database session
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,283 @@
+# app/dedup.py
+"""
+Near-duplicate review detection for the importer (MinHash + LSH).
+
+The Datafiniti dumps repeat many reviews across listings, verbatim or
+lightly edited. For every incoming review text:
+
+1. signature(): lowercase word 3-gram shingles, hashed with crc32, and
+   NUM_PERM MinHash values (a*x + b mod 2^61-1). Texts with fewer than
+   MIN_SHINGLES shingles ("Great hotel!") are never treated as duplicates.
+2. bucket_keys(): the signature cut into BANDS bands of ROWS values; each
+   band hashes to one 64-bit bucket. Two texts with Jaccard similarity s
+   share at least one bucket with probability 1 - (1 - s^ROWS)^BANDS,
+   which is about 0.99 at s=0.8 and 0.03 at s=0.3.
+3. Candidates are the indexed reviews sharing a bucket (one IN query on
+   minhash_buckets per chunk) plus earlier originals of the same chunk.
+   A candidate whose signatures agree on at least THRESHOLD of the values
+   (the Jaccard estimate) is the match.
+
+Only originals are indexed, in feedback_minhash and minhash_buckets,
+inside the import's own transaction. Archiving a year unindexes its rows
+and restoring it indexes them again (app.partitioning); lookups also join
+feedback, so a stale index row can never become an original. Later
+imports then check new rows against the index, never by rescanning
+feedback. What happens to a match
+depends on the policy ($DEDUP_POLICY or `import all --dedup`):
+
+- "link" (default): the row is stored with duplicate_of = the original's
+  id. It is not sent to the scorer and takes the original's label. When
+  the import scores, only scored originals count as matches, so a row
+  never ends up linked but unlabeled. Counts and rollups still include it.
+- "skip": the row is not stored at all.
+- "off": no detection.
+
+Feedback imported before this existed can be indexed with
+`python -m app.cli dedup index`. `dedup stats` shows the stored duplicate
+rate.
+"""
+import hashlib
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import bindparam, func, insert, update
+
+from .models import Feedback, FeedbackMinhash, MinhashBucket
+
+NUM_PERM = 60
+BANDS = 12
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 5
+THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+POLICY = os.getenv("DEDUP_POLICY", "link")
+POLICIES = ("off", "link", "skip")
+IN_BATCH = 5000
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# fixed seed: signatures must stay comparable across runs and processes
+_rng = np.random.default_rng(20180101)
+_A = _rng.integers(1, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+# =========================
+# SIGNATURES
+# =========================
+def shingles(text):
+    words = _WORD.findall(text.lower())
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """uint32 MinHash signature of `text`, or None if it is too short to compare."""
+    if not text:
+        return None
+    grams = shingles(text)
+    if len(grams) < MIN_SHINGLES:
+        return None
+    x = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    # uint64 wrap-around before the modulo is fine for hashing purposes
+    with np.errstate(over="ignore"):
+        h = (np.outer(_A, x) + _B[:, None]) % _PRIME & _MAX_HASH
+    return h.min(axis=1).astype(np.uint32)
+
+
+def bucket_keys(sig):
+    """One signed 64-bit bucket per band (the band number is part of the hash)."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8,
+                                 person=band.to_bytes(2, "little")).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _load_signature(blob):
+    return np.frombuffer(blob, dtype=np.uint32)
+
+
+# =========================
+# INDEX LOOKUP / UPDATE
+# =========================
+class Deduplicator:
+    """
+    Per-import matcher: match() one chunk of texts, insert the originals,
+    flush, then index() them so the next chunk sees them.
+    """
+
+    def __init__(self, db, threshold=THRESHOLD, scored_only=False):
+        self.db = db
+        self.threshold = threshold
+        # only match reviews that have a label to copy (importer with --score)
+        self.scored_only = scored_only
+        self.checked = 0      # texts long enough to compare
+        self.duplicates = 0
+
+    def _candidates(self, keys):
+        by_bucket = defaultdict(list)
+        wanted = sorted({k for ks in keys for k in ks})
+        for start in range(0, len(wanted), IN_BATCH):
+            q = (
+                self.db.query(MinhashBucket.bucket, MinhashBucket.feedback_id)
+                # index rows of deleted/archived reviews never match
+                .join(Feedback, Feedback.id == MinhashBucket.feedback_id)
+                .filter(MinhashBucket.bucket.in_(wanted[start:start + IN_BATCH]))
+            )
+            if self.scored_only:
+                q = q.filter(Feedback.sentiment_label.isnot(None))
+            for bucket, fid in q:
+                by_bucket[bucket].append(fid)
+        ids = sorted({fid for fids in by_bucket.values() for fid in fids})
+        stored = {}
+        for start in range(0, len(ids), IN_BATCH):
+            for fid, blob in (
+                self.db.query(FeedbackMinhash.feedback_id, FeedbackMinhash.signature)
+                .filter(FeedbackMinhash.feedback_id.in_(ids[start:start + IN_BATCH]))
+            ):
+                stored[fid] = _load_signature(blob)
+        return by_bucket, stored
+
+    def match(self, texts):
+        """
+        (signatures, matches) for a list of texts. matches[j] is None for an
+        original, ("id", feedback_id) for a duplicate of an indexed review or
+        ("row", i) for a duplicate of texts[i] (an earlier original in the list).
+        """
+        sigs = [signature(t) for t in texts]
+        keys = [bucket_keys(s) if s is not None else [] for s in sigs]
+        by_bucket, stored = self._candidates(keys)
+
+        local = defaultdict(list)   # bucket -> earlier originals of this list
+        matches = []
+        for j, (sig, ks) in enumerate(zip(sigs, keys)):
+            found = None
+            if sig is not None:
+                self.checked += 1
+                for fid in sorted({fid for k in ks for fid in by_bucket.get(k, ())}):
+                    if similarity(sig, stored[fid]) >= self.threshold:
+                        found = ("id", fid)
+                        break
+                if found is None:
+                    for i in sorted({i for k in ks for i in local.get(k, ())}):
+                        if similarity(sig, sigs[i]) >= self.threshold:
+                            found = ("row", i)
+                            break
+                if found is None:
+                    for k in ks:
+                        local[k].append(j)
+                else:
+                    self.duplicates += 1
+            matches.append(found)
+        return sigs, matches
+
+    def index(self, feedback_ids, sigs):
+        """Add stored originals (ids known after flush) to the index; None signatures are skipped."""
+        rows, buckets = [], []
+        for fid, sig in zip(feedback_ids, sigs):
+            if sig is None:
+                continue
+            rows.append({"feedback_id": fid, "signature": sig.tobytes()})
+            buckets += [{"bucket": k, "feedback_id": fid} for k in set(bucket_keys(sig))]
+        if rows:
+            self.db.execute(insert(FeedbackMinhash), rows)
+            self.db.execute(insert(MinhashBucket), buckets)
+
+    def unindex(self, feedback_ids):
+        """Remove reviews from the index (e.g. when they are archived)."""
+        unindex(self.db, feedback_ids)
+
+    def rate(self):
+        return self.duplicates / self.checked if self.checked else 0.0
+
+    def report(self, policy):
+        print(f"🔁 Near-duplicates: {self.duplicates} of {self.checked} comparable reviews "
+              f"({self.rate() * 100:.1f}%), policy={policy}")
+
+
+def unindex(db, feedback_ids):
+    """
+    Drop the signatures and buckets of these reviews. Bucket rows are found
+    from the stored signatures, so the delete uses their primary key.
+    """
+    ids = list(feedback_ids)
+    for start in range(0, len(ids), IN_BATCH):
+        chunk = ids[start:start + IN_BATCH]
+        pairs = [
+            {"b": bucket, "f": fid}
+            for fid, blob in db.query(FeedbackMinhash.feedback_id, FeedbackMinhash.signature)
+            .filter(FeedbackMinhash.feedback_id.in_(chunk))
+            for bucket in set(bucket_keys(_load_signature(blob)))
+        ]
+        if pairs:
+            table = MinhashBucket.__table__   # Core: executemany DELETE by primary key
+            db.execute(
+                table.delete().where(table.c.bucket == bindparam("b"), table.c.feedback_id == bindparam("f")),
+                pairs,
+            )
+        db.query(FeedbackMinhash).filter(FeedbackMinhash.feedback_id.in_(chunk)).delete(
+            synchronize_session=False)
+
+
+# =========================
+# BACKFILL / STATS
+# =========================
+def build_index(db, batch_size=5000):
+    """
+    Index existing feedback (oldest first) that is neither indexed nor a
+    known duplicate. Rows that match an earlier one are linked, not indexed.
+    Returns (indexed, linked).
+    """
+    from . import textstore
+
+    dedup = Deduplicator(db)
+    indexed = linked = 0
+    last_id = 0
+    while True:
+        ids = [
+            fid for (fid,) in
+            db.query(Feedback.id)
+            .outerjoin(FeedbackMinhash, FeedbackMinhash.feedback_id == Feedback.id)
+            .filter(Feedback.id > last_id, Feedback.duplicate_of.is_(None),
+                    FeedbackMinhash.feedback_id.is_(None))
+            .order_by(Feedback.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        last_id = ids[-1]
+        sigs, matches = dedup.match(textstore.texts(db, ids))
+        links = []
+        for fid, m in zip(ids, matches):
+            if m is not None:
+                links.append({"id": fid, "duplicate_of": m[1] if m[0] == "id" else ids[m[1]]})
+        originals = [(fid, sig) for fid, sig, m in zip(ids, sigs, matches) if m is None]
+        dedup.index([fid for fid, _ in originals], [sig for _, sig in originals])
+        if links:
+            db.execute(update(Feedback), links)   # bulk UPDATE by primary key
+        db.commit()
+        indexed += sum(sig is not None for _, sig in originals)
+        linked += len(links)
+        print(f"...indexed {indexed}, linked {linked}")
+    return indexed, linked
+
+
+def stats(db):
+    total = db.query(func.count(Feedback.id)).scalar() or 0
+    linked = db.query(func.count(Feedback.id)).filter(Feedback.duplicate_of.isnot(None)).scalar() or 0
+    return {
+        "feedback": total,
+        "linked_duplicates": linked,
+        "duplicate_pct": round(linked / total * 100, 2) if total else 0.0,
+        "indexed": db.query(func.count(FeedbackMinhash.feedback_id)).scalar() or 0,
+    }
@@ -0,0 +1,159 @@
+# app/geo.py
+"""
+Geohash helpers for the "products near me" queries.
+
+Product.geohash is filled at import time (and by `app.cli geo backfill`).
+A radius query covers its bounding box with the finest geohash cells that
+take at most MAX_COVER_CELLS prefixes; those prefixes become index range
+scans, and only the few candidates they return get an exact haversine
+distance.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(BASE32)}
+PRECISION = 9        # stored length (~4.8m x 4.8m cells)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+MAX_COVER_CELLS = 32  # more, finer cells = fewer false candidates but more range scans
+
+
+def encode(lat, lon, precision=PRECISION):
+    if lat is None or lon is None:
+        return None
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    out = []
+    bits, ch, even = 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def decode(gh):
+    """Center (lat, lon) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for c in gh:
+        v = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (v >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+
+
+def cell_size_deg(precision):
+    """(lat_degrees, lon_degrees) covered by one cell of this precision."""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon); lon range may exceed ±180 near the antimeridian."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(180.0, radius_km / (KM_PER_DEG_LAT * cos_lat))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lon - dlon, lon + dlon
+
+
+def _wrap_lon(lon):
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def covering_prefixes(lat, lon, radius_km, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose cells cover the radius' bounding box, using the
+    finest precision that needs at most `max_cells` of them.
+    Empty list means the box is too large to bother: scan everything.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    for p in range(PRECISION, 0, -1):
+        cell_lat, cell_lon = cell_size_deg(p)
+        # cell rows/columns touched by the box (grid is aligned to -90/-180)
+        rows = range(math.floor((min_lat + 90) / cell_lat), math.floor((max_lat + 90) / cell_lat) + 1)
+        cols = range(math.floor((min_lon + 180) / cell_lon), math.floor((max_lon + 180) / cell_lon) + 1)
+        if len(rows) * len(cols) > max_cells:
+            continue
+        cells = set()
+        for i in rows:
+            for j in cols:
+                # encode each cell's center
+                c_lat = min(90.0, -90 + (i + 0.5) * cell_lat)
+                c_lon = _wrap_lon(-180 + (j + 0.5) * cell_lon)
+                cells.add(encode(c_lat, c_lon, p))
+        return sorted(cells)
+    return []
+
+
+def prefix_filter(column, prefix):
+    """
+    `column LIKE 'prefix%'` written as a range, which every backend (SQLite
+    included) can answer from the index. '{' sorts right after 'z', the
+    last geohash character.
+    """
+    from sqlalchemy import and_
+    return and_(column >= prefix, column < prefix + "{")
+
+
+def backfill_geohash(db, batch_size=1000):
+    """Fill Product.geohash where missing; returns the number of rows updated."""
+    from sqlalchemy import update
+    from .models import Product
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Product.id, Product.latitude, Product.longitude)
+            .filter(Product.id > last_id, Product.geohash.is_(None),
+                    Product.latitude.isnot(None), Product.longitude.isnot(None))
+            .order_by(Product.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        db.execute(update(Product), [
+            {"id": r.id, "geohash": encode(r.latitude, r.longitude)} for r in rows
+        ])
+        db.commit()
+        updated += len(rows)
+    return updated
@@ -0,0 +1,267 @@
+# app/http_cache.py
+"""
+Compressed responses, and pre-encoded bodies for the aggregate endpoints.
+
+ResponseMiddleware (pure ASGI, wraps every HTTP route)
+- picks Content-Encoding from the client's Accept-Encoding (q-values
+  honoured): br when the optional `brotli` package is installed, else
+  gzip, else none
+- compresses complete JSON/text bodies of at least MIN_BYTES; HEAD
+  requests, streamed bodies and responses that already carry
+  Content-Encoding pass through untouched
+- sets Vary: Accept-Encoding on everything it could have compressed
+
+Response cache (GET under CACHED_PREFIXES: /sentiment, /summary, /analytics)
+- a 200 JSON response is kept per path + query string, as the serialized
+  bytes plus each compressed variant the first time a client asks for it.
+  A repeated hit skips the endpoint, JSON encoding and compression.
+- the cache belongs to a version: the newest sentiment_events id and the
+  shared-store generations (app.shared_store). An event is written by
+  every committed import/score batch, rollup rebuild and archived or
+  restored year (app.rollups). The version is re-read at most every
+  CHECK_SECONDS per worker, so a hit usually costs no query. Any change
+  empties the cache. MAX_AGE_SECONDS bounds how stale an entry can get
+  from changes that write no event (feedback edited by hand).
+- X-Cache: hit|miss tells the two apart; RESPONSE_CACHE=0 turns it off.
+
+Each worker has its own cache (MAX_ENTRIES bodies, least recently used
+dropped first).
+"""
+import gzip
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:   # optional: pip install brotli
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6         # per request
+BROTLI_QUALITY = 4
+CACHED_GZIP_LEVEL = 9  # cached bodies are compressed once, so spend more on them
+CACHED_BROTLI_QUALITY = 9
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)   # server preference on ties
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") == "1"
+CACHED_PREFIXES = ("/sentiment/", "/summary/", "/analytics/")
+CHECK_SECONDS = float(os.getenv("RESPONSE_CACHE_CHECK_SECONDS", "1.0"))
+MAX_AGE_SECONDS = float(os.getenv("RESPONSE_CACHE_MAX_AGE_SECONDS", "60"))
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+
+# =========================
+# CONTENT NEGOTIATION / ENCODING
+# =========================
+def choose_encoding(accept_encoding):
+    """Best of ENCODINGS for an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    prefs = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for enc in ENCODINGS:
+        q = prefs.get(enc, prefs.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress(body, encoding, cached=False):
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+
+def _compressible(headers):
+    if "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+# =========================
+# RESPONSE CACHE
+# =========================
+class _Entry:
+    __slots__ = ("status", "headers", "body", "encoded", "route", "created")
+
+    def __init__(self, status, headers, body, route):
+        self.status = status
+        self.headers = headers      # raw header list, no content-length/encoding
+        self.body = body
+        self.encoded = {}           # encoding -> compressed body, filled on demand
+        self.route = route          # matched route, for app.metrics' labels on hits
+        self.created = time.monotonic()
+
+    def variant(self, encoding):
+        if encoding is None or len(self.body) < MIN_BYTES:
+            return self.body, None
+        data = self.encoded.get(encoding)
+        if data is None:
+            data = self.encoded[encoding] = compress(self.body, encoding, cached=True)
+        return data, encoding
+
+
+def _read_version():
+    from sqlalchemy import func
+    from . import shared_store
+    from .database import SessionLocal
+    from .models import SentimentEvent
+
+    db = SessionLocal()
+    try:
+        last_event = db.query(func.max(SentimentEvent.id)).scalar() or 0
+    finally:
+        db.close()
+    return last_event, tuple(sorted(shared_store.generations().items()))
+
+
+class ResponseCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(scope):
+        if scope["method"] != "GET" or not scope["path"].startswith(CACHED_PREFIXES):
+            return None
+        return scope["path"], scope.get("query_string", b"")
+
+    async def refresh(self):
+        """Drop everything if the data changed since the last check (at most every CHECK_SECONDS)."""
+        now = time.monotonic()
+        if now - self.checked_at < CHECK_SECONDS:
+            return
+        self.checked_at = now
+        version = await run_in_threadpool(_read_version)
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.created > MAX_AGE_SECONDS:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+async def _send_body(send, status, raw_headers, body, encoding, extra=()):
+    headers = MutableHeaders(raw=list(raw_headers))
+    headers["content-length"] = str(len(body))
+    if encoding is not None:
+        headers["content-encoding"] = encoding
+    headers.add_vary_header("Accept-Encoding")
+    for name, value in extra:
+        headers[name] = value
+    await send({"type": "http.response.start", "status": status, "headers": headers.raw})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ResponseMiddleware:
+    def __init__(self, app, cache=None):
+        self.app = app
+        self.cache = cache if cache is not None else (ResponseCache() if CACHE_ENABLED else None)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+
+        key = self.cache.key(scope) if self.cache is not None else None
+        if key is not None:
+            await self.cache.refresh()
+            entry = self.cache.get(key)
+            if entry is not None:
+                if entry.route is not None:
+                    scope["route"] = entry.route
+                body, used = entry.variant(encoding)
+                await _send_body(send, entry.status, entry.headers, body, used, [("x-cache", "hit")])
+                return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                passthrough = not _compressible(MutableHeaders(raw=message["headers"]))
+                if passthrough:
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # streamed body: send it on as it comes, uncompressed and uncached
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = [
+                (k, v) for k, v in start["headers"] if k not in (b"content-length", b"content-encoding")
+            ]
+            extra = []
+            if key is not None:
+                extra.append(("x-cache", "miss"))
+                if start["status"] == 200 and MutableHeaders(raw=headers).get(
+                        "content-type", "").startswith("application/json"):
+                    entry = _Entry(start["status"], headers, body, scope.get("route"))
+                    self.cache.put(key, entry)
+                    body, used = entry.variant(encoding)
+                    await _send_body(send, start["status"], headers, body, used, extra)
+                    return
+            used = encoding if encoding is not None and len(body) >= MIN_BYTES else None
+            if used is not None:
+                body = compress(body, used)
+            await _send_body(send, start["status"], headers, body, used, extra)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,10 +1,28 @@
+import argparse
 import math
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from sqlalchemy.orm import Session
+from .analytics import MAX_RATING
 from .database import SessionLocal
+from .geo import encode as geohash_encode
+from .instrumentation import PROFILE_MODES, JobProfiler, count_csv_rows
+from . import aspects, textstore
 from .models import Product, User, Feedback
+from .dedup import POLICIES as DEDUP_POLICIES, POLICY as DEDUP_POLICY, Deduplicator
+from .rollups import RollupDelta, link_product_categories
 
 CSV_PATH = "data/7282_1.csv"
+CHUNK_SIZE = 1000  # rows per read/insert/commit batch
+
+USE_COLS = [
+    # product columns
+    "name","categories","address","city","province","country",
+    "postalCode","latitude","longitude",
+    # review columns
+    "reviews.date","reviews.rating","reviews.text","reviews.title",
+    "reviews.userCity","reviews.username","reviews.userProvince",
+]
 
 def to_none(x):
     if x is None:
@@ -23,6 +41,11 @@ def to_int(x):
     except Exception:
         return None
 
+def to_rating(x):
+    """Rating as an int in 0..MAX_RATING, or None (missing or out of range)."""
+    v = to_int(x)
+    return v if v is not None and 0 <= v <= MAX_RATING else None
+
 def to_float_or_none(x):
     if x is None:
         return None
@@ -57,26 +80,9 @@ def clean_postal(x):
     s = str(x).strip()
     return s if s else None
 
-def main():
-    use_cols = [
-        # product columns
-        "name","categories","address","city","province","country",
-        "postalCode","latitude","longitude",
-        # review columns
-        "reviews.date","reviews.rating","reviews.text","reviews.title",
-        "reviews.userCity","reviews.username","reviews.userProvince",
-    ]
-
-    df = pd.read_csv(
-        CSV_PATH,
-        usecols=use_cols,
-        parse_dates=["reviews.date"],
-    )
-
-    print("✅ CSV loaded:", df.shape)
-
+def clean_chunk(df: pd.DataFrame) -> pd.DataFrame:
     # Clean string-like columns (leave numeric ones to dedicated cleaners)
-    for c in use_cols:
+    for c in USE_COLS:
         if c in ("reviews.rating", "latitude", "longitude"):
             continue
         if df[c].dtype == object:
@@ -84,8 +90,62 @@ def main():
             df[c] = df[c].replace({"nan": None, "None": None, "": None})
 
     # Normalize numerics safely
-    df["reviews.rating"] = df["reviews.rating"].apply(to_int)
+    df["reviews.rating"] = df["reviews.rating"].apply(to_rating)
     # Don’t trust column dtype—coerce per-row later too
+    return df
+
+def _labels_with_duplicates(db, scored, matches, version):
+    """
+    (labels, scorer versions, aspects) for a chunk where only originals were
+    scored ({row index: (label, aspects)}). Duplicates take their original's
+    label and aspects. The deduplicator only matches scored originals here
+    (scored_only), so the (None, None) fallback is just a guard.
+    """
+    ids = sorted({m[1] for m in matches if m and m[0] == "id"})
+    stored, stored_aspects = {}, {}
+    if ids:
+        stored = {
+            fid: (label, ver) for fid, label, ver in
+            db.query(Feedback.id, Feedback.sentiment_label, Feedback.scored_with_version)
+            .filter(Feedback.id.in_(ids))
+        }
+        stored_aspects = aspects.load(db, ids)
+    labels, versions, found = [], [], []
+    for j, m in enumerate(matches):
+        if m is None:
+            (label, a), ver = scored[j], version
+        elif m[0] == "row":
+            (label, a), ver = scored[m[1]], version
+        else:
+            label, ver = stored.get(m[1], (None, None))
+            a = stored_aspects.get(m[1], {}) if label is not None else None
+        labels.append(label)
+        versions.append(ver)
+        found.append(a)
+    return labels, versions, found
+
+
+def main(csv_path=CSV_PATH, chunk_size=CHUNK_SIZE, score=False, workers=None, profile=None,
+         dry_run=False, dedup=None):
+    """
+    Import products, users and feedback from the Datafiniti CSV.
+
+    With score=True every cleaned chunk is sent to the sentiment scorer
+    (fanned out over `workers` processes) before insert, so feedback rows are
+    written once with their label instead of being re-read and updated later
+    by sentiment_analyzer.
+
+    profile: None | "cprofile" | "tracemalloc" (see app.instrumentation)
+    dry_run: parse, clean, score and flush everything, then roll back
+    dedup: "link" | "skip" | "off" for near-duplicate reviews (default
+    $DEDUP_POLICY, see app.dedup); duplicates are never sent to the scorer
+    """
+    reader = pd.read_csv(
+        csv_path,
+        usecols=USE_COLS,
+        parse_dates=["reviews.date"],
+        chunksize=chunk_size,
+    )
 
     db: Session = SessionLocal()
     created_products = 0
@@ -94,92 +154,201 @@ def main():
 
     product_cache: dict[tuple[str, str|None], int] = {}
     user_cache: dict[str, int] = {}
+    category_cache: dict[str, int] = {}
+    rollup = RollupDelta()
+
+    policy = dedup or DEDUP_POLICY
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"dedup policy must be one of {DEDUP_POLICIES}, got {policy!r}")
+    # with --score, a "link" duplicate copies its original's label, so the original must have one
+    deduper = Deduplicator(db, scored_only=score and policy == "link") if policy != "off" else None
 
+    executor = None
+    if score:
+        from .sentiment_analyzer import SCORER_VERSION, SCORER_WORKERS, score_texts, text_hash
+        workers = workers or SCORER_WORKERS
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+    prof = JobProfiler("import_all", total=count_csv_rows(csv_path), profile=profile)
     try:
-        for i, row in enumerate(df.to_dict(orient="records"), start=1):
-            # -------- PRODUCT (get or create) --------
-            name = to_none(row.get("name"))
-            address = to_none(row.get("address"))
-            key = (name, address)
-
-            pid = product_cache.get(key)
-            if pid is None:
-                prod = (
-                    db.query(Product)
-                    .filter(Product.name == name, Product.address == address)
-                    .first()
-                )
-                if prod is None:
-                    prod = Product(
-                        name=name,
-                        categories=to_none(row.get("categories")),
-                        address=address,
-                        city=to_none(row.get("city")),
-                        province=to_none(row.get("province")),
-                        country=to_none(row.get("country")),
-                        postalCode=clean_postal(row.get("postalCode")),
-                        latitude=to_float_or_none(row.get("latitude")),
-                        longitude=to_float_or_none(row.get("longitude")),
-                    )
-                    db.add(prod)
-                    db.flush()  # obtain prod.id
-                    created_products += 1
-                pid = prod.id
-                product_cache[key] = pid
-
-            # -------- USER (get or create by username) --------
-            username = to_none(row.get("reviews.username"))
-            uid = None
-            if username:
-                uid = user_cache.get(username)
-                if uid is None:
-                    u = db.query(User).filter(User.username == username).first()
-                    if u is None:
-                        u = User(
-                            username=username,
-                            user_city=to_none(row.get("reviews.userCity")),
-                            user_province=to_none(row.get("reviews.userProvince")),
+        with prof:
+            while True:
+                with prof.stage("read"):
+                    df = next(reader, None)
+                if df is None:
+                    break
+
+                with prof.stage("clean"):
+                    df = clean_chunk(df)
+                    records = df.to_dict(orient="records")
+                read_rows = len(records)
+
+                # near-duplicates: dropped here ("skip"), or kept but not scored ("link")
+                sigs = [None] * len(records)
+                matches = [None] * len(records)
+                if deduper is not None:
+                    with prof.stage("dedup"):
+                        sigs, matches = deduper.match([to_none(r.get("reviews.text")) for r in records])
+                        prof.count("dedup_checked", sum(s is not None for s in sigs))
+                        prof.count("duplicates", sum(m is not None for m in matches))
+                        if policy == "skip":
+                            keep = [j for j, m in enumerate(matches) if m is None]
+                            records = [records[j] for j in keep]
+                            sigs = [sigs[j] for j in keep]
+                            matches = [None] * len(records)
+
+                # Start scoring before resolving ids: with a pool the workers
+                # label this chunk while we talk to the DB below.
+                labels = None
+                if score:
+                    with prof.stage("score"):
+                        to_score = [j for j, m in enumerate(matches) if m is None]
+                        labels = score_texts(
+                            [to_none(records[j].get("reviews.text")) for j in to_score], executor
                         )
-                        db.add(u)
-                        db.flush()
-                        created_users += 1
-                    uid = u.id
-                    user_cache[username] = uid
-
-            # -------- FEEDBACK (always create) --------
-            rev_date = row.get("reviews.date")
-            # NaT/NaN/None -> None; Timestamp -> datetime
-            if pd.isna(rev_date):
-                rev_date = None
-            elif hasattr(rev_date, "to_pydatetime"):
-                rev_date = rev_date.to_pydatetime()
-
-            text_val = to_none(row.get("reviews.text"))
-
-            fb = Feedback(
-                product_id=pid,
-                user_id=uid,
-                rating=to_int(row.get("reviews.rating")),
-                title=to_none(row.get("reviews.title")),
-                text=text_val,
-                review_date=rev_date,
-                sentiment_label=None,
-                text_length=len(text_val) if isinstance(text_val, str) else 0,
-            )
-            db.add(fb)
-            created_feedback += 1
-
-            if i % 1000 == 0:
-                db.commit()
-                print(f"...processed {i} rows (new: products={created_products}, users={created_users}, feedback={created_feedback})")
-
-        db.commit()
+
+                with prof.stage("resolve_ids"):
+                    ids = []
+                    for row in records:
+                        # -------- PRODUCT (get or create) --------
+                        name = to_none(row.get("name"))
+                        address = to_none(row.get("address"))
+                        key = (name, address)
+
+                        pid = product_cache.get(key)
+                        if pid is None:
+                            prod = (
+                                db.query(Product)
+                                .filter(Product.name == name, Product.address == address)
+                                .first()
+                            )
+                            if prod is None:
+                                lat = to_float_or_none(row.get("latitude"))
+                                lon = to_float_or_none(row.get("longitude"))
+                                prod = Product(
+                                    name=name,
+                                    categories=to_none(row.get("categories")),
+                                    address=address,
+                                    city=to_none(row.get("city")),
+                                    province=to_none(row.get("province")),
+                                    country=to_none(row.get("country")),
+                                    postalCode=clean_postal(row.get("postalCode")),
+                                    latitude=lat,
+                                    longitude=lon,
+                                    geohash=geohash_encode(lat, lon),
+                                )
+                                db.add(prod)
+                                db.flush()  # obtain prod.id
+                                link_product_categories(db, prod.id, prod.categories, category_cache)
+                                created_products += 1
+                            pid = prod.id
+                            product_cache[key] = pid
+
+                        # -------- USER (get or create by username) --------
+                        username = to_none(row.get("reviews.username"))
+                        uid = None
+                        if username:
+                            uid = user_cache.get(username)
+                            if uid is None:
+                                u = db.query(User).filter(User.username == username).first()
+                                if u is None:
+                                    u = User(
+                                        username=username,
+                                        user_city=to_none(row.get("reviews.userCity")),
+                                        user_province=to_none(row.get("reviews.userProvince")),
+                                    )
+                                    db.add(u)
+                                    db.flush()
+                                    created_users += 1
+                                uid = u.id
+                                user_cache[username] = uid
+
+                        ids.append((pid, uid))
+
+                if labels is not None:
+                    with prof.stage("score"):
+                        scored = dict(zip(to_score, labels))  # waits for the pool, if any
+                        labels, versions, found = _labels_with_duplicates(db, scored, matches, SCORER_VERSION)
+
+                with prof.stage("insert"):
+                    rows = []
+                    for j, row in enumerate(records):
+                        pid, uid = ids[j]
+
+                        # -------- FEEDBACK (always create) --------
+                        rev_date = row.get("reviews.date")
+                        # NaT/NaN/None -> None; Timestamp -> datetime
+                        if pd.isna(rev_date):
+                            rev_date = None
+                        elif hasattr(rev_date, "to_pydatetime"):
+                            rev_date = rev_date.to_pydatetime()
+
+                        text_val = to_none(row.get("reviews.text"))
+
+                        fb = Feedback(
+                            product_id=pid,
+                            user_id=uid,
+                            rating=to_rating(row.get("reviews.rating")),
+                            review_date=rev_date,
+                            sentiment_label=labels[j] if labels is not None else None,
+                            scored_with_version=versions[j] if labels is not None else None,
+                            text_hash=text_hash(text_val) if labels is not None and labels[j] else None,
+                            text_length=len(text_val) if isinstance(text_val, str) else 0,
+                            duplicate_of=matches[j][1] if matches[j] and matches[j][0] == "id" else None,
+                            content=textstore.make(to_none(row.get("reviews.title")), text_val),
+                        )
+                        db.add(fb)
+                        rows.append(fb)
+                        rollup.add(pid, uid, fb.sentiment_label, fb.rating, rev_date, fb.text_length)
+                        created_feedback += 1
+                    db.flush()
+                    if deduper is not None:
+                        for fb, m in zip(rows, matches):
+                            if m and m[0] == "row":
+                                fb.duplicate_of = rows[m[1]].id   # original from this chunk
+                        deduper.index([fb.id for fb, m in zip(rows, matches) if m is None],
+                                      [s for s, m in zip(sigs, matches) if m is None])
+                    if labels is not None:
+                        with_aspects = {fb.id: a for fb, a in zip(rows, found) if a is not None}
+                        for fb, a in zip(rows, found):
+                            if a:
+                                rollup.reaspect(fb.product_id, None, a)
+                        aspects.store(db, with_aspects)
+                        prof.count("aspect_mentions", sum(len(a) for a in with_aspects.values()))
+                    rollup.apply(db)
+
+                with prof.stage("commit"):
+                    if not dry_run:
+                        db.commit()
+                prof.advance(read_rows)
+
+            if dry_run:
+                db.rollback()
+                print("🧪 Dry run: nothing was committed.")
+
         print(f"✅ Done. New products: {created_products}")
         print(f"✅ Done. New users: {created_users}")
         print(f"✅ Done. Feedback rows: {created_feedback}")
+        if deduper is not None:
+            deduper.report(policy)
 
     finally:
+        if executor is not None:
+            executor.shutdown()
         db.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Import products, users and feedback from CSV")
+    parser.add_argument("--source", default=CSV_PATH, help="CSV file to import")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per read/insert/commit batch")
+    parser.add_argument("--score", action="store_true", help="label sentiment during import")
+    parser.add_argument("--workers", type=int, default=None, help="scorer processes (with --score)")
+    parser.add_argument("--dedup", choices=DEDUP_POLICIES, default=None,
+                        help="near-duplicate reviews: link, skip or off (default: $DEDUP_POLICY)")
+    parser.add_argument("--dry-run", action="store_true", help="run everything, then roll back")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="write a cProfile/tracemalloc snapshot of the run")
+    args = parser.parse_args()
+    main(args.source, args.chunk_size, score=args.score, workers=args.workers, profile=args.profile,
+         dry_run=args.dry_run, dedup=args.dedup)
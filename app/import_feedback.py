@@ -2,7 +2,10 @@ import math
 import pandas as pd
 from sqlalchemy.orm import Session
 from .database import SessionLocal
+from .import_all import to_rating
+from . import textstore
 from .models import Product, User, Feedback
+from .rollups import RollupDelta
 
 # Path to your dataset
 CSV_PATH = "data/7282_1.csv"
@@ -22,7 +25,7 @@ def safe_len(s: str | None) -> int:
 
 
 # --- Main importer ---
-def main():
+def main(csv_path=CSV_PATH, chunk_size=500, dry_run=False):
     use_cols = [
         "name", "address", "city", "province", "country",
         "reviews.date", "reviews.rating", "reviews.text", "reviews.title",
@@ -31,7 +34,7 @@ def main():
 
     # Step 1 — Read CSV
     df = pd.read_csv(
-        CSV_PATH,
+        csv_path,
         usecols=use_cols,
         parse_dates=["reviews.date"],
         infer_datetime_format=True,
@@ -51,20 +54,13 @@ def main():
             df[c] = df[c].astype(str).str.strip()
             df[c] = df[c].replace({"nan": None, "None": None, "": None})
 
-    def to_int(x):
-        try:
-            if pd.isna(x):
-                return None
-            return int(float(x))
-        except Exception:
-            return None
-
-    df["reviews.rating"] = df["reviews.rating"].apply(to_int)
+    df["reviews.rating"] = df["reviews.rating"].apply(to_rating)
 
     # Step 3 — Database session
     db: Session = SessionLocal()
     created_users = 0
     created_feedback = 0
+    rollup = RollupDelta()
 
     try:
         for i, row in enumerate(df.to_dict(orient="records"), start=1):
@@ -100,27 +96,39 @@ def main():
 
             # feedback
             rev_date = col("reviews.date")
-            if hasattr(rev_date, "to_pydatetime"):
+            if pd.isna(rev_date):
+                rev_date = None  # NaT
+            elif hasattr(rev_date, "to_pydatetime"):
                 rev_date = rev_date.to_pydatetime()
 
             fb = Feedback(
                 product_id=prod.id,
                 user_id=(user.id if user else None),
                 rating=to_none(col("reviews.rating")),
-                title=to_none(col("reviews.title")),
-                text=to_none(col("reviews.text")),
                 review_date=rev_date,
                 sentiment_label=None,
                 text_length=safe_len(to_none(col("reviews.text"))),
+                content=textstore.make(to_none(col("reviews.title")), to_none(col("reviews.text"))),
             )
             db.add(fb)
+            rollup.add(prod.id, fb.user_id, None, fb.rating, rev_date, fb.text_length)
             created_feedback += 1
 
-            if i % 500 == 0:
-                db.commit()
+            if i % chunk_size == 0:
+                rollup.apply(db)
+                # dry run: just flush, rollback at the end
+                if dry_run:
+                    db.flush()
+                else:
+                    db.commit()
                 print(f"...processed {i} rows")
 
-        db.commit()
+        rollup.apply(db)
+        if dry_run:
+            db.rollback()
+            print("🧪 Dry run: nothing was committed.")
+        else:
+            db.commit()
         print(f"✅ Imported users: {created_users}")
         print(f"✅ Imported feedback: {created_feedback}")
 
@@ -2,7 +2,9 @@ import pandas as pd
 import math
 from sqlalchemy.orm import Session
 from .database import SessionLocal
+from .geo import encode as geohash_encode
 from .models import Product
+from .rollups import link_product_categories
 
 CSV_PATH = "data/7282_1.csv"
 
@@ -13,13 +15,13 @@ def to_none(x):
         return None
     return x
 
-def main():
+def main(csv_path=CSV_PATH, chunk_size=500, dry_run=False):
     # Read only the columns we need
     use_cols = [
         "name","categories","address","city","province","country",
         "postalCode","latitude","longitude"
     ]
-    df = pd.read_csv(CSV_PATH, usecols=use_cols)
+    df = pd.read_csv(csv_path, usecols=use_cols)
 
     # Clean NAs → None and strip whitespace
     for c in use_cols:
@@ -35,6 +37,7 @@ def main():
     db: Session = SessionLocal()
     try:
         created = 0
+        category_cache = {}
         for row in df.itertuples(index=False):
             # Skip if already exists (by name + address)
             exists = db.query(Product).filter(
@@ -44,6 +47,8 @@ def main():
             if exists:
                 continue
 
+            lat = float(getattr(row, "latitude")) if to_none(getattr(row, "latitude")) is not None else None
+            lon = float(getattr(row, "longitude")) if to_none(getattr(row, "longitude")) is not None else None
             prod = Product(
                 name=getattr(row, "name"),
                 categories=getattr(row, "categories"),
@@ -52,15 +57,25 @@ def main():
                 province=getattr(row, "province"),
                 country=getattr(row, "country"),
                 postalCode=getattr(row, "postalCode"),
-                latitude=(float(getattr(row, "latitude")) if to_none(getattr(row, "latitude")) is not None else None),
-                longitude=(float(getattr(row, "longitude")) if to_none(getattr(row, "longitude")) is not None else None),
+                latitude=lat,
+                longitude=lon,
+                geohash=geohash_encode(lat, lon),
             )
             db.add(prod)
+            db.flush()  # obtain prod.id
+            link_product_categories(db, prod.id, prod.categories, category_cache)
             created += 1
-            if created % 500 == 0:
-                db.commit()  # commit in batches
-        db.commit()
-        print(f"Imported products: {created}")
+            if created % chunk_size == 0:
+                # commit in batches (dry run: just flush, rollback at the end)
+                if dry_run:
+                    db.flush()
+                else:
+                    db.commit()
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        print(f"Imported products: {created}" + (" (dry run, rolled back)" if dry_run else ""))
     finally:
         db.close()
 
@@ -0,0 +1,193 @@
+# app/instrumentation.py
+"""
+Profiling helpers shared by the batch jobs (import_all, sentiment_analyzer).
+
+    with JobProfiler("import_all", total=rows, profile="cprofile") as prof:
+        with prof.stage("read"):
+            ...
+        prof.advance(len(chunk))
+
+Reports per-stage wall time, rows/sec and ETA (tqdm), the process memory
+high-water mark, and which side the run was bound by (DB, parsing or
+scoring). With profile="cprofile" or "tracemalloc" a snapshot of the whole
+run is written to PROFILE_DIR.
+
+Progress listeners (add_progress_listener) are called with the profiler on
+every stage entry, set_total() and advance(); the job worker (app.jobs)
+uses one to persist progress, and raises from it to cancel a run.
+"""
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from tqdm import tqdm
+
+try:
+    import resource  # Unix only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# which bottleneck each stage counts towards in the summary
+STAGE_GROUPS = {
+    "read": "parsing",
+    "clean": "parsing",
+    "resolve_ids": "db",
+    "query": "db",
+    "insert": "db",
+    "commit": "db",
+    "score": "scoring",
+    "dedup": "dedup",
+    "throttle": "throttle",
+}
+
+
+_listeners = []
+
+
+def add_progress_listener(fn):
+    _listeners.append(fn)
+
+
+def remove_progress_listener(fn):
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+
+def peak_rss_mb():
+    """Process memory high-water mark in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 / 1024 if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def count_csv_rows(path):
+    """Fast line-count estimate of data rows (for ETA only; quoted newlines overcount)."""
+    n = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            n += block.count(b"\n")
+    return max(0, n - 1)
+
+
+class JobProfiler:
+    def __init__(self, name, total=None, unit="rows", profile=None, profile_dir=PROFILE_DIR):
+        if profile not in (None, *PROFILE_MODES):
+            raise ValueError(f"profile must be one of {PROFILE_MODES}, got {profile!r}")
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.stages = defaultdict(float)
+        self.done = 0
+        self.counters = {}     # job-specific tallies, e.g. duplicates found (see count())
+        self.current_stage = None
+        self.elapsed = None
+        self._bar = None
+        self._profiler = None
+
+    # ---------- lifecycle ----------
+    def __enter__(self):
+        if self.profile == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == "tracemalloc":
+            import tracemalloc
+            tracemalloc.start(25)
+        self._bar = tqdm(total=self.total, unit=self.unit, desc=self.name, dynamic_ncols=True)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._started
+        self._bar.close()
+        self._dump_profile()
+        self.report()
+        return False
+
+    # ---------- measuring ----------
+    def _notify(self):
+        for fn in list(_listeners):
+            fn(self)
+
+    @contextmanager
+    def stage(self, name):
+        self.current_stage = name
+        self._notify()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - t0
+
+    def set_total(self, total):
+        self.total = total
+        self._bar.total = total
+        self._bar.refresh()
+        self._notify()
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def advance(self, n):
+        self.done += n
+        self._bar.update(n)
+        rss = peak_rss_mb()
+        if rss is not None:
+            self._bar.set_postfix(peak_mb=f"{rss:.0f}", refresh=False)
+        self._notify()
+
+    # ---------- output ----------
+    def summary(self):
+        groups = defaultdict(float)
+        for stage, secs in self.stages.items():
+            groups[STAGE_GROUPS.get(stage, "other")] += secs
+        return {
+            "job": self.name,
+            "rows": self.done,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_sec": round(self.done / self.elapsed, 1) if self.elapsed else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": {k: round(v, 3) for k, v in self.stages.items()},
+            "bound_by": max(groups, key=groups.get) if groups else None,
+            "counters": dict(self.counters),
+        }
+
+    def report(self):
+        s = self.summary()
+        peak = f", peak RSS {s['peak_rss_mb']:.0f} MB" if s["peak_rss_mb"] is not None else ""
+        print(f"⏱  {self.name}: {s['rows']} {self.unit} in {s['seconds']:.1f}s "
+              f"({s['rows_per_sec']} {self.unit}/s){peak}")
+        for stage, secs in sorted(self.stages.items(), key=lambda kv: -kv[1]):
+            pct = secs / self.elapsed * 100 if self.elapsed else 0.0
+            print(f"   {stage:<12} {secs:8.2f}s  {pct:5.1f}%")
+        if s["bound_by"]:
+            print(f"   bound by: {s['bound_by']}")
+
+    def _dump_profile(self):
+        if self.profile is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, f"{self.name}-{datetime.now():%Y%m%d-%H%M%S}")
+        if self.profile == "cprofile":
+            self._profiler.disable()
+            path = base + ".prof"
+            self._profiler.dump_stats(path)  # open with pstats / snakeviz
+        else:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            path = base + ".tracemalloc"
+            snapshot.dump(path)  # tracemalloc.Snapshot.load(path)
+            with open(base + ".top.txt", "w") as f:
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+        print(f"📝 {self.profile} snapshot written to {path}")
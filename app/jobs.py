@@ -0,0 +1,377 @@
+# app/jobs.py
+"""
+Background job queue for imports and scoring, backed by the app database.
+
+    POST /jobs/import, POST /jobs/score    -> queued row in `jobs`
+    python -m app.cli jobs worker -p 2     -> claims and runs them
+    GET /jobs/{id}                         -> status, stage, progress
+    POST /jobs/{id}/cancel                 -> stops it at the next stage/batch
+
+Jobs never run inside the API workers. Each worker process runs one job at
+a time, so `--processes` bounds the concurrency per host. Jobs with the same
+lock_key never overlap and run in submit order: claiming inserts a
+job_locks row, and the primary key makes that atomic on every backend.
+Imports and scoring share the "feedback" lock, so a score job queued
+behind an import sees its rows.
+
+While a job runs, a reporter thread writes heartbeat, stage and progress
+(collected from JobProfiler through a progress listener) every
+HEARTBEAT_SECONDS and reads cancel_requested. Cancelling raises
+JobCancelled inside the job at its next stage or batch. The batch in
+flight rolls back, and committed batches stay, together with their
+rollups. A job whose heartbeat is older than STALE_SECONDS is marked
+failed and its lock is released, so a killed worker does not block the
+queue.
+
+CLI runs of the same work (`app.cli import ...`, `score`) go through
+cli_job(): they are recorded as running jobs and take the same lock.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from .database import SessionLocal
+from .models import Job, JobLock
+
+log = logging.getLogger("app.jobs")
+
+HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "2"))
+STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+POLL_SECONDS = 2.0
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+# import sources must live here: job params come from HTTP clients
+DATA_DIR = Path(os.getenv("JOB_DATA_DIR", str(BASE_DIR / "data"))).resolve()
+# parameter bounds for queued jobs (checked in app.schemas and again by the runners)
+MAX_WORKERS = int(os.getenv("SCORER_WORKERS", os.cpu_count() or 1))
+MAX_BATCH = 100_000
+
+STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# =========================
+# RUNNERS
+# - params are the JSON stored at submit time; heavy modules load here only
+# =========================
+def resolve_source(source):
+    """Absolute path of an import CSV; ValueError unless it is inside DATA_DIR."""
+    path = Path(source)
+    if not path.is_absolute():
+        path = BASE_DIR / path
+    path = path.resolve()   # also follows symlinks out of DATA_DIR
+    if not path.is_relative_to(DATA_DIR):
+        raise ValueError(f"source must be a file under {DATA_DIR}")
+    return str(path)
+
+
+def _check_bounds(params):
+    # rows queued before the API validated them
+    for key, hi in (("chunk_size", MAX_BATCH), ("batch_size", MAX_BATCH), ("workers", MAX_WORKERS)):
+        if key in params and not 1 <= params[key] <= hi:
+            raise ValueError(f"{key} must be between 1 and {hi}")
+    if params.get("max_rate") is not None and params["max_rate"] <= 0:
+        raise ValueError("max_rate must be > 0")
+
+
+def run_import(params):
+    from . import import_all
+    _check_bounds(params)
+    kwargs = {k: params[k] for k in ("chunk_size", "score", "workers", "dry_run", "dedup") if k in params}
+    if params.get("source"):
+        kwargs["csv_path"] = resolve_source(params["source"])
+    import_all.main(**kwargs)
+
+
+def run_score(params):
+    from . import sentiment_analyzer
+    _check_bounds(params)
+    common = {k: params[k] for k in ("batch_size", "workers", "dry_run") if k in params}
+    if params.get("rescore"):
+        sentiment_analyzer.rescore(
+            max_rows_per_sec=params.get("max_rate"), verify_text=params.get("verify_text", False),
+            **common,
+        )
+    else:
+        sentiment_analyzer.main(**common)
+
+
+# kind -> (runner, relabel flag for the store refresh afterwards)
+KINDS = {
+    "import": (run_import, lambda params: False),
+    "score": (run_score, lambda params: bool(params.get("rescore"))),
+}
+LOCK_KEYS = {"import": "feedback", "score": "feedback"}
+
+
+# =========================
+# QUEUE OPERATIONS
+# =========================
+def submit(db, kind, params):
+    if kind not in KINDS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    job = Job(kind=kind, params=json.dumps(params), lock_key=LOCK_KEYS[kind], status="queued",
+              cancel_requested=False, progress_done=0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def cancel(db, job_id):
+    """Cancel a queued job now, or ask a running one to stop. Returns the job (None if unknown)."""
+    job = db.query(Job).get(job_id)
+    if job is None:
+        return None
+    db.execute(
+        update(Job).where(Job.id == job_id, Job.status.in_(("queued", "running")))
+        .values(cancel_requested=True)
+    )
+    # still queued (no worker claimed it meanwhile): cancelled right away
+    db.execute(
+        update(Job).where(Job.id == job_id, Job.status == "queued")
+        .values(status="cancelled", finished_at=datetime.utcnow())
+    )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def reap_stale(db):
+    """Fail running jobs whose worker stopped heartbeating and release their locks."""
+    cutoff = datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+    stale = db.query(Job).filter(Job.status == "running", Job.heartbeat_at < cutoff).all()
+    for job in stale:
+        job.status = "failed"
+        job.error = f"worker {job.worker} stopped heartbeating"
+        job.finished_at = datetime.utcnow()
+        db.query(JobLock).filter(JobLock.job_id == job.id).delete(synchronize_session=False)
+    db.commit()
+    return len(stale)
+
+
+def claim(db, worker_id):
+    """Take the oldest queued job whose lock is free; returns it, or None."""
+    reap_stale(db)
+    held = [k for (k,) in db.query(JobLock.lock_key)]
+    q = db.query(Job.id, Job.lock_key).filter(Job.status == "queued")
+    if held:
+        q = q.filter(Job.lock_key.notin_(held))
+    candidates = q.order_by(Job.id).limit(20).all()
+    for job_id, lock_key in candidates:
+        try:
+            db.add(JobLock(lock_key=lock_key, job_id=job_id))
+            db.commit()
+        except IntegrityError:
+            db.rollback()   # another worker got this lock first
+            continue
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(Job).where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", worker=worker_id, started_at=now, heartbeat_at=now)
+        ).rowcount
+        if claimed:
+            db.commit()
+            return db.query(Job).get(job_id)
+        # cancelled or claimed elsewhere between the two statements
+        db.query(JobLock).filter(JobLock.job_id == job_id).delete(synchronize_session=False)
+        db.commit()
+    return None
+
+
+# =========================
+# RUNNING A JOB
+# =========================
+class _Reporter(threading.Thread):
+    """Writes heartbeat/progress for one job and watches for cancellation."""
+
+    def __init__(self, job_id):
+        super().__init__(daemon=True, name=f"job-{job_id}-reporter")
+        self.job_id = job_id
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.profiler = None   # last JobProfiler seen by the listener
+
+    def listener(self, prof):
+        self.profiler = prof
+        if self.cancelled.is_set():
+            raise JobCancelled(f"job {self.job_id} cancelled")
+
+    def run(self):
+        while not self.finished.wait(HEARTBEAT_SECONDS):
+            try:
+                self.flush()
+            except Exception:
+                # e.g. SQLite busy while the job commits; try again next beat
+                log.warning("job %s: progress update failed", self.job_id, exc_info=True)
+
+    def flush(self):
+        values = {"heartbeat_at": datetime.utcnow()}
+        prof = self.profiler
+        if prof is not None:
+            values.update(progress_done=prof.done, progress_total=prof.total, stage=prof.current_stage)
+        db = SessionLocal()
+        try:
+            db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            if db.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar():
+                self.cancelled.set()
+            db.commit()
+        finally:
+            db.close()
+
+
+def run(job):
+    """Execute a claimed job in this process and record the outcome."""
+    from .instrumentation import add_progress_listener, remove_progress_listener
+
+    params = json.loads(job.params or "{}")
+    runner, relabel = KINDS[job.kind]
+    reporter = _Reporter(job.id)
+    add_progress_listener(reporter.listener)
+    reporter.start()
+    status, error = "succeeded", None
+    try:
+        runner(params)
+        if params.get("refresh_store", True) and not params.get("dry_run"):
+            from . import store_loader
+            store_loader.refresh(relabel=relabel(params))
+    except JobCancelled:
+        status = "cancelled"
+    except Exception:
+        status, error = "failed", traceback.format_exc()[-4000:]
+    finally:
+        remove_progress_listener(reporter.listener)
+        reporter.finished.set()
+        reporter.join()
+
+    _finish(job.id, reporter.profiler, status, error)
+    print(f"{'✅' if status == 'succeeded' else '⚠️ '} job {job.id} ({job.kind}) {status}")
+    return status
+
+
+def _finish(job_id, prof, status, error):
+    """Record the outcome and release the job's lock."""
+    values = {"status": status, "error": error, "finished_at": datetime.utcnow(), "heartbeat_at": datetime.utcnow()}
+    if prof is not None:
+        values.update(progress_done=prof.done, progress_total=prof.total, stage=prof.current_stage)
+        if prof.elapsed is not None:
+            values["result"] = json.dumps(prof.summary())
+    db = SessionLocal()
+    try:
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.query(JobLock).filter(JobLock.job_id == job_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class JobLocked(Exception):
+    pass
+
+
+@contextmanager
+def cli_job(kind, params):
+    """
+    Run CLI work (`python -m app.cli import ...`, `score`) as a job of `kind`:
+    it holds the same lock as queued jobs, so neither overlaps the other,
+    shows up in GET /jobs with progress, and can be cancelled there.
+    Raises JobLocked if the lock is taken.
+    """
+    from .instrumentation import add_progress_listener, remove_progress_listener
+
+    lock_key = LOCK_KEYS[kind]
+    db = SessionLocal()
+    try:
+        reap_stale(db)
+        now = datetime.utcnow()
+        job = Job(kind=kind, params=json.dumps(params), lock_key=lock_key, status="running",
+                  worker=f"cli:{socket.gethostname()}:{os.getpid()}", started_at=now, heartbeat_at=now,
+                  cancel_requested=False, progress_done=0)
+        db.add(job)
+        db.commit()
+        job_id = job.id
+        try:
+            db.add(JobLock(lock_key=lock_key, job_id=job_id))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            holder = db.query(JobLock.job_id).filter(JobLock.lock_key == lock_key).scalar()
+            db.query(Job).filter(Job.id == job_id).delete(synchronize_session=False)
+            db.commit()
+            raise JobLocked(f"the {lock_key!r} lock is held by job {holder}; try again when it finishes")
+    finally:
+        db.close()
+
+    reporter = _Reporter(job_id)
+    add_progress_listener(reporter.listener)
+    reporter.start()
+    status, error = "succeeded", None
+    try:
+        yield job_id
+    except JobCancelled:
+        status = "cancelled"
+        print(f"⚠️  job {job_id} cancelled")
+    except BaseException:
+        status, error = "failed", traceback.format_exc()[-4000:]
+        raise
+    finally:
+        remove_progress_listener(reporter.listener)
+        reporter.finished.set()
+        reporter.join()
+        _finish(job_id, reporter.profiler, status, error)
+
+
+def worker_loop(once=False, poll_seconds=POLL_SECONDS):
+    """Claim and run jobs one at a time until interrupted (or the queue is empty, with once=True)."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"👷 job worker {worker_id} polling every {poll_seconds}s")
+    while True:
+        db = SessionLocal()
+        try:
+            job = claim(db, worker_id)
+            if job is not None:
+                db.expunge(job)
+        finally:
+            db.close()
+        if job is not None:
+            print(f"▶️  job {job.id} ({job.kind}) claimed")
+            run(job)
+            continue
+        if once:
+            return
+        time.sleep(poll_seconds)
+
+
+def work(processes=1, once=False, poll_seconds=POLL_SECONDS):
+    """Run `processes` worker loops (each one job at a time)."""
+    if processes <= 1:
+        worker_loop(once, poll_seconds)
+        return
+    import multiprocessing
+
+    procs = [
+        multiprocessing.Process(target=worker_loop, args=(once, poll_seconds), name=f"job-worker-{i}")
+        for i in range(processes)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
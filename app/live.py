@@ -0,0 +1,233 @@
+# app/live.py
+"""
+Live sentiment push for dashboards: the /ws/sentiment WebSocket.
+
+Import and scoring jobs write one sentiment_events row per committed batch
+(app.rollups). Each API worker runs a single hub task while it has
+clients connected:
+
+- on start it reads the overview totals and the newest event id in one
+  transaction. Totals come from the rollups (the overall sentiment_monthly
+  series, a few hundred rows), which batches update in the same
+  transaction as their event; never from a feedback scan, and not from
+  the shared snapshot, which lags running jobs
+- every BROADCAST_SECONDS it reads the events newer than its cursor (one
+  indexed range query), coalesces them into one delta message, updates its
+  running totals and sends the same pre-serialized text to every client
+
+So the database sees one cheap poll per worker per interval, whatever the
+number of viewers. New clients get the hub's current totals without a
+query. Totals are reloaded right away on a resync event (rollup rebuild,
+archived or restored year, see rollups.write_resync_event) and every
+RESYNC_SECONDS to heal drift (events committed out of id order by
+concurrent jobs).
+
+Messages (JSON):
+
+    {"type": "snapshot", "cursor": 41, "totals": {...}, "product_fields": [...]}
+    {"type": "delta", "cursor": 45, "totals": {...}, "products": {"12": [1, 0, 0, 1]}}
+
+`products` holds per-product changes in `product_fields` order; it is
+left out (with "truncated": true) when a batch touched too many products,
+in which case clients should refetch what they display.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+log = logging.getLogger("app.live")
+
+BROADCAST_SECONDS = float(os.getenv("LIVE_BROADCAST_SECONDS", "1.0"))
+RESYNC_SECONDS = float(os.getenv("LIVE_RESYNC_SECONDS", "60"))
+SEND_TIMEOUT_SECONDS = 5.0     # slower clients are dropped
+MAX_EVENTS_PER_TICK = 500
+MAX_PRODUCTS_PER_MESSAGE = 5000
+FIELDS = ("positive", "neutral", "negative", "total")
+
+router = APIRouter(tags=["Live"])
+
+
+def _dumps(message):
+    return json.dumps(message, separators=(",", ":"))
+
+
+# =========================
+# DB ACCESS (sync, run in the threadpool)
+# =========================
+def _load_totals():
+    """(overview totals, last event id) read in one transaction, so they describe the same point."""
+    from sqlalchemy import func
+    from .database import SessionLocal
+    from .models import SentimentEvent
+    from .rollups import overview_from_rollups
+
+    db = SessionLocal()
+    try:
+        cursor = db.query(func.max(SentimentEvent.id)).scalar() or 0
+        return overview_from_rollups(db), cursor
+    finally:
+        db.close()
+
+
+def _read_events(cursor):
+    from .database import SessionLocal
+    from .models import SentimentEvent
+
+    db = SessionLocal()
+    try:
+        return (
+            db.query(SentimentEvent.id, SentimentEvent.payload)
+            .filter(SentimentEvent.id > cursor)
+            .order_by(SentimentEvent.id)
+            .limit(MAX_EVENTS_PER_TICK)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def coalesce(payloads):
+    """Merge event payloads into (totals delta, {product_id: delta} or None if truncated)."""
+    totals = [0] * len(FIELDS)
+    products = {}
+    truncated = False
+    for p in payloads:
+        for i, d in enumerate(p["t"]):
+            totals[i] += d
+        if p.get("truncated"):
+            truncated = True
+        if truncated:
+            continue
+        for pid, v in p.get("p", {}).items():
+            acc = products.setdefault(pid, [0] * len(FIELDS))
+            for i, d in enumerate(v):
+                acc[i] += d
+        if len(products) > MAX_PRODUCTS_PER_MESSAGE:
+            truncated = True
+    return totals, (None if truncated else products)
+
+
+# =========================
+# HUB (one per worker process)
+# =========================
+class Hub:
+    def __init__(self):
+        self.clients = set()
+        self.totals = None
+        self.cursor = 0
+        self.synced_at = 0.0
+        self.task = None
+        self.ready = asyncio.Event()
+
+    async def connect(self, ws):
+        """Register a client and send it the current totals; False if the hub failed."""
+        await ws.accept()
+        self.clients.add(ws)
+        if self.task is None or self.task.done():
+            self.ready = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+        await self.ready.wait()
+        if ws not in self.clients:
+            return False
+        await ws.send_text(_dumps({
+            "type": "snapshot", "cursor": self.cursor, "totals": self.totals,
+            "product_fields": list(FIELDS),
+        }))
+        return True
+
+    def disconnect(self, ws):
+        self.clients.discard(ws)
+
+    async def _resync(self):
+        self.totals, self.cursor = await run_in_threadpool(_load_totals)
+        self.synced_at = time.monotonic()
+
+    async def _run(self):
+        try:
+            await self._resync()
+            self.ready.set()
+            while self.clients:
+                await asyncio.sleep(BROADCAST_SECONDS)
+                if time.monotonic() - self.synced_at > RESYNC_SECONDS:
+                    old = (dict(self.totals), self.cursor)
+                    await self._resync()
+                    if (self.totals, self.cursor) != old:
+                        # per-product changes since the last tick are not known here
+                        await self._broadcast({"type": "delta", "cursor": self.cursor,
+                                               "totals": self.totals, "truncated": True})
+                    continue
+                await self.tick()
+        except Exception:
+            log.exception("live hub stopped")
+            for ws in list(self.clients):
+                await ws.close(code=1011)
+            self.clients.clear()
+        finally:
+            self.ready.set()
+
+    async def tick(self):
+        """Read new events once and push one coalesced delta to everyone."""
+        rows = await run_in_threadpool(_read_events, self.cursor)
+        if not rows:
+            return
+        payloads = [json.loads(r.payload) for r in rows]
+        if any(p.get("resync") for p in payloads):
+            # a rollup rebuild or an archived/restored year: reload instead of adding up
+            await self._resync()
+            await self._broadcast({"type": "delta", "cursor": self.cursor,
+                                   "totals": self.totals, "truncated": True})
+            return
+        self.cursor = rows[-1].id
+        totals, products = coalesce(payloads)
+        if not any(totals) and products == {}:
+            return   # aspect-only batches: nothing the dashboards show
+        for name, d in zip(FIELDS, totals):
+            self.totals[name] = self.totals.get(name, 0) + d
+        message = {"type": "delta", "cursor": self.cursor, "totals": self.totals}
+        if products is None:
+            message["truncated"] = True
+        else:
+            message["products"] = products
+        await self._broadcast(message)
+
+    async def _broadcast(self, message):
+        text = _dumps(message)   # serialized once for all clients
+
+        async def send(ws):
+            try:
+                await asyncio.wait_for(ws.send_text(text), SEND_TIMEOUT_SECONDS)
+            except Exception:
+                self.clients.discard(ws)
+
+        await asyncio.gather(*(send(ws) for ws in list(self.clients)))
+
+    async def stop(self):
+        self.clients.clear()
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+
+hub = Hub()
+
+
+@router.websocket("/ws/sentiment")
+async def sentiment_ws(websocket: WebSocket):
+    if not await hub.connect(websocket):
+        return
+    try:
+        while True:
+            # clients have nothing to say; this just notices disconnects
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.disconnect(websocket)
@@ -1,11 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.database import dispose_engine, get_engine
 from app.routes_products import router as products_router
 from app.routes_users import router as users_router
 from app.routes_feedback import router as feedback_router
 from app.routes_feedback_sentiment import router as sentiment_router
 from app.routes_feedback_summary import router as summary_router
+from app.routes_analytics import router as analytics_router
+from app.live import hub as live_hub, router as live_router
+from app.routes_jobs import router as jobs_router
+from app.metrics import instrument as instrument_engine, router as metrics_router, perf_middleware
+from app.http_cache import ResponseMiddleware
 
-app = FastAPI(title="Sentiment System", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # engine + pool are created here, not when app.database is imported
+    instrument_engine(get_engine())
+    yield
+    await live_hub.stop()
+    dispose_engine()
+
+app = FastAPI(title="Sentiment System", version="0.1.0", lifespan=lifespan)
+
+# gzip/br negotiation + cached encoded bodies for the aggregate routes (see app.http_cache)
+app.add_middleware(ResponseMiddleware)
+# per-route latency, SQL counts/time and Server-Timing headers (see /metrics);
+# added last so it is the outermost layer and also times the one above
+app.middleware("http")(perf_middleware)
 
 @app.get("/")
 def root():
@@ -16,9 +37,15 @@ def health():
     return {"status": "ok"}
 
 # NEW: include routers
+# (they must stay light to import: no pandas / TextBlob / NLTK at module
+# level, scoring code imports them on first use; checked by bench.startup)
 app.include_router(products_router)
 app.include_router(users_router)
 app.include_router(feedback_router)
 app.include_router(sentiment_router)
 app.include_router(summary_router) 
+app.include_router(analytics_router)
+app.include_router(live_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
 
@@ -0,0 +1,206 @@
+# app/metrics.py
+"""
+Request-level performance instrumentation.
+
+- per-route latency histograms (route template, method, status)
+- SQLAlchemy cursor hooks counting queries and DB time per request
+- N+1 detection: one statement repeated many times within a request
+- slow statement counter + warning log
+- `Server-Timing` header on every response
+- `/metrics` in Prometheus text format (no external services needed)
+
+Counters live in process memory, so with several uvicorn workers each
+worker reports its own numbers (Prometheus sums them per instance).
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+log = logging.getLogger("app.metrics")
+
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.2"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+router = APIRouter(tags=["Metrics"])
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        out = []
+        cumulative = 0
+        for b, c in zip(self.buckets, self.counts):
+            cumulative += c
+            out.append(f'{name}_bucket{{{labels},le="{b}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+class RequestDBStats:
+    """Per-request DB counters, reachable from the cursor hooks via a ContextVar."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    @property
+    def route(self):
+        # template ("/sentiment/product/{product_id}"), not the raw path, to
+        # keep label cardinality bounded; set by the router once matched
+        route = self.scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+
+_lock = threading.Lock()
+_request_latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))   # (method, route, status)
+_request_db_time = defaultdict(lambda: Histogram(LATENCY_BUCKETS))   # (method, route)
+_request_queries = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+_query_latency = Histogram(LATENCY_BUCKETS)
+_slow_queries = Counter()     # route
+_n_plus_one = Counter()       # route
+
+_current: ContextVar = ContextVar("request_db_stats", default=None)
+
+
+# =========================
+# SQLALCHEMY HOOKS
+# - attached to the API's engine by instrument() (lifespan handler), so
+#   batch jobs and the CLI run without them
+# - the start time lives on the statement's execution context: a statement
+#   that fails never reaches after_cursor_execute and leaves nothing behind
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    stats = _current.get()
+    with _lock:
+        _query_latency.observe(elapsed)
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+    if elapsed >= SLOW_QUERY_SECONDS:
+        log.warning("slow query (%.1f ms): %s", elapsed * 1000, statement[:500])
+        with _lock:
+            _slow_queries[stats.route if stats is not None else "-"] += 1
+
+
+def instrument(engine):
+    """Attach the cursor hooks to `engine` (once)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+async def perf_middleware(request: Request, call_next):
+    stats = RequestDBStats(request.scope)
+    token = _current.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+    elapsed = time.perf_counter() - started
+
+    route = stats.route
+    method = request.method
+
+    repeated = [s for s, n in stats.statements.items() if n >= N_PLUS_ONE_THRESHOLD]
+    with _lock:
+        _request_latency[(method, route, response.status_code)].observe(elapsed)
+        _request_db_time[(method, route)].observe(stats.seconds)
+        _request_queries[(method, route)].observe(stats.queries)
+        if repeated:
+            _n_plus_one[route] += 1
+    for s in repeated:
+        log.warning(
+            "possible N+1 on %s %s: statement ran %d times: %s",
+            method, route, stats.statements[s], s[:300],
+        )
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.seconds * 1000:.2f};desc="{stats.queries} queries", '
+        f"app;dur={(elapsed - stats.seconds) * 1000:.2f}, "
+        f"total;dur={elapsed * 1000:.2f}"
+    )
+    return response
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        lines.append("# HELP http_request_duration_seconds Request latency by route.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route, status), h in sorted(_request_latency.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            lines += h.lines("http_request_duration_seconds", labels)
+
+        lines.append("# HELP http_request_db_seconds DB time spent per request.")
+        lines.append("# TYPE http_request_db_seconds histogram")
+        for (method, route), h in sorted(_request_db_time.items()):
+            lines += h.lines("http_request_db_seconds", f'method="{method}",route="{_escape(route)}"')
+
+        lines.append("# HELP http_request_db_queries SQL statements executed per request.")
+        lines.append("# TYPE http_request_db_queries histogram")
+        for (method, route), h in sorted(_request_queries.items()):
+            lines += h.lines("http_request_db_queries", f'method="{method}",route="{_escape(route)}"')
+
+        lines.append("# HELP db_query_duration_seconds Duration of individual SQL statements.")
+        lines.append("# TYPE db_query_duration_seconds histogram")
+        lines += _query_latency.lines("db_query_duration_seconds", 'engine="default"')
+
+        lines.append(f"# HELP db_slow_queries_total Statements slower than {SLOW_QUERY_SECONDS}s.")
+        lines.append("# TYPE db_slow_queries_total counter")
+        for route, n in sorted(_slow_queries.items()):
+            lines.append(f'db_slow_queries_total{{route="{_escape(route)}"}} {n}')
+
+        lines.append(
+            f"# HELP db_n_plus_one_total Requests repeating one statement >= {N_PLUS_ONE_THRESHOLD} times."
+        )
+        lines.append("# TYPE db_n_plus_one_total counter")
+        for route, n in sorted(_n_plus_one.items()):
+            lines.append(f'db_n_plus_one_total{{route="{_escape(route)}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Float
 from .database import Base
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, BigInteger, Double, Boolean, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -20,9 +20,11 @@ class Product(Base):
     postalCode = Column(String(20))
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(String(12), index=True)  # from latitude/longitude, see app.geo
 
     # Relation to feedback table
     feedbacks = relationship("Feedback", back_populates="product")
+    category_links = relationship("ProductCategory", back_populates="product")
 
 class User(Base):
     __tablename__ = "users"
@@ -45,13 +47,227 @@ class Feedback(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
 
     rating = Column(Integer)                 # 1–5 from the CSV
-    title = Column(String(255))
-    text = Column(Text)
-    review_date = Column(DateTime)          # from reviews.date
+    review_date = Column(DateTime, index=True)  # from reviews.date; partition key (app.partitioning)
     sentiment_label = Column(String(20))    # "positive"/"neutral"/"negative" (computed later)
-    text_length = Column(Integer)           # for correlation analysis
+    scored_with_version = Column(String(64), index=True)  # SCORER_VERSION that produced sentiment_label
+    text_hash = Column(String(40))          # sha1 of the text that was scored
+    text_length = Column(Integer)           # for correlation analysis (app.correlation)
+    duplicate_of = Column(Integer, index=True)  # feedback.id of the original (app.dedup); no FK, see FeedbackText
     created_at = Column(DateTime, default=datetime.utcnow)
     
     #Relationship
     user = relationship("User", back_populates="feedbacks")
     product = relationship("Product", back_populates="feedbacks")
+    # title/text live in feedback_text so aggregate scans stay on narrow rows (app.textstore)
+    content = relationship(
+        "FeedbackText", primaryjoin="Feedback.id == foreign(FeedbackText.feedback_id)",
+        uselist=False, lazy="select",
+    )
+
+    __table_args__ = (
+        # per-product date windows (recent reviews, archival) as one range scan
+        Index("ix_feedback_product_review_date", "product_id", "review_date"),
+    )
+
+
+class FeedbackText(Base):
+    """
+    Title and review text of one feedback row, kept out of `feedback`.
+    body is the text encoded by app.textstore (codec "plain" = UTF-8, "zlib").
+    No FK to feedback: MySQL refuses FKs on (and to) partitioned tables.
+    """
+    __tablename__ = "feedback_text"
+
+    feedback_id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(255))
+    codec = Column(String(10), nullable=False, default="plain")
+    body = Column(LargeBinary(16_777_215))   # MEDIUMBLOB on MySQL
+
+
+class FeedbackMinhash(Base):
+    """MinHash signature of an original review text (app.dedup)."""
+    __tablename__ = "feedback_minhash"
+
+    feedback_id = Column(Integer, primary_key=True, autoincrement=False)
+    signature = Column(LargeBinary(1024), nullable=False)   # NUM_PERM uint32 values
+
+
+class MinhashBucket(Base):
+    """LSH band buckets of feedback_minhash signatures; looked up by bucket."""
+    __tablename__ = "minhash_buckets"
+
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    feedback_id = Column(Integer, primary_key=True, autoincrement=False)
+
+
+# =========================
+# CATEGORIES
+# - Product.categories split into rows at import (see app.rollups)
+# =========================
+class Category(Base):
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True, index=True)
+
+
+class ProductCategory(Base):
+    __tablename__ = "product_category"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True, index=True)
+
+    product = relationship("Product", back_populates="category_links")
+    category = relationship("Category")
+
+
+# =========================
+# ROLLUPS
+# - maintained by the import/scoring jobs, rebuilt by `app.cli rollup rebuild`
+# =========================
+class CategorySentiment(Base):
+    __tablename__ = "category_sentiment"
+
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    products = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0, index=True)   # all feedback, scored or not
+    rating_sum = Column(BigInteger, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+
+
+class UserReviewStats(Base):
+    __tablename__ = "user_review_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    positive = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0, index=True)   # reviews written
+    rating_sum = Column(BigInteger, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    # derived from the counters on every update, stored so /users/top can sort by index
+    avg_rating = Column(Float, index=True)
+    negative_pct = Column(Float, index=True)           # of scored reviews
+    first_review_date = Column(DateTime)
+    last_review_date = Column(DateTime, index=True)
+
+
+class FeedbackAspect(Base):
+    """Aspect label of one review (app.aspects); only mentioned aspects have a row."""
+    __tablename__ = "feedback_aspects"
+
+    feedback_id = Column(Integer, primary_key=True, autoincrement=False)
+    aspect = Column(String(20), primary_key=True)
+    label = Column(String(20), nullable=False)
+
+
+class ProductAspect(Base):
+    """Per product and aspect: reviews mentioning it, by the aspect's label. Backs /sentiment/product/{id}/aspects."""
+    __tablename__ = "product_aspects"
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    aspect = Column(String(20), primary_key=True)
+    positive = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+
+class SentimentMonthly(Base):
+    """Label counts per product and review month; product_id 0 = all feedback. Backs the trend routes."""
+    __tablename__ = "sentiment_monthly"
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    period = Column(String(7), primary_key=True)     # "YYYY-MM" of review_date
+    positive = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+
+class CorrelationMoments(Base):
+    """Running moments of one variable pair (see app.correlation); product_id 0 = all feedback."""
+    __tablename__ = "correlation_moments"
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    pair = Column(String(20), primary_key=True)   # "length_rating" | "length_sentiment" | "rating_sentiment"
+    n = Column(BigInteger, nullable=False, default=0)
+    mean_x = Column(Double, nullable=False, default=0.0)
+    mean_y = Column(Double, nullable=False, default=0.0)
+    m2_x = Column(Double, nullable=False, default=0.0)     # sum of squared deviations
+    m2_y = Column(Double, nullable=False, default=0.0)
+    c_xy = Column(Double, nullable=False, default=0.0)     # sum of co-deviations
+
+
+class CorrelationHistogram(Base):
+    """Joint counts text_length bucket x rating x label; product_id 0 = all feedback."""
+    __tablename__ = "correlation_histogram"
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    length_bin = Column(Integer, primary_key=True, autoincrement=False)   # index into TEXT_LENGTH_BUCKETS
+    rating = Column(Integer, primary_key=True, autoincrement=False)       # correlation.NO_RATING (-1) = none
+    label = Column(Integer, primary_key=True, autoincrement=False)        # analytics.LABEL_CODES, 0 = unscored
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+# =========================
+# LIVE EVENTS
+# - one row per committed job batch, read by the /ws/sentiment hub (app.live)
+# =========================
+class SentimentEvent(Base):
+    __tablename__ = "sentiment_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    payload = Column(Text(16_777_215))   # JSON, see app.rollups.RollupDelta.event_payload (MEDIUMTEXT on MySQL)
+
+
+# =========================
+# BACKGROUND JOBS (app.jobs)
+# =========================
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False)              # "import" | "score"
+    params = Column(Text)                                  # JSON
+    lock_key = Column(String(50), nullable=False)          # jobs sharing a key never run at once
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String(100))                           # host:pid that claimed it
+    stage = Column(String(50))                             # current JobProfiler stage
+    progress_done = Column(BigInteger, nullable=False, default=0)
+    progress_total = Column(BigInteger)
+    result = Column(Text)                                  # JSON JobProfiler summary
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class JobLock(Base):
+    """One row per held lock_key; the primary key makes claiming atomic."""
+    __tablename__ = "job_locks"
+
+    lock_key = Column(String(50), primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+
+
+# =========================
+# COLD STORAGE (app.partitioning)
+# =========================
+class FeedbackArchive(Base):
+    """One row per review year moved out of `feedback` into a compressed file."""
+    __tablename__ = "feedback_archives"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    rows = Column(BigInteger, nullable=False)
+    path = Column(String(500), nullable=False)
+    bytes = Column(BigInteger)
+    method = Column(String(20))               # "drop_partition" | "delete"
+    archived_at = Column(DateTime)            # NULL while the rows are still being removed
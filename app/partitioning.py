@@ -0,0 +1,354 @@
+# app/partitioning.py
+"""
+Time-based layout of the feedback table: review_date partitions and a cold
+tier for old years.
+
+Hot tier
+- feedback.review_date is indexed (alone and with product_id), and every
+  date filter goes through range_start()/range_end(): plain half-open
+  bounds on the bare column, never DATE_FORMAT(review_date) or YEAR(...).
+  That makes the filters index ranges everywhere and lets MySQL prune
+  partitions.
+- On MySQL, `python -m app.cli partition mysql-ddl 2014 2026 --execute`
+  turns feedback into RANGE partitions (one per review year plus pmax).
+  MySQL needs the partition column in every unique key and allows no
+  foreign keys on partitioned tables, so the DDL drops feedback's FKs,
+  makes review_date NOT NULL and widens the primary key to
+  (id, review_date). The ORM models keep the portable definition. Add next
+  year's partition ahead of time with `partition add-year`.
+- SQLite (local runs, benchmarks) keeps one table and relies on the
+  review_date indexes. A table per year behind a UNION view would break
+  ORM writes and the keyset scans the batch jobs use.
+
+Cold tier
+- `partition archive --before YEAR` exports each older year to
+  var/archive/feedback-YYYY.jsonl.gz and checks the row count. It then
+  records the year in feedback_archives (archived_at NULL: in progress)
+  BEFORE removing anything, deletes the exported ids in batches (feedback,
+  text and aspects of a batch in one transaction), drops the year's
+  partition on MySQL only if nothing is left in it (a review of that year
+  inserted after the export stays in feedback), and finally stamps
+  archived_at. A run that dies in between
+  is finished by running archive again: it deletes the ids listed in the
+  existing file and never re-exports over it.
+- Rollups are left alone: category_sentiment, user_review_stats,
+  correlation_*, product_aspects and sentiment_monthly (the trend routes) still include
+  archived years. Endpoints that read feedback rows directly only see the
+  hot tier. `rollup rebuild` recomputes from feedback, so it would drop
+  archived years from every rollup except sentiment_monthly (which keeps
+  its archived months); restore first if you need a full rebuild.
+- `partition restore YEAR` loads an archive back into feedback and renames
+  the file to feedback-YYYY.restored-<timestamp>.jsonl.gz.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import DateTime, func, insert, inspect, text
+
+from . import aspects, rollups, textstore
+from .models import Feedback, FeedbackArchive, FeedbackMinhash, FeedbackText
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARCHIVE_DIR = Path(os.getenv("FEEDBACK_ARCHIVE_DIR", BASE_DIR / "var" / "archive"))
+BATCH_SIZE = 20_000
+TABLE = Feedback.__tablename__
+
+
+# =========================
+# SARGABLE DATE BOUNDS
+# - "YYYY", "YYYY-MM" or "YYYY-MM-DD" -> datetime for `review_date >= / <`
+# =========================
+def _parse(value):
+    parts = [int(p) for p in value.strip().split("-")]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"expected YYYY, YYYY-MM or YYYY-MM-DD, got {value!r}")
+    return parts
+
+
+def range_start(value):
+    """First instant of the given year, month or day."""
+    parts = _parse(value)
+    return datetime(parts[0], *(parts[1:] + [1, 1])[:2])
+
+
+def range_end(value):
+    """
+    Exclusive upper bound: a year or month includes all of it, a full date
+    is the bound itself (so "2016-12-01" stops before December).
+    """
+    parts = _parse(value)
+    if len(parts) == 1:
+        return datetime(parts[0] + 1, 1, 1)
+    if len(parts) == 2:
+        year, month = parts
+        return datetime(year + month // 12, month % 12 + 1, 1)
+    return datetime(*parts)
+
+
+def year_bounds(year):
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+# =========================
+# MYSQL RANGE PARTITIONS
+# =========================
+def _partition(year):
+    return f"PARTITION p{year} VALUES LESS THAN (TO_DAYS('{year + 1}-01-01'))"
+
+
+def mysql_partitions(db):
+    """Partition names of feedback on MySQL ([] if not partitioned or not MySQL)."""
+    if db.get_bind().dialect.name != "mysql":
+        return []
+    return [
+        name for (name,) in db.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"t": TABLE})
+    ]
+
+
+def mysql_partition_ddl(db, first_year, last_year):
+    """
+    ALTER statements that partition feedback by review year: p<first_year>
+    (which also takes anything older) .. p<last_year>, then pmax.
+    Raises ValueError while rows without review_date exist.
+    """
+    missing = db.query(func.count(Feedback.id)).filter(Feedback.review_date.is_(None)).scalar()
+    if missing:
+        raise ValueError(f"{missing} feedback rows have no review_date; fix or delete them first")
+    if last_year < first_year:
+        raise ValueError("last_year is before first_year")
+
+    statements = [
+        f"ALTER TABLE {TABLE} DROP FOREIGN KEY `{fk['name']}`"
+        for fk in inspect(db.get_bind()).get_foreign_keys(TABLE) if fk.get("name")
+    ]
+    statements += [
+        f"ALTER TABLE {TABLE} MODIFY review_date DATETIME NOT NULL",
+        f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, review_date)",
+        f"ALTER TABLE {TABLE} PARTITION BY RANGE (TO_DAYS(review_date)) (\n    "
+        + ",\n    ".join([_partition(y) for y in range(first_year, last_year + 1)]
+                         + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+        + "\n)",
+    ]
+    return statements
+
+
+def mysql_add_year(db, year):
+    """Split pmax so `year` gets its own partition (run before the year starts)."""
+    if f"p{year}" in mysql_partitions(db):
+        return None
+    statement = (
+        f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO "
+        f"({_partition(year)}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    )
+    db.execute(text(statement))
+    db.commit()
+    return statement
+
+
+# =========================
+# COLD TIER
+# =========================
+def _row_json(row, title, text, found):
+    out = {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in row._mapping.items()}
+    out["title"], out["text"] = title, text   # from feedback_text, stored uncompressed here
+    out["aspects"] = found                    # from feedback_aspects
+    return out
+
+
+def archive_path(year, out_dir=None):
+    return Path(out_dir or ARCHIVE_DIR) / f"feedback-{year}.jsonl.gz"
+
+
+def archive_year(db, year, out_dir=None, batch_size=BATCH_SIZE):
+    """
+    Move one review year of feedback into a gzip'd JSON-lines file.
+    Returns the FeedbackArchive row, or None when the year has no rows.
+    Resumes an interrupted run of the same year.
+    """
+    record = db.query(FeedbackArchive).get(year)
+    if record is not None:
+        if record.archived_at is not None:
+            raise ValueError(f"{year} is already archived")
+        print(f"↪️  {year}: resuming an interrupted archive run ({record.path})")
+        return _remove_archived(db, record, batch_size)
+
+    lo, hi = year_bounds(year)
+    in_year = (Feedback.review_date >= lo, Feedback.review_date < hi)
+    expected = db.query(func.count(Feedback.id)).filter(*in_year).scalar()
+    if not expected:
+        print(f"ℹ️  no feedback reviewed in {year}")
+        return None
+
+    path = archive_path(year, out_dir)
+    if path.exists():
+        raise ValueError(f"{path} already exists but {year} is not recorded as archived; "
+                         "move it away (or load it back) first")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    written, last_id = 0, 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        while True:
+            rows = (
+                db.query(*Feedback.__table__.c)
+                .filter(*in_year, Feedback.id > last_id)
+                .order_by(Feedback.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            ids = [r.id for r in rows]
+            texts = textstore.load(db, ids)
+            found = aspects.load(db, ids)
+            for r in rows:
+                title, body = texts.get(r.id, (None, None))
+                f.write(json.dumps(_row_json(r, title, body, found.get(r.id, {})), ensure_ascii=False) + "\n")
+            written += len(rows)
+            last_id = rows[-1].id
+    if written != expected:
+        tmp.unlink()
+        raise RuntimeError(f"{year}: exported {written} rows, expected {expected}; nothing deleted")
+    if path.exists():
+        tmp.unlink()
+        raise ValueError(f"{path} appeared while exporting; nothing deleted")
+    tmp.replace(path)
+    print(f"📦 {year}: {written} rows -> {path}")
+
+    method = "delete"
+    if f"p{year}" in mysql_partitions(db):
+        # p<first_year> also holds older years; only drop it when nothing else is left in it
+        older = db.query(func.count(Feedback.id)).filter(Feedback.review_date < lo).scalar()
+        if not older:
+            method = "drop_partition"
+    # recorded before anything is removed, so an interrupted run is resumable
+    record = FeedbackArchive(year=year, rows=written, path=str(path), bytes=path.stat().st_size,
+                             method=method, archived_at=None)
+    db.add(record)
+    db.commit()
+    return _remove_archived(db, record, batch_size)
+
+
+def _archived_ids(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line)["id"] for line in f]
+
+
+def _remove_archived(db, record, batch_size=BATCH_SIZE):
+    """
+    Delete the rows listed in record's file (feedback + side tables per
+    batch), then stamp it done. Rows are always removed by archived id: a
+    review of that year inserted after the export stays in feedback. The
+    partition itself is only dropped once it is verified empty.
+    """
+    from . import dedup   # numpy; not needed by the API's date helpers above
+
+    ids = _archived_ids(record.path)
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        db.query(Feedback).filter(Feedback.id.in_(chunk)).delete(synchronize_session=False)
+        textstore.delete(db, chunk)
+        aspects.delete(db, chunk)
+        dedup.unindex(db, chunk)
+        db.commit()
+    lo, hi = year_bounds(record.year)
+    # p<first_year> also holds older years, so count from the bottom
+    left = db.query(func.count(Feedback.id)).filter(Feedback.review_date < hi).scalar()
+    if left:
+        left_in_year = (db.query(func.count(Feedback.id))
+                        .filter(Feedback.review_date >= lo, Feedback.review_date < hi).scalar())
+        if left_in_year:
+            print(f"⚠️  {record.year}: {left_in_year} rows were added after the export; left in feedback")
+        if record.method == "drop_partition":
+            record.method = "delete"
+    elif record.method == "drop_partition" and f"p{record.year}" in mysql_partitions(db):
+        db.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION p{record.year}"))
+    record.archived_at = datetime.utcnow()
+    rollups.write_resync_event(db)
+    db.commit()
+    print(f"🧊 {record.year} archived ({record.method}); rollups keep its counts")
+    return record
+
+
+def archive_before(db, before_year, out_dir=None):
+    """
+    Archive every review year older than `before_year` (finishing interrupted
+    runs first); returns the archived years.
+    """
+    done = []
+    for record in archives(db):
+        if record.archived_at is None and record.year < before_year:
+            archive_year(db, record.year, out_dir)
+            done.append(record.year)
+    first = db.query(func.min(Feedback.review_date)).scalar()
+    if first is None:
+        return done
+    for year in range(first.year, before_year):
+        if db.query(FeedbackArchive).get(year) is None and archive_year(db, year, out_dir):
+            done.append(year)
+    return done
+
+
+def restore_year(db, year, batch_size=BATCH_SIZE):
+    """Load an archived year back into feedback (rollups already count it). Returns rows loaded."""
+    record = db.query(FeedbackArchive).get(year)
+    if record is None:
+        raise ValueError(f"{year} is not archived")
+    if record.archived_at is None:
+        raise ValueError(f"{year} was only partly archived; run `partition archive` again to finish it first")
+    from . import dedup
+
+    date_columns = [c.name for c in Feedback.__table__.c if isinstance(c.type, DateTime)]
+    # on MySQL a dropped year lands in the next partition up; `add-year` cannot re-split it
+    loaded, batch, text_batch, aspect_batch, originals = 0, [], [], {}, {}
+
+    def flush():
+        db.execute(insert(Feedback), batch)
+        db.execute(insert(FeedbackText), text_batch)
+        aspects.store(db, aspect_batch)
+        # back into the near-duplicate index (archives written before unindexing still have theirs)
+        indexed = {fid for (fid,) in db.query(FeedbackMinhash.feedback_id)
+                   .filter(FeedbackMinhash.feedback_id.in_(list(originals)))}
+        todo = [(fid, t) for fid, t in originals.items() if fid not in indexed]
+        dedup.Deduplicator(db).index([fid for fid, _ in todo], [dedup.signature(t) for _, t in todo])
+        batch.clear()
+        text_batch.clear()
+        aspect_batch.clear()
+        originals.clear()
+
+    with gzip.open(record.path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            body = row.pop("text", None)
+            text_batch.append(textstore.row(row["id"], row.pop("title", None), body))
+            if row.get("duplicate_of") is None:
+                originals[row["id"]] = body
+            aspect_batch[row["id"]] = row.pop("aspects", None) or {}
+            for k in date_columns:
+                if row.get(k):
+                    row[k] = datetime.fromisoformat(row[k])
+            batch.append(row)
+            loaded += 1
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    db.delete(record)
+    rollups.write_resync_event(db)
+    db.commit()
+    # kept, but out of the way of a later archive run of the same year
+    src = Path(record.path)
+    kept = src.with_name(f"feedback-{year}.restored-{datetime.utcnow():%Y%m%d%H%M%S}.jsonl.gz")
+    src.replace(kept)
+    print(f"♻️  {year}: {loaded} rows restored from {record.path} (file kept as {kept.name})")
+    return loaded
+
+
+def archives(db):
+    return db.query(FeedbackArchive).order_by(FeedbackArchive.year).all()
@@ -0,0 +1,569 @@
+# app/rollups.py
+"""
+Pre-aggregated sentiment counters, kept current by the batch jobs.
+
+- category_sentiment: one row per category (counts per label, rating
+  sum/count, number of products)
+- user_review_stats: one row per reviewer (the same counters plus stored
+  avg_rating / negative_pct and first/last review date)
+- sentiment_monthly: label counts per product (and overall) and review
+  month, behind the trend routes; archived years keep theirs
+  (app.partitioning)
+- product_aspects: per product and aspect (room, staff, ...), reviews
+  mentioning it by label (app.aspects)
+- correlation_moments / correlation_histogram: text_length vs rating vs
+  sentiment accumulators (app.correlation)
+
+Dashboards read a handful of indexed rollup rows instead of scanning
+feedback.
+
+Jobs record what they write in a RollupDelta and apply it in the same
+transaction as the feedback rows, so the counters commit (or roll back)
+together with the data:
+
+    delta = RollupDelta()
+    delta.add(product_id, user_id, label, rating, review_date, text_length)  # new row
+    delta.relabel(product_id, user_id, old, new, rating, text_length, review_date)  # label changed
+    delta.reaspect(product_id, old_aspects, new_aspects)           # aspect labels changed
+    delta.apply(db)                                              # before db.commit()
+
+Counters are incremented in SQL (col = col + :d), and rows for new keys
+are inserted with an upsert (app.upsert), so concurrent jobs neither lose
+updates nor collide on a key both of them create. Each apply() also writes one sentiment_events row with the
+per-product label/total changes, which the /ws/sentiment hub (app.live)
+pushes to dashboards once the batch commits. `python -m app.cli rollup rebuild` recomputes everything from
+the base tables, e.g. after editing feedback by hand, and writes a resync
+event (write_resync_event) instead, as do archiving and restoring a year.
+"""
+import json
+from collections import defaultdict
+
+from sqlalchemy import DateTime, bindparam, case, func, insert, update
+
+from . import correlation
+from .models import (
+    Category, CategorySentiment, Feedback, FeedbackArchive, FeedbackAspect, ProductAspect,
+    ProductCategory, SentimentEvent, SentimentMonthly, UserReviewStats,
+)
+from .upsert import insert_ignore, insert_or_add
+
+CATEGORY_NAME_MAX = 100   # Category.name length
+IN_BATCH = 5000           # ids per IN (...) lookup / rows per bulk insert
+EVENT_MAX_PRODUCTS = 5000 # larger batches publish totals only
+EVENT_KEEP = 10_000       # sentiment_events rows kept (older ones are pruned by writers)
+
+# counter columns shared by the rollup tables, in RollupDelta vector order
+COUNTERS = ("positive", "neutral", "negative", "total", "rating_sum", "rating_count")
+_LABEL_SLOT = {"positive": 0, "neutral": 1, "negative": 2}
+MONTHLY_COUNTERS = COUNTERS[:4]   # sentiment_monthly / product_aspects have no rating columns
+ALL_PRODUCTS = 0                  # sentiment_monthly.product_id of the overall series
+
+
+def _zeros():
+    return [0] * len(COUNTERS)
+
+
+def period_of(review_date):
+    """"YYYY-MM" month key of a review date."""
+    return f"{review_date.year:04d}-{review_date.month:02d}"
+
+
+# =========================
+# CATEGORY SPLITTING
+# =========================
+def split_categories(raw):
+    """"Hotels,Hotels and motels, Hotels" -> ["Hotels", "Hotels and motels"] (order kept)."""
+    if not raw:
+        return []
+    out, seen = [], set()
+    for part in str(raw).split(","):
+        name = part.strip()[:CATEGORY_NAME_MAX]
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            out.append(name)
+    return out
+
+
+def category_ids(db, names, cache):
+    """Ids for category names, creating missing ones; `cache` is a name -> id dict kept by the caller."""
+    missing = [n for n in names if n not in cache]
+    if missing:
+        for c in db.query(Category).filter(Category.name.in_(missing)):
+            cache[c.name] = c.id
+        new = [Category(name=n) for n in missing if n not in cache]
+        if new:
+            db.add_all(new)
+            db.flush()  # obtain ids
+            for c in new:
+                cache[c.name] = c.id
+    return [cache[n] for n in names]
+
+
+def link_product_categories(db, product_id, raw_categories, cache):
+    """Split a product's categories string into product_category rows (new products only)."""
+    ids = category_ids(db, split_categories(raw_categories), cache)
+    db.add_all([ProductCategory(product_id=product_id, category_id=cid) for cid in ids])
+    if ids:
+        _ensure_rows(db, CategorySentiment.category_id, ids)
+        db.execute(
+            update(CategorySentiment)
+            .where(CategorySentiment.category_id.in_(ids))
+            .values(products=CategorySentiment.products + 1)
+        )
+    return ids
+
+
+# =========================
+# DELTAS
+# =========================
+class RollupDelta:
+    """Counter changes per product and per user, folded into the rollups by apply()."""
+
+    def __init__(self):
+        self.by_product = defaultdict(_zeros)
+        self.by_user = defaultdict(_zeros)
+        self.user_dates = {}   # user_id -> [first, last] review date seen in this delta
+        self.by_month = defaultdict(_zeros)   # (product_id or ALL_PRODUCTS, "YYYY-MM")
+        self.by_aspect = defaultdict(_zeros)  # (product_id, aspect)
+        self.correlation = correlation.CorrelationDelta()
+
+    def __bool__(self):
+        return bool(self.by_product or self.by_user or self.by_month or self.by_aspect
+                    or self.correlation)
+
+    def _month_targets(self, product_id, review_date):
+        if review_date is None:
+            return []
+        period = period_of(review_date)
+        return [self.by_month[(product_id, period)], self.by_month[(ALL_PRODUCTS, period)]]
+
+    def add(self, product_id, user_id, label, rating, review_date=None, text_length=None):
+        if text_length is not None:
+            self.correlation.add(product_id, text_length, rating, label)
+        targets = [self.by_product[product_id]]
+        if user_id is not None:
+            targets.append(self.by_user[user_id])
+            if review_date is not None:
+                dates = self.user_dates.setdefault(user_id, [review_date, review_date])
+                dates[0] = min(dates[0], review_date)
+                dates[1] = max(dates[1], review_date)
+        targets += self._month_targets(product_id, review_date)   # rating parts unused there
+        for v in targets:
+            v[3] += 1
+            if label in _LABEL_SLOT:
+                v[_LABEL_SLOT[label]] += 1
+            if rating is not None:
+                v[4] += rating
+                v[5] += 1
+
+    def relabel(self, product_id, user_id, old_label, new_label, rating=None, text_length=None,
+                review_date=None):
+        if old_label == new_label:
+            return
+        if text_length is not None:
+            self.correlation.relabel(product_id, text_length, rating, old_label, new_label)
+        targets = [self.by_product[product_id]]
+        if user_id is not None:
+            targets.append(self.by_user[user_id])
+        targets += self._month_targets(product_id, review_date)
+        for v in targets:
+            if old_label in _LABEL_SLOT:
+                v[_LABEL_SLOT[old_label]] -= 1
+            if new_label in _LABEL_SLOT:
+                v[_LABEL_SLOT[new_label]] += 1
+
+    def reaspect(self, product_id, old_aspects, new_aspects):
+        """Replace one review's {aspect: label} (app.aspects) in product_aspects."""
+        for aspects, sign in ((old_aspects or {}, -1), (new_aspects or {}, 1)):
+            for aspect, label in aspects.items():
+                v = self.by_aspect[(product_id, aspect)]
+                v[3] += sign
+                if label in _LABEL_SLOT:
+                    v[_LABEL_SLOT[label]] += sign
+
+    def event_payload(self):
+        """
+        {"t": [positive, neutral, negative, total], "p": {product_id: [same]}}
+        with the changes in this delta, or None if nothing changed. "p" is
+        omitted (and "truncated" set) above EVENT_MAX_PRODUCTS products.
+        Aspect-only changes get a zero "t" and an empty "p": nothing to push,
+        but cached responses (app.http_cache) still see a new event.
+        """
+        changed = {pid: v[:4] for pid, v in self.by_product.items() if any(v[:4])}
+        if not changed:
+            return {"t": [0, 0, 0, 0], "p": {}} if self else None
+        totals = [sum(v[i] for v in changed.values()) for i in range(4)]
+        if len(changed) > EVENT_MAX_PRODUCTS:
+            return {"t": totals, "truncated": True}
+        return {"t": totals, "p": {str(pid): v for pid, v in changed.items()}}
+
+    def apply(self, db):
+        """Add the collected changes to the rollup tables (no commit) and reset."""
+        payload = self.event_payload()
+        if payload is not None:
+            _write_event(db, payload)
+        if self.by_product:
+            self._apply_categories(db)
+        if self.by_user:
+            self._apply_users(db)
+        if self.by_month:
+            _apply_pairs(db, SentimentMonthly, "period", self.by_month)
+        if self.by_aspect:
+            _apply_pairs(db, ProductAspect, "aspect", self.by_aspect)
+        self.correlation.apply(db)
+        self.by_product.clear()
+        self.by_user.clear()
+        self.user_dates.clear()
+        self.by_month.clear()
+        self.by_aspect.clear()
+
+    def _apply_categories(self, db):
+        per_category = defaultdict(_zeros)
+        pids = list(self.by_product)
+        for start in range(0, len(pids), IN_BATCH):
+            links = db.query(ProductCategory.product_id, ProductCategory.category_id).filter(
+                ProductCategory.product_id.in_(pids[start:start + IN_BATCH])
+            )
+            for pid, cid in links:
+                acc = per_category[cid]
+                for i, d in enumerate(self.by_product[pid]):
+                    acc[i] += d
+
+        changes = [
+            {"key": cid, **{f"d_{col}": d for col, d in zip(COUNTERS, v)}}
+            for cid, v in per_category.items() if any(v)
+        ]
+        if changes:
+            _ensure_rows(db, CategorySentiment.category_id, [c["key"] for c in changes])
+            db.execute(_increment(CategorySentiment.__table__, "category_id"), changes)
+
+    def _apply_users(self, db):
+        no_dates = (None, None)
+        changes = [
+            {
+                "key": uid,
+                **{f"d_{col}": d for col, d in zip(COUNTERS, v)},
+                "d_first": self.user_dates.get(uid, no_dates)[0],
+                "d_last": self.user_dates.get(uid, no_dates)[1],
+            }
+            for uid, v in self.by_user.items() if any(v)
+        ]
+        if not changes:
+            return
+        table = UserReviewStats.__table__
+        _ensure_rows(db, UserReviewStats.user_id, [c["key"] for c in changes])
+
+        first, last = table.c.first_review_date, table.c.last_review_date
+        d_first = bindparam("d_first", type_=DateTime)
+        d_last = bindparam("d_last", type_=DateTime)
+        stmt = _increment(table, "user_id").values(
+            first_review_date=case(
+                (d_first.is_(None), first), (first.is_(None), d_first), (d_first < first, d_first),
+                else_=first,
+            ),
+            last_review_date=case(
+                (d_last.is_(None), last), (last.is_(None), d_last), (d_last > last, d_last),
+                else_=last,
+            ),
+        )
+        db.execute(stmt, changes)
+
+        # derived columns in a second statement: MySQL evaluates SET left to
+        # right with already-updated values, other backends with the old ones
+        ids = [c["key"] for c in changes]
+        for start in range(0, len(ids), IN_BATCH):
+            db.execute(
+                update(UserReviewStats)
+                .where(UserReviewStats.user_id.in_(ids[start:start + IN_BATCH]))
+                .values(avg_rating=_AVG_RATING, negative_pct=_NEGATIVE_PCT)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def _apply_pairs(db, model, second_key, changes):
+    """
+    Add {(product_id, second key): counters} to a table keyed by
+    (product_id, second_key) with the MONTHLY_COUNTERS columns.
+    """
+    changes = {k: v[:4] for k, v in changes.items() if any(v[:4])}
+    if not changes:
+        return
+    second = getattr(model, second_key)
+    have = set()
+    pids = sorted({pid for pid, _ in changes})
+    seconds = sorted({s for _, s in changes})
+    for start in range(0, len(pids), IN_BATCH):
+        have.update(
+            tuple(r) for r in
+            db.query(model.product_id, second)
+            .filter(model.product_id.in_(pids[start:start + IN_BATCH]), second.in_(seconds))
+        )
+    new = [
+        {**dict(zip(MONTHLY_COUNTERS, v)), "product_id": pid, second_key: s}
+        for (pid, s), v in changes.items() if (pid, s) not in have
+    ]
+    bumps = [
+        {"key": pid, "second_key": s, **{f"d_{col}": d for col, d in zip(MONTHLY_COUNTERS, v)}}
+        for (pid, s), v in changes.items() if (pid, s) in have
+    ]
+    table = model.__table__
+    if new:
+        # a concurrent job may have created some of these keys since the lookup
+        db.execute(insert_or_add(db, table, ("product_id", second_key), MONTHLY_COUNTERS), new)
+    if bumps:
+        db.execute(
+            table.update()
+            .where(table.c.product_id == bindparam("key"), table.c[second_key] == bindparam("second_key"))
+            .values({col: table.c[col] + bindparam(f"d_{col}") for col in MONTHLY_COUNTERS}),
+            bumps,
+        )
+
+
+RESYNC_EVENT = {"t": [0, 0, 0, 0], "truncated": True, "resync": True}
+
+
+def write_resync_event(db):
+    """
+    Record a change no delta describes (rollup rebuild, archived or restored
+    year), so the live hub reloads its totals and the response caches
+    empty. Flushed, not committed: callers commit it with their change.
+    """
+    _write_event(db, RESYNC_EVENT)
+
+
+def _write_event(db, payload):
+    event = SentimentEvent(payload=json.dumps(payload, separators=(",", ":")))
+    db.add(event)
+    db.flush()  # obtain event.id
+    db.query(SentimentEvent).filter(SentimentEvent.id <= event.id - EVENT_KEEP).delete(
+        synchronize_session=False
+    )
+
+
+def _increment(table, key_column):
+    """UPDATE table SET counter = counter + :d_counter ... WHERE key = :key (executemany)."""
+    return (
+        table.update()
+        .where(table.c[key_column] == bindparam("key"))
+        .values({col: table.c[col] + bindparam(f"d_{col}") for col in COUNTERS})
+    )
+
+
+def _ensure_rows(db, key_column, keys):
+    """Insert zeroed rollup rows for keys that have none yet."""
+    model = key_column.class_
+    wanted = set(keys)
+    have = set()
+    keys = list(wanted)
+    for start in range(0, len(keys), IN_BATCH):
+        have.update(k for (k,) in db.query(key_column).filter(key_column.in_(keys[start:start + IN_BATCH])))
+    missing = sorted(wanted - have)
+    if missing:
+        row = dict.fromkeys(COUNTERS, 0)
+        if model is CategorySentiment:
+            row["products"] = 0
+        db.execute(insert_ignore(db, model.__table__, (key_column.key,)),
+                   [dict(row, **{key_column.key: k}) for k in missing])
+    db.flush()
+
+
+_SCORED = UserReviewStats.positive + UserReviewStats.neutral + UserReviewStats.negative
+_AVG_RATING = case(
+    (UserReviewStats.rating_count > 0, UserReviewStats.rating_sum * 1.0 / UserReviewStats.rating_count),
+    else_=None,
+)
+_NEGATIVE_PCT = case(
+    (_SCORED > 0, UserReviewStats.negative * 100.0 / _SCORED),
+    else_=None,
+)
+
+
+# =========================
+# FULL REBUILD
+# =========================
+def link_missing_categories(db, batch_size=1000):
+    """Create product_category rows for products imported before categories were split."""
+    from .models import Product
+
+    cache = {}
+    linked = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Product.id, Product.categories)
+            .filter(Product.id > last_id, Product.categories.isnot(None), ~Product.category_links.any())
+            .order_by(Product.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for pid, raw in rows:
+            ids = category_ids(db, split_categories(raw), cache)
+            db.add_all([ProductCategory(product_id=pid, category_id=cid) for cid in ids])
+        db.commit()
+        linked += len(rows)
+    return linked
+
+
+def _counter_columns():
+    def label_sum(label):
+        return func.sum(case((Feedback.sentiment_label == label, 1), else_=0))
+
+    return (
+        label_sum("positive"), label_sum("neutral"), label_sum("negative"),
+        func.count(Feedback.id),
+        func.coalesce(func.sum(Feedback.rating), 0),
+        func.count(Feedback.rating),
+    )
+
+
+def rebuild_category_sentiment(db):
+    """Recompute category_sentiment from feedback + product_category; returns the row count."""
+    feedback_rows = (
+        db.query(ProductCategory.category_id, *_counter_columns())
+        .join(Feedback, Feedback.product_id == ProductCategory.product_id)
+        .group_by(ProductCategory.category_id)
+        .all()
+    )
+    product_rows = (
+        db.query(ProductCategory.category_id, func.count(ProductCategory.product_id))
+        .group_by(ProductCategory.category_id)
+        .all()
+    )
+    counters = {cid: [int(v or 0) for v in rest] for cid, *rest in feedback_rows}
+
+    db.query(CategorySentiment).delete(synchronize_session=False)
+    rows = [
+        dict(zip(COUNTERS, counters.get(cid, _zeros())), category_id=cid, products=int(n))
+        for cid, n in product_rows
+    ]
+    for start in range(0, len(rows), IN_BATCH):
+        db.execute(insert(CategorySentiment), rows[start:start + IN_BATCH])
+    db.commit()
+    return len(rows)
+
+
+def rebuild_user_stats(db):
+    """Recompute user_review_stats from feedback; returns the row count."""
+    db.query(UserReviewStats).delete(synchronize_session=False)
+    max_id = db.query(func.max(Feedback.user_id)).scalar() or 0
+    written = 0
+    # user id ranges keep each GROUP BY on the user_id index and small
+    for lo in range(0, max_id, IN_BATCH):
+        rows = (
+            db.query(
+                Feedback.user_id, *_counter_columns(),
+                func.min(Feedback.review_date), func.max(Feedback.review_date),
+            )
+            .filter(Feedback.user_id > lo, Feedback.user_id <= lo + IN_BATCH)
+            .group_by(Feedback.user_id)
+            .all()
+        )
+        if not rows:
+            continue
+        db.execute(insert(UserReviewStats), [
+            dict(zip(COUNTERS, (int(v or 0) for v in rest[:len(COUNTERS)])),
+                 user_id=uid, first_review_date=rest[-2], last_review_date=rest[-1])
+            for uid, *rest in rows
+        ])
+        written += len(rows)
+    db.execute(update(UserReviewStats).values(avg_rating=_AVG_RATING, negative_pct=_NEGATIVE_PCT))
+    db.commit()
+    return written
+
+
+def archived_years(db):
+    return sorted(y for (y,) in db.query(FeedbackArchive.year))
+
+
+def overview_from_rollups(db):
+    """
+    Label totals over all feedback without scanning it: the overall
+    sentiment_monthly series minus archived years, plus the (indexed) rows
+    that have no review_date and so no month.
+    """
+    m = SentimentMonthly
+    q = db.query(*(func.sum(getattr(m, c)) for c in MONTHLY_COUNTERS)).filter(m.product_id == ALL_PRODUCTS)
+    archived = [str(y) for y in archived_years(db)]
+    if archived:
+        q = q.filter(func.substr(m.period, 1, 4).notin_(archived))
+    undated = db.query(*_counter_columns()[:4]).filter(Feedback.review_date.is_(None))
+    return {
+        name: int(a or 0) + int(b or 0)
+        for name, a, b in zip(MONTHLY_COUNTERS, q.one(), undated.one())
+    }
+
+
+def rebuild_sentiment_monthly(db):
+    """
+    Recompute sentiment_monthly from feedback; returns the row count.
+    Months of archived years are kept as they are (their feedback is gone).
+    """
+    m = SentimentMonthly
+    keep = [str(y) for y in archived_years(db)]
+    q = db.query(m)
+    if keep:
+        q = q.filter(func.substr(m.period, 1, 4).notin_(keep))
+    q.delete(synchronize_session=False)
+
+    period = func.date_format(Feedback.review_date, "%Y-%m")   # MySQL; registered on SQLite
+    label_cols = _counter_columns()[:4]
+    rows = []
+    for pid, p, *counts in (
+        db.query(Feedback.product_id, period, *label_cols)
+        .filter(Feedback.review_date.isnot(None))
+        .group_by(Feedback.product_id, period)
+    ):
+        rows.append(dict(zip(MONTHLY_COUNTERS, (int(c or 0) for c in counts)), product_id=pid, period=p))
+    for p, *counts in (
+        db.query(period, *label_cols).filter(Feedback.review_date.isnot(None)).group_by(period)
+    ):
+        rows.append(dict(zip(MONTHLY_COUNTERS, (int(c or 0) for c in counts)),
+                         product_id=ALL_PRODUCTS, period=p))
+    for start in range(0, len(rows), IN_BATCH):
+        db.execute(insert(m), rows[start:start + IN_BATCH])
+    db.commit()
+    return len(rows)
+
+
+def rebuild_product_aspects(db):
+    """Recompute product_aspects from feedback_aspects; returns the row count."""
+    db.query(ProductAspect).delete(synchronize_session=False)
+
+    def label_sum(label):
+        return func.sum(case((FeedbackAspect.label == label, 1), else_=0))
+
+    rows = [
+        {"product_id": pid, "aspect": aspect, "positive": int(pos or 0), "neutral": int(neu or 0),
+         "negative": int(neg or 0), "total": int(tot or 0)}
+        for pid, aspect, pos, neu, neg, tot in (
+            db.query(Feedback.product_id, FeedbackAspect.aspect, label_sum("positive"),
+                     label_sum("neutral"), label_sum("negative"), func.count())
+            .join(Feedback, Feedback.id == FeedbackAspect.feedback_id)
+            .group_by(Feedback.product_id, FeedbackAspect.aspect)
+        )
+    ]
+    for start in range(0, len(rows), IN_BATCH):
+        db.execute(insert(ProductAspect), rows[start:start + IN_BATCH])
+    db.commit()
+    return len(rows)
+
+
+# rollup table -> rebuild function, in rebuild order
+REBUILDERS = {
+    "category_sentiment": rebuild_category_sentiment,
+    "user_review_stats": rebuild_user_stats,
+    "sentiment_monthly": rebuild_sentiment_monthly,
+    "product_aspects": rebuild_product_aspects,
+    "correlation": correlation.rebuild,   # returns feedback rows read
+}
+
+
+def rebuild(db, names=None):
+    """Rebuild the given rollup tables (default: all); returns {table: rows}."""
+    out = {name: REBUILDERS[name](db) for name in names or REBUILDERS}
+    write_resync_event(db)
+    db.commit()
+    return out
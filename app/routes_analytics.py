@@ -0,0 +1,64 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from . import analytics, correlation, shared_store
+from .database import get_db
+from .models import Product
+from .schemas import CorrelationResult, GroupByResult
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def _snapshot():
+    snap = shared_store.attach("analytics")
+    if snap is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Analytics snapshot not built yet: run `python -m app.cli store refresh analytics`",
+        )
+    return snap
+
+
+@router.get("/groupby", response_model=GroupByResult)
+def analytics_groupby(
+    dims: str = Query("country", description="Comma-separated: " + ", ".join(analytics.DIMENSIONS)),
+    filter: Optional[List[str]] = Query(None, description='Equality filters "dim:value", e.g. country:US'),
+    min_count: int = Query(1, ge=1),
+    order: str = Query("count", description="count|avg_rating|positive_pct"),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    dim_list = [d.strip() for d in dims.split(",") if d.strip()]
+    filters = {}
+    for f in filter or []:
+        dim, sep, value = f.partition(":")
+        if not sep:
+            raise HTTPException(status_code=422, detail=f'filter must look like "dim:value", got {f!r}')
+        filters[dim.strip()] = value.strip()
+    for d in dim_list + list(filters):
+        if d not in analytics.DIMENSIONS:
+            raise HTTPException(status_code=422, detail=f"unknown dimension {d!r}")
+
+    snap = _snapshot()
+    try:
+        rows = analytics.group_by(snap, dim_list, filters, min_count=min_count, limit=limit, order=order)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {
+        "dims": dim_list,
+        "rows": rows,
+        "total_rows": snap.meta["rows"],
+        "as_of": snap.meta["published_at"],
+    }
+
+
+@router.get("/correlation", response_model=CorrelationResult)
+def analytics_correlation(
+    db: Session = Depends(get_db),
+    product_id: Optional[int] = Query(None, description="One product instead of all feedback"),
+):
+    # reads the streaming accumulators (app.correlation), never feedback
+    if product_id is not None and db.query(Product.id).filter(Product.id == product_id).first() is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return correlation.summarize(db, product_id)
+
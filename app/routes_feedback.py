@@ -4,7 +4,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from .database import get_db
+from . import textstore
 from .models import Feedback, Product, User
+from .partitioning import range_end, range_start
 from .schemas import FeedbackJoined, RawFeedbackOut
 
 from pathlib import Path
@@ -31,10 +33,13 @@ def list_feedback(
     user_id: Optional[int] = Query(None),
     rating_min: Optional[int] = Query(None, ge=0, le=5),
     rating_max: Optional[int] = Query(None, ge=0, le=5),
+    date_from: Optional[str] = Query(None, description='review_date from, e.g. "2015", "2015-06" or "2015-06-01"'),
+    date_to: Optional[str] = Query(None, description='review_date before (exclusive; a year/month includes all of it)'),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ):
     # Query join 3 tabel: feedback + products + users
+    # (title/text diambil terpisah dari feedback_text, hanya untuk halaman ini)
     q = (
         db.query(
             Feedback.id,
@@ -43,8 +48,6 @@ def list_feedback(
             Feedback.user_id,
             User.username,
             Feedback.rating,
-            Feedback.title,
-            Feedback.text,
             Feedback.review_date,
             Feedback.sentiment_label,
             Feedback.text_length,
@@ -63,6 +66,14 @@ def list_feedback(
         filters.append(Feedback.rating >= rating_min)
     if rating_max is not None:
         filters.append(Feedback.rating <= rating_max)
+    # plain bounds on review_date: index range / partition pruning
+    try:
+        if date_from:
+            filters.append(Feedback.review_date >= range_start(date_from))
+        if date_to:
+            filters.append(Feedback.review_date < range_end(date_to))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="date_from/date_to must be YYYY, YYYY-MM or YYYY-MM-DD")
 
     if filters:
         q = q.filter(and_(*filters))
@@ -70,6 +81,7 @@ def list_feedback(
     q = q.order_by(Feedback.id).offset(offset).limit(limit)
 
     rows = q.all()
+    texts = textstore.load(db, [r.id for r in rows])
     # mapping manual ke dict agar sesuai schema FeedbackJoined
     return [
         {
@@ -79,8 +91,8 @@ def list_feedback(
             "user_id": r.user_id,
             "username": r.username,
             "rating": r.rating,
-            "title": r.title,
-            "text": r.text,
+            "title": texts.get(r.id, (None, None))[0],
+            "text": texts.get(r.id, (None, None))[1],
             "review_date": r.review_date,
             "sentiment_label": r.sentiment_label,
             "text_length": r.text_length,
@@ -3,8 +3,15 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, or_
 from .database import get_db
-from .models import Feedback, Product
-from .schemas import SentimentOverview, ProductSentiment
+from .aspects import ASPECTS
+from .models import Category, CategorySentiment, Feedback, Product, ProductAspect, SentimentMonthly
+from .partitioning import range_end, range_start
+from .rollups import ALL_PRODUCTS, period_of
+from . import shared_store
+from .schemas import (
+    SentimentOverview, ProductSentiment, AreaSentiment, CategorySentimentOut, AspectSentiment, ProductIdsIn,
+)
+from .geo import decode as geohash_decode, prefix_filter
 from typing import List, Optional
 from datetime import date
 from app.schemas import FeedbackJoined, ProductSentiment, TrendPoint, TrendSeries
@@ -17,8 +24,45 @@ NEU = func.sum(case((Feedback.sentiment_label == "neutral", 1), else_=0)).label(
 NEG = func.sum(case((Feedback.sentiment_label == "negative", 1), else_=0)).label("negative")
 TOT = func.count(Feedback.id).label("total")
 
+def _stats_dict(pos, neu, neg, tot, avg_rating):
+    pos, neu, neg, tot = int(pos or 0), int(neu or 0), int(neg or 0), int(tot or 0)
+    return {
+        "reviews_count": tot,
+        "positive": pos,
+        "neutral": neu,
+        "negative": neg,
+        "positive_pct": (pos / tot * 100.0) if tot else 0.0,
+        "avg_rating": float(avg_rating) if avg_rating is not None else None,
+    }
+
+EMPTY_STATS = _stats_dict(0, 0, 0, 0, None)
+
+def sentiment_stats_for_products(db: Session, product_ids):
+    """{product_id: stats} for the given ids in one grouped IN query (missing ids -> no key)."""
+    if not product_ids:
+        return {}
+    rows = (
+        db.query(Feedback.product_id, POS, NEU, NEG, TOT, func.avg(Feedback.rating).label("avg_rating"))
+        .filter(Feedback.product_id.in_(list(product_ids)))
+        .group_by(Feedback.product_id)
+        .all()
+    )
+    return {
+        r.product_id: _stats_dict(r.positive, r.neutral, r.negative, r.total, r.avg_rating)
+        for r in rows
+    }
+
 @router.get("/overview", response_model=SentimentOverview)
 def sentiment_overview(db: Session = Depends(get_db)):
+    # production serving profile: totals come from the shared snapshot
+    if shared_store.enabled():
+        snap = shared_store.attach("product_sentiment")
+        if snap is not None:
+            return snap.meta["overview"]
+    return overview_totals(db)
+
+def overview_totals(db: Session):
+    """Label totals straight from feedback (never the snapshot, which lags running jobs)."""
     row = db.query(POS, NEU, NEG, TOT).one()
     pos = int(row.positive or 0)
     neu = int(row.neutral or 0)
@@ -108,8 +152,43 @@ def sentiment_by_product(
         for r in rows
     ]
 
+def _product_sentiment_from_store(product_id: int):
+    """Stats from the shared snapshots, or None to fall back to SQL."""
+    if not shared_store.enabled():
+        return None
+    products = shared_store.attach("products")
+    stats = shared_store.attach("product_sentiment")
+    if products is None or stats is None:
+        return None
+    i = products.lookup("id", product_id)
+    if i is None:
+        return None  # maybe newer than the snapshot; let SQL decide
+
+    j = stats.lookup("product_id", product_id)
+    pos = int(stats["positive"][j]) if j is not None else 0
+    neu = int(stats["neutral"][j]) if j is not None else 0
+    neg = int(stats["negative"][j]) if j is not None else 0
+    tot = int(stats["total"][j]) if j is not None else 0
+    rating_count = int(stats["rating_count"][j]) if j is not None else 0
+    return {
+        "product_id": product_id,
+        "product_name": products.string("name", i),
+        "city": products.string("city", i),
+        "country": products.string("country", i),
+        "reviews_count": tot,
+        "positive": pos,
+        "neutral": neu,
+        "negative": neg,
+        "positive_pct": (pos / tot * 100.0) if tot else 0.0,
+        "avg_rating": int(stats["rating_sum"][j]) / rating_count if rating_count else None,
+    }
+
 @router.get("/product/{product_id}", response_model=ProductSentiment)
 def sentiment_for_product(product_id: int, db: Session = Depends(get_db)):
+    cached = _product_sentiment_from_store(product_id)
+    if cached is not None:
+        return cached
+
     sub = (
         db.query(
             POS, NEU, NEG, TOT, func.avg(Feedback.rating).label("avg_rating")
@@ -140,38 +219,204 @@ def sentiment_for_product(product_id: int, db: Session = Depends(get_db)):
         "avg_rating": float(sub.avg_rating) if sub.avg_rating is not None else None,
     }
 
-def _trend_query(
-    db: Session,
-    product_id: Optional[int] = None,
-    start: Optional[str] = None,   # "YYYY-MM" or full date "YYYY-MM-DD"
-    end: Optional[str] = None,     # same format
+# =========================
+# BATCH LOOKUP (one request per page of product cards)
+# =========================
+MAX_BATCH_IDS = 500
+
+def _batch_ids(ids):
+    ids = list(dict.fromkeys(ids))   # drop repeats, keep order
+    if not ids:
+        raise HTTPException(status_code=422, detail="ids must not be empty")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"at most {MAX_BATCH_IDS} ids per request")
+    return ids
+
+def sentiment_for_products(db: Session, product_ids):
+    """
+    ProductSentiment dicts for the given ids, in that order; unknown ids are
+    left out. Ids the shared snapshots have are served from them; the rest
+    (all of them without snapshots) come from ONE query: the products
+    outer-joined to their grouped feedback counts, so a product without
+    reviews still comes back with zeros.
+    """
+    found = {}
+    missing = []
+    for pid in product_ids:
+        cached = _product_sentiment_from_store(pid)
+        if cached is None:
+            missing.append(pid)
+        else:
+            found[pid] = cached
+
+    if missing:
+        agg = (
+            db.query(
+                Feedback.product_id.label("pid"),
+                POS, NEU, NEG, TOT,
+                func.avg(Feedback.rating).label("avg_rating"),
+            )
+            .filter(Feedback.product_id.in_(missing))
+            .group_by(Feedback.product_id)
+            .subquery()
+        )
+        rows = (
+            db.query(
+                Product.id, Product.name, Product.city, Product.country,
+                agg.c.positive, agg.c.neutral, agg.c.negative, agg.c.total, agg.c.avg_rating,
+            )
+            .outerjoin(agg, agg.c.pid == Product.id)
+            .filter(Product.id.in_(missing))
+            .all()
+        )
+        for r in rows:
+            found[r.id] = {
+                "product_id": r.id,
+                "product_name": r.name,
+                "city": r.city,
+                "country": r.country,
+                **_stats_dict(r.positive, r.neutral, r.negative, r.total, r.avg_rating),
+            }
+    return [found[pid] for pid in product_ids if pid in found]
+
+@router.post("/products/batch", response_model=List[ProductSentiment])
+def sentiment_for_products_batch(body: ProductIdsIn, db: Session = Depends(get_db)):
+    return sentiment_for_products(db, _batch_ids(body.ids))
+
+@router.get("/products/batch", response_model=List[ProductSentiment])
+def sentiment_for_products_batch_get(
+    db: Session = Depends(get_db),
+    ids: str = Query(..., description="Comma-separated product ids, e.g. 1,2,3"),
 ):
-    # MySQL monthly bucket: "YYYY-MM"
-    period_expr = func.date_format(Feedback.review_date, "%Y-%m").label("period")
+    try:
+        parsed = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+    return sentiment_for_products(db, _batch_ids(parsed))
+
+@router.get("/product/{product_id}/aspects", response_model=List[AspectSentiment])
+def sentiment_aspects_for_product(product_id: int, db: Session = Depends(get_db)):
+    # reads the product_aspects rollup (filled by the scorer, see app.aspects)
+    if db.query(Product.id).filter(Product.id == product_id).first() is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    rows = {r.aspect: r for r in db.query(ProductAspect).filter(ProductAspect.product_id == product_id)}
 
+    out = []
+    for aspect in ASPECTS:   # every aspect, in a fixed order, zeros when never mentioned
+        r = rows.get(aspect)
+        pos, neu, neg, tot = (r.positive, r.neutral, r.negative, r.total) if r else (0, 0, 0, 0)
+        out.append({
+            "aspect": aspect,
+            "mentions": tot,
+            "positive": pos,
+            "neutral": neu,
+            "negative": neg,
+            "positive_pct": (pos / tot * 100.0) if tot else 0.0,
+            "negative_pct": (neg / tot * 100.0) if tot else 0.0,
+        })
+    return out
+
+@router.get("/by-area", response_model=List[AreaSentiment])
+def sentiment_by_area(
+    db: Session = Depends(get_db),
+    precision: int = Query(4, ge=1, le=7, description="Geohash prefix length (4 ≈ 39x20 km cells)"),
+    within: Optional[str] = Query(None, description="Only cells inside this geohash prefix"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    cell = func.substr(Product.geohash, 1, precision).label("cell")
     q = (
         db.query(
-            period_expr,
-            func.sum(case((Feedback.sentiment_label == "positive", 1), else_=0)).label("positive"),
-            func.sum(case((Feedback.sentiment_label == "neutral", 1), else_=0)).label("neutral"),
-            func.sum(case((Feedback.sentiment_label == "negative", 1), else_=0)).label("negative"),
-            func.count(Feedback.id).label("total"),
+            cell,
+            func.count(func.distinct(Product.id)).label("products"),
+            POS, NEU, NEG, TOT,
+            func.avg(Feedback.rating).label("avg_rating"),
         )
-        .filter(Feedback.review_date.isnot(None))
+        .join(Feedback, Feedback.product_id == Product.id)
+        .filter(Product.geohash.isnot(None))
     )
+    if within:
+        # prefix match uses the geohash index
+        q = q.filter(prefix_filter(Product.geohash, within.lower()))
+    rows = q.group_by(cell).order_by(func.count(Feedback.id).desc()).limit(limit).all()
 
-    if product_id is not None:
-        q = q.filter(Feedback.product_id == product_id)
+    out = []
+    for r in rows:
+        lat, lon = geohash_decode(r.cell)
+        out.append({
+            "geohash": r.cell,
+            "latitude": lat,
+            "longitude": lon,
+            "products": int(r.products or 0),
+            **_stats_dict(r.positive, r.neutral, r.negative, r.total, r.avg_rating),
+        })
+    return out
 
-    # Optional time window (works with "YYYY-MM" or "YYYY-MM-DD")
-    if start:
-        q = q.filter(Feedback.review_date >= start + ("-01" if len(start) == 7 else ""))
-    if end:
-        # add a generous upper bound
-        q = q.filter(Feedback.review_date < (end + "-32" if len(end) == 7 else end))
+@router.get("/by-category", response_model=List[CategorySentimentOut])
+def sentiment_by_category(
+    db: Session = Depends(get_db),
+    category: Optional[str] = Query(None, description="Exact category name"),
+    min_reviews: int = Query(1, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("reviews_count", description="reviews_count|positive_pct|avg_rating|products"),
+):
+    # reads the category_sentiment rollup (see app.rollups), never feedback
+    r = CategorySentiment
+    positive_pct_expr = func.coalesce(r.positive * 100.0 / func.nullif(r.total, 0), 0)
+    avg_rating_expr = func.coalesce(r.rating_sum * 1.0 / func.nullif(r.rating_count, 0), 0)
+    sort_map = {
+        "reviews_count": r.total,
+        "positive_pct": positive_pct_expr,
+        "avg_rating": avg_rating_expr,
+        "products": r.products,
+    }
+    sort_expr = sort_map.get(sort, r.total)
+
+    q = (
+        db.query(Category.name, r)
+        .join(r, r.category_id == Category.id)
+        .filter(r.total >= min_reviews)
+    )
+    if category:
+        q = q.filter(Category.name == category)
+    rows = q.order_by(sort_expr.desc(), r.category_id).offset(offset).limit(limit).all()
+
+    return [
+        {
+            "category_id": s.category_id,
+            "category": name,
+            "products": int(s.products or 0),
+            **_stats_dict(
+                s.positive, s.neutral, s.negative, s.total,
+                s.rating_sum / s.rating_count if s.rating_count else None,
+            ),
+        }
+        for name, s in rows
+    ]
+
+def _trend_query(
+    db: Session,
+    product_id: Optional[int] = None,
+    start: Optional[str] = None,   # "YYYY-MM" or full date "YYYY-MM-DD"
+    end: Optional[str] = None,     # same format
+):
+    # monthly buckets come from the sentiment_monthly rollup (kept for archived years too);
+    # a full date in the window counts its whole month
+    m = SentimentMonthly
+    q = db.query(m.period, m.positive, m.neutral, m.negative, m.total).filter(
+        m.product_id == (product_id if product_id is not None else ALL_PRODUCTS),
+        m.total > 0,
+    )
+    try:
+        if start:
+            q = q.filter(m.period >= period_of(range_start(start)))
+        if end:
+            upper = range_end(end)   # exclusive
+            q = q.filter(m.period < period_of(upper) if upper.day == 1 else m.period <= period_of(upper))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="start/end must be YYYY-MM or YYYY-MM-DD")
 
-    q = q.group_by(period_expr).order_by(period_expr)
-    rows = q.all()
+    rows = q.order_by(m.period).all()
 
     return [
         {
@@ -0,0 +1,71 @@
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from . import jobs
+from .database import get_db
+from .models import Job
+from .schemas import ImportJobIn, JobOut, ScoreJobIn
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _job_out(job: Job):
+    total = job.progress_total
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params or "{}"),
+        "cancel_requested": bool(job.cancel_requested),
+        "worker": job.worker,
+        "stage": job.stage,
+        "progress_done": job.progress_done or 0,
+        "progress_total": total,
+        "progress_pct": min(100.0, (job.progress_done or 0) / total * 100.0) if total else None,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# Jobs are only queued here; `python -m app.cli jobs worker` runs them
+@router.post("/import", response_model=JobOut, status_code=202)
+def submit_import(body: ImportJobIn, db: Session = Depends(get_db)):
+    return _job_out(jobs.submit(db, "import", body.model_dump()))
+
+
+@router.post("/score", response_model=JobOut, status_code=202)
+def submit_score(body: ScoreJobIn, db: Session = Depends(get_db)):
+    return _job_out(jobs.submit(db, "score", body.model_dump()))
+
+
+@router.get("/", response_model=List[JobOut])
+def list_jobs(
+    db: Session = Depends(get_db),
+    status: Optional[str] = Query(None, description="|".join(jobs.STATUSES)),
+    limit: int = Query(50, ge=1, le=200),
+):
+    q = db.query(Job)
+    if status:
+        q = q.filter(Job.status == status)
+    return [_job_out(j) for j in q.order_by(Job.id.desc()).limit(limit)]
+
+
+@router.get("/{job_id}", response_model=JobOut)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.query(Job).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_out(job)
+
+
+@router.post("/{job_id}/cancel", response_model=JobOut)
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    job = jobs.cancel(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_out(job)
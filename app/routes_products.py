@@ -3,34 +3,95 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from .database import get_db
-from .models import Product
-from .schemas import ProductOut
+from .models import Category, Product, ProductCategory
+from .schemas import ProductOut, NearbyProduct
+from .geo import bounding_box, covering_prefixes, haversine_km, prefix_filter
+from .routes_feedback_sentiment import EMPTY_STATS, sentiment_stats_for_products
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 @router.get("/", response_model=List[ProductOut])
 def list_products(
     db: Session = Depends(get_db),
-    q: Optional[str] = Query(None, description="Search in name/address/city"),
+    q: Optional[str] = Query(None, description="Search in name/address/city/category names"),
     city: Optional[str] = Query(None),
     country: Optional[str] = Query(None),
+    category: Optional[str] = Query(None, description="Exact category name"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ):
     qset = db.query(Product)
     if q:
         like = f"%{q}%"
+        # categories through the (small) categories table + link table, not the raw CSV string
+        in_category = (
+            db.query(ProductCategory.product_id)
+            .join(Category, Category.id == ProductCategory.category_id)
+            .filter(Category.name.ilike(like))
+        )
         qset = qset.filter(
             or_(
                 Product.name.ilike(like),
                 Product.address.ilike(like),
                 Product.city.ilike(like),
-                Product.categories.ilike(like),
+                Product.id.in_(in_category),
             )
         )
     if city:
         qset = qset.filter(Product.city == city)
     if country:
         qset = qset.filter(Product.country == country)
+    if category:
+        # indexed lookup through the link table instead of a text scan
+        qset = qset.join(ProductCategory, ProductCategory.product_id == Product.id).join(
+            Category, Category.id == ProductCategory.category_id
+        ).filter(Category.name == category)
 
     return qset.order_by(Product.id).offset(offset).limit(limit).all()
+
+
+@router.get("/nearby", response_model=List[NearbyProduct])
+def products_nearby(
+    db: Session = Depends(get_db),
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=500),
+    limit: int = Query(50, ge=1, le=200),
+):
+    # candidates: a few geohash prefix range scans + bounding box (ids and
+    # coordinates only), exact distance in Python, details for the top hits
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    qset = db.query(Product.id, Product.latitude, Product.longitude).filter(
+        Product.latitude.between(min_lat, max_lat)
+    )
+    prefixes = covering_prefixes(lat, lon, radius_km)
+    if prefixes:
+        qset = qset.filter(or_(*[prefix_filter(Product.geohash, p) for p in prefixes]))
+    else:
+        qset = qset.filter(Product.longitude.isnot(None))
+
+    hits = []
+    for pid, p_lat, p_lon in qset.all():
+        d = haversine_km(lat, lon, p_lat, p_lon)
+        if d <= radius_km:
+            hits.append((d, pid))
+    hits.sort()
+    hits = hits[:limit]
+
+    ids = [pid for _, pid in hits]
+    products = {p.id: p for p in db.query(Product).filter(Product.id.in_(ids))} if ids else {}
+    stats = sentiment_stats_for_products(db, ids)
+    return [
+        {
+            "product_id": pid,
+            "product_name": products[pid].name,
+            "address": products[pid].address,
+            "city": products[pid].city,
+            "country": products[pid].country,
+            "latitude": products[pid].latitude,
+            "longitude": products[pid].longitude,
+            "distance_km": round(d, 3),
+            **stats.get(pid, EMPTY_STATS),
+        }
+        for d, pid in hits
+    ]
@@ -1,9 +1,9 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from .database import get_db
-from .models import User
-from .schemas import UserOut
+from .models import User, UserReviewStats
+from .schemas import UserOut, UserReviewStatsOut
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -18,3 +18,65 @@ def list_users(
     if q:
         qset = qset.filter(User.username.ilike(f"%{q}%"))
     return qset.order_by(User.id).offset(offset).limit(limit).all()
+
+
+def _stats_out(user, s):
+    scored = s.positive + s.neutral + s.negative
+    return {
+        "user_id": s.user_id,
+        "username": user.username if user else None,
+        "reviews_count": s.total,
+        "positive": s.positive,
+        "neutral": s.neutral,
+        "negative": s.negative,
+        "positive_pct": (s.positive / scored * 100.0) if scored else 0.0,
+        "negative_pct": s.negative_pct,
+        "avg_rating": s.avg_rating,
+        "first_review_date": s.first_review_date,
+        "last_review_date": s.last_review_date,
+    }
+
+
+# sort key -> indexed user_review_stats column (see app.rollups)
+TOP_SORTS = {
+    "reviews_count": UserReviewStats.total,
+    "avg_rating": UserReviewStats.avg_rating,
+    "negative_pct": UserReviewStats.negative_pct,
+    "last_review_date": UserReviewStats.last_review_date,
+}
+
+@router.get("/top", response_model=List[UserReviewStatsOut])
+def top_users(
+    db: Session = Depends(get_db),
+    sort: str = Query("reviews_count", description="|".join(TOP_SORTS)),
+    ascending: bool = Query(False),
+    min_reviews: int = Query(1, ge=1, description="Ignore users with fewer reviews"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    if sort not in TOP_SORTS:
+        raise HTTPException(status_code=422, detail=f"sort must be one of {', '.join(TOP_SORTS)}")
+    col = TOP_SORTS[sort]
+    rows = (
+        db.query(User, UserReviewStats)
+        .join(User, User.id == UserReviewStats.user_id)
+        # NULLs (no ratings / nothing scored yet) are left out rather than sorted
+        .filter(col.isnot(None), UserReviewStats.total >= min_reviews)
+        .order_by(col.asc() if ascending else col.desc(), UserReviewStats.user_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [_stats_out(user, s) for user, s in rows]
+
+
+@router.get("/{user_id}/stats", response_model=UserReviewStatsOut)
+def user_stats(user_id: int, db: Session = Depends(get_db)):
+    user = db.query(User).get(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    s = db.query(UserReviewStats).get(user_id)
+    if s is None:
+        # no reviews yet (or the rollup has not been rebuilt since import)
+        s = UserReviewStats(user_id=user_id, total=0, positive=0, neutral=0, negative=0)
+    return _stats_out(user, s)
@@ -1,6 +1,7 @@
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Any, Literal
+from .jobs import MAX_BATCH, MAX_WORKERS, resolve_source
 
 
 class ConfigORM(BaseModel):
@@ -35,6 +36,20 @@ class UserOut(ConfigORM):
     created_at: datetime
 
 
+class UserReviewStatsOut(ConfigORM):
+    user_id: int
+    username: Optional[str]
+    reviews_count: int
+    positive: int
+    neutral: int
+    negative: int
+    positive_pct: float
+    negative_pct: Optional[float]     # of scored reviews
+    avg_rating: Optional[float]
+    first_review_date: Optional[datetime]
+    last_review_date: Optional[datetime]
+
+
 # =========================
 # FEEDBACK (DARI DATABASE)
 # =========================
@@ -93,6 +108,82 @@ class ProductSentiment(ConfigORM):
     avg_rating: Optional[float]
 
 
+class ProductIdsIn(BaseModel):
+    ids: List[int]        # at most MAX_BATCH_IDS (routes_feedback_sentiment)
+
+
+# =========================
+# PRODUK TERDEKAT (GEO)
+# =========================
+class NearbyProduct(ConfigORM):
+    product_id: int
+    product_name: Optional[str]
+    address: Optional[str]
+    city: Optional[str]
+    country: Optional[str]
+    latitude: float
+    longitude: float
+    distance_km: float
+    reviews_count: int
+    positive: int
+    neutral: int
+    negative: int
+    positive_pct: float
+    avg_rating: Optional[float]
+
+
+class AreaSentiment(ConfigORM):
+    geohash: str         # cell prefix, e.g. "dr5r"
+    latitude: float      # cell center
+    longitude: float
+    products: int
+    reviews_count: int
+    positive: int
+    neutral: int
+    negative: int
+    positive_pct: float
+    avg_rating: Optional[float]
+
+
+class CategorySentimentOut(ConfigORM):
+    category_id: int
+    category: str
+    products: int
+    reviews_count: int
+    positive: int
+    neutral: int
+    negative: int
+    positive_pct: float
+    avg_rating: Optional[float]
+
+
+class AspectSentiment(ConfigORM):
+    aspect: str          # room, staff, location, cleanliness, price (app.aspects)
+    mentions: int        # reviews mentioning the aspect
+    positive: int
+    neutral: int
+    negative: int
+    positive_pct: float
+    negative_pct: float
+
+
+# =========================
+# ANALYTICS (GROUP BY DI MEMORI)
+# =========================
+class GroupByResult(BaseModel):
+    dims: List[str]
+    rows: List[Dict[str, Any]]   # one dict per group: dimension values + metrics
+    total_rows: int              # feedback rows in the snapshot
+    as_of: float                 # snapshot publish time (unix seconds)
+
+
+class CorrelationResult(BaseModel):
+    product_id: Optional[int]              # None = all feedback
+    pairs: Dict[str, Dict[str, Any]]       # length_rating / length_sentiment / rating_sentiment
+    by_length: List[Dict[str, Any]]        # per text_length bucket
+    by_rating: List[Dict[str, Any]]        # per rating ("none", "0".."5")
+
+
 # =========================
 # TREND SENTIMEN (TIME SERIES)
 # =========================
@@ -135,3 +226,50 @@ class RawFeedbackOut(BaseModel):
     reviews_userCity: Optional[str]
     reviews_username: Optional[str]
     reviews_userProvince: Optional[str]
+
+
+# =========================
+# BACKGROUND JOBS (app.jobs)
+# =========================
+class ImportJobIn(BaseModel):
+    source: Optional[str] = None      # CSV under data/ on the worker host (default: data/7282_1.csv)
+    chunk_size: int = Field(1000, ge=1, le=MAX_BATCH)
+    score: bool = False
+    workers: int = Field(1, ge=1, le=MAX_WORKERS)
+    dry_run: bool = False
+    dedup: Optional[Literal["link", "skip", "off"]] = None   # None: $DEDUP_POLICY
+    refresh_store: bool = True
+
+    @field_validator("source")
+    @classmethod
+    def _source_in_data_dir(cls, v):
+        return resolve_source(v) if v else v
+
+
+class ScoreJobIn(BaseModel):
+    rescore: bool = False
+    verify_text: bool = False
+    max_rate: Optional[float] = Field(None, gt=0)
+    batch_size: int = Field(500, ge=1, le=MAX_BATCH)
+    workers: int = Field(1, ge=1, le=MAX_WORKERS)
+    dry_run: bool = False
+    refresh_store: bool = True
+
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str                       # queued | running | succeeded | failed | cancelled
+    params: Dict[str, Any]
+    cancel_requested: bool
+    worker: Optional[str]
+    stage: Optional[str]
+    progress_done: int
+    progress_total: Optional[int]
+    progress_pct: Optional[float]
+    result: Optional[Dict[str, Any]]  # JobProfiler summary
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    heartbeat_at: Optional[datetime]
+    finished_at: Optional[datetime]
@@ -1,14 +1,35 @@
 # app/sentiment_analyzer.py
-from textblob import TextBlob
+import argparse
+import hashlib
+import os
+import time
+from sqlalchemy import func, or_, update
 from app.database import SessionLocal
-from app.models import Feedback
+from app.instrumentation import PROFILE_MODES, JobProfiler
+from app import aspects, textstore
+from app.models import Feedback, FeedbackText
+from app.rollups import RollupDelta
 from datetime import datetime
 
+# Bump whenever analyze_sentiment changes so existing labels get rescored
+# (aspect extraction has its own part, see app.aspects)
+SCORER_VERSION = f"textblob-1+{aspects.ASPECT_VERSION}"
+# a truncated version never equals SCORER_VERSION, so rescore() would redo every row forever
+if len(SCORER_VERSION) > Feedback.scored_with_version.type.length:
+    raise RuntimeError(f"SCORER_VERSION {SCORER_VERSION!r} does not fit feedback.scored_with_version")
+
+# Default process count when scoring is fanned out (e.g. import_all --score)
+SCORER_WORKERS = int(os.getenv("SCORER_WORKERS", os.cpu_count() or 1))
+
 def analyze_sentiment(text):
     """Return sentiment label: Positive / Negative / Neutral"""
     if not text or not text.strip():
         return "neutral"
-    
+
+    # imported on first use: TextBlob pulls in NLTK (~0.5s), which API
+    # workers importing this module for SCORER_VERSION etc. shouldn't pay
+    from textblob import TextBlob
+
     blob = TextBlob(text)
     polarity = blob.sentiment.polarity  # value between -1 and 1
 
@@ -19,24 +40,221 @@ def analyze_sentiment(text):
     else:
         return "neutral"
 
-def main():
+def text_hash(text):
+    """sha1 hex digest of the review text (empty text hashes as "")."""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+def analyze_review(text):
+    """(label, {aspect: label}): analyze_sentiment's label plus aspect labels, in one pass (app.aspects)."""
+    return aspects.analyze(text)
+
+def score_texts(texts, executor=None):
+    """
+    Label a batch of texts, in order: one (label, {aspect: label}) per text.
+
+    Without an executor this returns a list. With one, the work is submitted
+    right away and an iterator over the results is returned, so the caller can
+    do other work (e.g. DB lookups) before collecting it with list().
+    """
+    if executor is None:
+        return [analyze_review(t) for t in texts]
+    # a few dozen texts per task keeps IPC overhead small next to TextBlob
+    return executor.map(analyze_review, texts, chunksize=32)
+
+def _executor(workers):
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=workers)
+    return None
+
+def main(profile=None, workers=1, batch_size=500, dry_run=False):
+    """
+    Label feedback that has no sentiment yet, in keyset batches of
+    batch_size rows. Each batch commits with its rollups, so a cancelled or
+    failed run keeps what it finished and the next run picks up the rest.
+    """
     db = SessionLocal()
-    feedbacks = db.query(Feedback).filter(Feedback.sentiment_label == None).all()
+    executor = _executor(workers)
+    unscored = Feedback.sentiment_label.is_(None)
+    try:
+        with JobProfiler("sentiment_analyzer", profile=profile) as prof:
+            with prof.stage("query"):
+                total = db.query(func.count(Feedback.id)).filter(unscored).scalar() or 0
+            print(f"🧠 Found {total} feedback entries without sentiment.")
+            prof.set_total(total)
+
+            updated = 0
+            last_id = 0
+            rollup = RollupDelta()
+            while True:
+                with prof.stage("query"):
+                    rows = (
+                        db.query(Feedback.id, Feedback.product_id, Feedback.user_id, Feedback.rating,
+                                 Feedback.text_length, Feedback.review_date, Feedback.created_at)
+                        .filter(unscored, Feedback.id > last_id)
+                        .order_by(Feedback.id)
+                        .limit(batch_size)
+                        .all()
+                    )
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                with prof.stage("score"):
+                    ids = [r.id for r in rows]
+                    texts = textstore.texts(db, ids)
+                    results = list(score_texts(texts, executor))
+                    old_aspects = aspects.load(db, ids)
+                    changes = []
+                    for r, text, (label, found) in zip(rows, texts, results):
+                        rollup.relabel(r.product_id, r.user_id, None, label,
+                                       r.rating, r.text_length, r.review_date)
+                        rollup.reaspect(r.product_id, old_aspects.get(r.id), found)
+                        changes.append({
+                            "id": r.id,
+                            "sentiment_label": label,
+                            "scored_with_version": SCORER_VERSION,
+                            "text_hash": text_hash(text),
+                            "created_at": r.created_at or datetime.utcnow(),
+                        })
 
-    total = len(feedbacks)
-    print(f"🧠 Found {total} feedback entries without sentiment.")
+                with prof.stage("insert"):
+                    db.execute(update(Feedback), changes)   # bulk UPDATE by primary key
+                    aspects.store(db, {r.id: found for r, (_, found) in zip(rows, results)}, replace=True)
+                    rollup.apply(db)
+                with prof.stage("commit"):
+                    if dry_run:
+                        db.rollback()
+                    else:
+                        db.commit()
+                updated += len(rows)
+                prof.advance(len(rows))
+        print(f"✅ Done. Updated {updated} feedback rows." + (" (dry run, rolled back)" if dry_run else ""))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        db.close()
 
+def rescore(batch_size=500, max_rows_per_sec=None, verify_text=False, profile=None,
+            workers=1, dry_run=False):
+    """
+    Incrementally rescore feedback whose label is missing or out of date.
+
+    Stale rows are those whose scored_with_version is NULL or differs from
+    SCORER_VERSION; they are found through the index on that column, so a
+    run where nothing changed is a single empty index lookup. Code that edits
+    feedback text should reset scored_with_version to NULL to queue the row.
+
+    verify_text=True additionally sweeps every row and rescores those whose
+    text no longer matches text_hash (for edits made outside the app).
+
+    Rows are processed in keyset-paginated batches of `batch_size`, each in
+    its own short transaction; `max_rows_per_sec` throttles the job so it can
+    run next to API traffic. dry_run rolls every batch back instead.
+    """
+    db = SessionLocal()
+    executor = _executor(workers)
+    stale = or_(
+        Feedback.scored_with_version.is_(None),
+        Feedback.scored_with_version != SCORER_VERSION,
+    )
+
+    last_id = 0
+    scanned = 0
     updated = 0
-    for fb in feedbacks:
-        fb.sentiment_label = analyze_sentiment(fb.text)
-        fb.created_at = fb.created_at or datetime.utcnow()
-        updated += 1
-        if updated % 500 == 0:
-            print(f"...processed {updated}/{total}")
+    rollup = RollupDelta()
+    try:
+        with JobProfiler("rescore", profile=profile) as prof:
+            with prof.stage("query"):
+                todo = db.query(Feedback.id)
+                if not verify_text:
+                    todo = todo.filter(stale)
+                prof.set_total(todo.count())
 
-    db.commit()
-    print(f"✅ Done! Updated {updated} feedback rows.")
-    db.close()
+            while True:
+                started = time.monotonic()
+                with prof.stage("query"):
+                    q = db.query(
+                        Feedback.id, Feedback.product_id, Feedback.user_id, Feedback.text_hash,
+                        Feedback.scored_with_version, Feedback.sentiment_label,
+                        Feedback.rating, Feedback.text_length, Feedback.review_date,
+                        FeedbackText.codec, FeedbackText.body,
+                    ).outerjoin(FeedbackText, FeedbackText.feedback_id == Feedback.id).filter(Feedback.id > last_id)
+                    if not verify_text:
+                        q = q.filter(stale)
+                    rows = q.order_by(Feedback.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                scanned += len(rows)
+
+                with prof.stage("score"):
+                    todo = []
+                    for r in rows:
+                        text = textstore.decode(r.codec, r.body)
+                        h = text_hash(text)
+                        if r.scored_with_version == SCORER_VERSION and r.text_hash == h:
+                            continue
+                        todo.append((r, h, text))
+                    results = list(score_texts([text for _, _, text in todo], executor))
+                    changes = [
+                        {
+                            "id": r.id,
+                            "sentiment_label": label,
+                            "scored_with_version": SCORER_VERSION,
+                            "text_hash": h,
+                        }
+                        for (r, h, _), (label, _) in zip(todo, results)
+                    ]
+                    old_aspects = aspects.load(db, [r.id for r, _, _ in todo])
+                    for (r, _, _), change, (_, found) in zip(todo, changes, results):
+                        rollup.relabel(r.product_id, r.user_id, r.sentiment_label, change["sentiment_label"],
+                                       r.rating, r.text_length, r.review_date)
+                        rollup.reaspect(r.product_id, old_aspects.get(r.id), found)
+
+                if changes:
+                    with prof.stage("insert"):
+                        db.execute(update(Feedback), changes)
+                        aspects.store(db, {r.id: found for (r, _, _), (_, found) in zip(todo, results)},
+                                      replace=True)
+                        rollup.apply(db)
+                with prof.stage("commit"):
+                    if dry_run:
+                        db.rollback()
+                    else:
+                        db.commit()
+                updated += len(changes)
+                prof.advance(len(rows))
+
+                if max_rows_per_sec:
+                    # sleep off whatever is left of this batch's time budget
+                    budget = len(rows) / max_rows_per_sec
+                    elapsed = time.monotonic() - started
+                    if elapsed < budget:
+                        with prof.stage("throttle"):
+                            time.sleep(budget - elapsed)
+
+        print(f"✅ Done. Rescored {updated} feedback rows (scanned {scanned})."
+              + (" (dry run, rolled back)" if dry_run else ""))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        db.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Label feedback sentiment")
+    parser.add_argument("--rescore", action="store_true",
+                        help="rescore rows with a missing or outdated scorer version")
+    parser.add_argument("--verify-text", action="store_true",
+                        help="with --rescore, also sweep all rows for text changes")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-rate", type=float, default=None,
+                        help="with --rescore, max rows per second")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="write a cProfile/tracemalloc snapshot of the run")
+    parser.add_argument("--workers", type=int, default=1, help="scorer processes")
+    args = parser.parse_args()
+    if args.rescore:
+        rescore(args.batch_size, args.max_rate, args.verify_text, args.profile, args.workers)
+    else:
+        main(args.profile, args.workers, args.batch_size)
@@ -0,0 +1,165 @@
+# app/shared_store.py
+"""
+Read-mostly snapshots shared by all API worker processes through mmap.
+
+A snapshot is a set of NumPy arrays (+ a small JSON meta dict) written once
+by a loader process (app.store_loader, run after import/scoring jobs) and
+memory-mapped read-only by every worker. The pages live in the OS page
+cache once, so adding a worker does not add another copy and no worker
+rebuilds anything on start-up.
+
+Layout under SHARED_STORE_DIR:
+
+    <name>/gen-<timestamp>/<array>.npy, meta.json
+    <name>/CURRENT          -> name of the live generation directory
+
+Publishing writes a new generation next to the old one and then swaps
+CURRENT atomically (os.replace); workers notice within REFRESH_SECONDS and
+re-map. Old generations are pruned, which is safe on POSIX because
+existing mmaps keep the unlinked files alive.
+
+Routes that have a SQL path only read snapshots when USE_SHARED_STORE=1
+(the production serving profile, see gunicorn.conf.py); snapshot-only
+features such as /analytics always read them.
+NumPy is imported lazily so API start-up does not pay for it.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_DIR = Path(os.getenv("SHARED_STORE_DIR", str(BASE_DIR / "var" / "shared_store")))
+REFRESH_SECONDS = float(os.getenv("SHARED_STORE_REFRESH_SECONDS", "2"))
+KEEP_GENERATIONS = 2
+
+
+def enabled():
+    return os.getenv("USE_SHARED_STORE", "0") == "1"
+
+
+# =========================
+# STRING TABLES
+# - a list of str stored as one utf-8 blob + offsets, so it can be mmapped
+# =========================
+def encode_strings(values):
+    import numpy as np
+
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+class Snapshot:
+    def __init__(self, name, path):
+        import numpy as np
+
+        self.name = name
+        self.path = path
+        with open(path / "meta.json") as f:
+            self.meta = json.load(f)
+        self.arrays = {
+            p.stem: np.load(p, mmap_mode="r") for p in path.glob("*.npy")
+        }
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def string(self, column, i):
+        """i-th entry of a string table published as <column>_blob/<column>_offsets."""
+        offsets = self.arrays[f"{column}_offsets"]
+        raw = self.arrays[f"{column}_blob"][offsets[i]:offsets[i + 1]]
+        return bytes(raw).decode("utf-8") or None
+
+    def lookup(self, key_column, key):
+        """Row index of `key` in a sorted int key column, or None."""
+        import numpy as np
+
+        keys = self.arrays[key_column]
+        i = int(np.searchsorted(keys, key))
+        if i < len(keys) and keys[i] == key:
+            return i
+        return None
+
+
+# =========================
+# WRITER (loader process)
+# =========================
+def publish(name, arrays, meta=None, store_dir=None):
+    """Write a new generation of snapshot `name` and make it current."""
+    import numpy as np
+
+    root = Path(store_dir or STORE_DIR) / name
+    root.mkdir(parents=True, exist_ok=True)
+    gen = f"gen-{time.time_ns()}"
+    tmp = root / f".{gen}.tmp"
+    tmp.mkdir()
+    for key, arr in arrays.items():
+        np.save(tmp / f"{key}.npy", np.ascontiguousarray(arr))
+    with open(tmp / "meta.json", "w") as f:
+        json.dump(dict(meta or {}, published_at=time.time()), f)
+    os.replace(tmp, root / gen)
+
+    current_tmp = root / ".CURRENT.tmp"
+    current_tmp.write_text(gen)
+    os.replace(current_tmp, root / "CURRENT")
+
+    gens = sorted(p for p in root.glob("gen-*") if p.is_dir())
+    for old in gens[:-KEEP_GENERATIONS]:
+        shutil.rmtree(old, ignore_errors=True)
+    return root / gen
+
+
+def current(name, store_dir=None):
+    """Freshly opened current snapshot `name` (uncached), or None."""
+    root = Path(store_dir or STORE_DIR) / name
+    try:
+        gen = (root / "CURRENT").read_text().strip()
+    except FileNotFoundError:
+        return None
+    return Snapshot(name, root / gen)
+
+
+# =========================
+# READER (API workers)
+# =========================
+_lock = threading.Lock()
+_attached = {}      # name -> (Snapshot, generation)
+_checked_at = {}    # name -> monotonic time of last CURRENT check
+
+
+def attach(name, store_dir=None):
+    """Current snapshot `name` (mmapped, cached per process), or None if never published."""
+    now = time.monotonic()
+    cached = _attached.get(name)
+    if cached is not None and now - _checked_at.get(name, 0) < REFRESH_SECONDS:
+        return cached[0]
+
+    with _lock:
+        _checked_at[name] = now
+        root = Path(store_dir or STORE_DIR) / name
+        try:
+            gen = (root / "CURRENT").read_text().strip()
+        except FileNotFoundError:
+            return None
+        if cached is not None and cached[1] == gen:
+            return cached[0]
+        snap = Snapshot(name, root / gen)
+        _attached[name] = (snap, gen)
+        return snap
+
+
+def generations(store_dir=None):
+    """{name: current generation} for every published snapshot; changes whenever one is republished."""
+    root = Path(store_dir or STORE_DIR)
+    out = {}
+    try:
+        for current_file in root.glob("*/CURRENT"):
+            out[current_file.parent.name] = current_file.read_text().strip()
+    except FileNotFoundError:   # republished mid-scan; the next check sees it
+        pass
+    return out
@@ -0,0 +1,112 @@
+# app/store_loader.py
+"""
+Builds the shared-memory snapshots (app.shared_store) from the database.
+
+Run after import and scoring jobs (the CLI does this automatically):
+
+    python -m app.cli store refresh
+"""
+import numpy as np
+from sqlalchemy import case, func
+
+from . import analytics
+from .database import SessionLocal
+from .models import Feedback, Product
+from .shared_store import current, encode_strings, publish
+
+YIELD_PER = 10_000
+
+
+def build_products(db, previous=None, relabel=False):
+    """Product lookup table: sorted ids + name/city/country strings + coordinates."""
+    query = (
+        db.query(Product.id, Product.name, Product.city, Product.country,
+                 Product.latitude, Product.longitude)
+        .order_by(Product.id)
+        .yield_per(YIELD_PER)
+    )
+    # stream the rows into plain column lists instead of holding every Row
+    cols = {c: [] for c in ("id", "name", "city", "country", "latitude", "longitude")}
+    for r in query:
+        cols["id"].append(r.id)
+        cols["name"].append(r.name)
+        cols["city"].append(r.city)
+        cols["country"].append(r.country)
+        cols["latitude"].append(r.latitude if r.latitude is not None else np.nan)
+        cols["longitude"].append(r.longitude if r.longitude is not None else np.nan)
+    arrays = {
+        "id": np.array(cols["id"], dtype=np.int64),
+        "latitude": np.array(cols["latitude"], dtype=np.float64),
+        "longitude": np.array(cols["longitude"], dtype=np.float64),
+    }
+    for col in ("name", "city", "country"):
+        blob, offsets = encode_strings(cols[col])
+        arrays[f"{col}_blob"] = blob
+        arrays[f"{col}_offsets"] = offsets
+    return arrays, {"count": len(cols["id"])}
+
+
+def build_product_sentiment(db, previous=None, relabel=False):
+    """Per-product sentiment counts and rating sums, plus the overall totals in meta."""
+    rows = (
+        db.query(
+            Feedback.product_id,
+            func.sum(case((Feedback.sentiment_label == "positive", 1), else_=0)),
+            func.sum(case((Feedback.sentiment_label == "neutral", 1), else_=0)),
+            func.sum(case((Feedback.sentiment_label == "negative", 1), else_=0)),
+            func.count(Feedback.id),
+            func.sum(Feedback.rating),
+            func.count(Feedback.rating),
+        )
+        .group_by(Feedback.product_id)
+        .order_by(Feedback.product_id)
+        .all()
+    )
+    table = np.array([[int(v or 0) for v in r] for r in rows], dtype=np.int64).reshape(-1, 7)
+    arrays = {
+        "product_id": table[:, 0],
+        "positive": table[:, 1],
+        "neutral": table[:, 2],
+        "negative": table[:, 3],
+        "total": table[:, 4],
+        "rating_sum": table[:, 5],
+        "rating_count": table[:, 6],
+    }
+    overview = {
+        "positive": int(table[:, 1].sum()),
+        "neutral": int(table[:, 2].sum()),
+        "negative": int(table[:, 3].sum()),
+        "total": int(table[:, 4].sum()),
+    }
+    return arrays, {"overview": overview}
+
+
+# snapshot name -> builder(db, previous, relabel) returning (arrays, meta);
+# `previous` is the current snapshot, for builders that refresh incrementally
+BUILDERS = {
+    "products": build_products,
+    "product_sentiment": build_product_sentiment,
+    "analytics": analytics.build,
+}
+
+
+def refresh(names=None, store_dir=None, relabel=False):
+    """
+    Rebuild and publish the given snapshots (default: all).
+
+    relabel: re-read every sentiment label in incremental snapshots (after a
+    rescoring run) instead of only the previously unscored ones.
+    """
+    db = SessionLocal()
+    try:
+        for name in names or BUILDERS:
+            previous = current(name, store_dir)
+            arrays, meta = BUILDERS[name](db, previous, relabel)
+            path = publish(name, arrays, meta, store_dir=store_dir)
+            print(f"📦 Published {name} -> {path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    refresh()
@@ -0,0 +1,147 @@
+# app/textstore.py
+"""
+Review title/text storage: the feedback_text side table.
+
+`feedback` only holds the narrow, mostly fixed-width columns the
+aggregations read (product_id, user_id, rating, review_date,
+sentiment_label, text_length, ...). The text is stored one row per feedback
+in feedback_text. It is read only by the code that needs it: the scorer,
+GET /feedback/ and the cold archive (app.partitioning).
+
+Bodies are encoded with TEXT_CODEC ($FEEDBACK_TEXT_CODEC):
+- "zlib" (default): zlib level 6 for texts of at least COMPRESS_MIN_BYTES;
+  shorter ones stay plain, since the header would cost more than it saves
+- "plain": UTF-8 bytes
+
+Each row records its codec, so changing the setting only affects new rows.
+
+Databases created before the split still have feedback.title/text:
+`python -m app.cli text migrate` copies them over in batches and can then
+drop the old columns. `python -m bench.text_split` measures the scan and
+storage difference.
+"""
+import os
+import zlib
+
+from .models import FeedbackText
+
+TEXT_CODEC = os.getenv("FEEDBACK_TEXT_CODEC", "zlib")
+CODECS = ("plain", "zlib")
+COMPRESS_MIN_BYTES = 128
+ZLIB_LEVEL = 6
+IN_BATCH = 5000
+
+if TEXT_CODEC not in CODECS:
+    raise ValueError(f"FEEDBACK_TEXT_CODEC must be one of {CODECS}, got {TEXT_CODEC!r}")
+
+
+# =========================
+# ENCODING
+# =========================
+def encode(text, codec=None):
+    """text -> (codec, body bytes); (plain, None) for a missing text."""
+    if text is None:
+        return "plain", None
+    raw = text.encode("utf-8")
+    if (codec or TEXT_CODEC) == "zlib" and len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, ZLIB_LEVEL)
+        if len(packed) < len(raw):
+            return "zlib", packed
+    return "plain", raw
+
+
+def decode(codec, body):
+    if body is None:
+        return None
+    if codec == "zlib":
+        body = zlib.decompress(body)
+    return bytes(body).decode("utf-8")
+
+
+def make(title, text):
+    """FeedbackText for Feedback(content=...); feedback_id is filled in on flush."""
+    codec, body = encode(text)
+    return FeedbackText(title=title, codec=codec, body=body)
+
+
+def row(feedback_id, title, text):
+    """Dict for bulk insert(FeedbackText)."""
+    codec, body = encode(text)
+    return {"feedback_id": feedback_id, "title": title, "codec": codec, "body": body}
+
+
+# =========================
+# READING
+# =========================
+def load(db, feedback_ids):
+    """{feedback_id: (title, text)} for the given ids (missing ids -> no key)."""
+    out = {}
+    ids = list(feedback_ids)
+    for start in range(0, len(ids), IN_BATCH):
+        for fid, title, codec, body in (
+            db.query(FeedbackText.feedback_id, FeedbackText.title, FeedbackText.codec, FeedbackText.body)
+            .filter(FeedbackText.feedback_id.in_(ids[start:start + IN_BATCH]))
+        ):
+            out[fid] = (title, decode(codec, body))
+    return out
+
+
+def texts(db, feedback_ids):
+    """Texts in feedback_ids order (None where missing), e.g. for score_texts()."""
+    loaded = load(db, feedback_ids)
+    return [loaded.get(i, (None, None))[1] for i in feedback_ids]
+
+
+def delete(db, feedback_ids):
+    ids = list(feedback_ids)
+    for start in range(0, len(ids), IN_BATCH):
+        db.query(FeedbackText).filter(
+            FeedbackText.feedback_id.in_(ids[start:start + IN_BATCH])
+        ).delete(synchronize_session=False)
+
+
+# =========================
+# MIGRATION FROM feedback.title/text
+# =========================
+def legacy_columns(db):
+    from sqlalchemy import inspect
+    names = {c["name"] for c in inspect(db.get_bind()).get_columns("feedback")}
+    return [c for c in ("title", "text") if c in names]
+
+
+def migrate(db, batch_size=5000, drop_columns=False):
+    """
+    Copy feedback.title/text into feedback_text (rows already there are
+    skipped, so it can resume) and optionally drop the old columns.
+    Returns the number of rows copied.
+    """
+    from sqlalchemy import insert, text as sql
+
+    cols = legacy_columns(db)
+    if not cols:
+        print("ℹ️  feedback has no title/text columns; nothing to migrate")
+        return 0
+    title_expr = "f.title" if "title" in cols else "NULL"
+    text_expr = "f.text" if "text" in cols else "NULL"
+    select = sql(
+        f"SELECT f.id, {title_expr}, {text_expr} FROM feedback f "
+        "LEFT JOIN feedback_text t ON t.feedback_id = f.id "
+        "WHERE f.id > :last AND t.feedback_id IS NULL ORDER BY f.id LIMIT :n"
+    )
+    copied, last_id = 0, 0
+    while True:
+        rows = db.execute(select, {"last": last_id, "n": batch_size}).all()
+        if not rows:
+            break
+        db.execute(insert(FeedbackText), [row(fid, title, text) for fid, title, text in rows])
+        db.commit()
+        copied += len(rows)
+        last_id = rows[-1][0]
+        print(f"...copied {copied} rows")
+
+    if drop_columns:
+        for c in cols:
+            db.execute(sql(f"ALTER TABLE feedback DROP COLUMN {c}"))
+        db.commit()
+        print(f"🗑️  dropped feedback.{', feedback.'.join(cols)}")
+    return copied
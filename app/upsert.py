@@ -0,0 +1,52 @@
+# app/upsert.py
+"""
+INSERT statements that tolerate a row another transaction just created.
+
+Rollup writers look up which keys exist and insert the rest. Two jobs can
+both miss the same new key (product, user, category, month, ...) and both
+insert it. These statements turn the loser's INSERT into a no-op
+(insert_ignore) or into an increment of the row the winner created
+(insert_or_add), instead of an IntegrityError:
+
+- MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+- SQLite / PostgreSQL: INSERT ... ON CONFLICT (keys) DO NOTHING / DO UPDATE
+
+Other backends get a plain INSERT.
+"""
+from sqlalchemy import insert
+
+
+def _dialect_insert(db, table):
+    name = db.get_bind().dialect.name
+    if name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return name, insert(table)
+    return name, dialect_insert(table)
+
+
+def insert_ignore(db, table, keys):
+    """INSERT that skips rows whose primary key `keys` already exist."""
+    name, stmt = _dialect_insert(db, table)
+    if name == "mysql":
+        # no-op assignment; unlike INSERT IGNORE it does not swallow other errors
+        return stmt.on_duplicate_key_update({keys[0]: table.c[keys[0]]})
+    if name in ("sqlite", "postgresql"):
+        return stmt.on_conflict_do_nothing(index_elements=list(keys))
+    return stmt
+
+
+def insert_or_add(db, table, keys, counters):
+    """INSERT that, for an existing key, adds the row's `counters` to the stored ones."""
+    name, stmt = _dialect_insert(db, table)
+    if name == "mysql":
+        return stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in counters})
+    if name in ("sqlite", "postgresql"):
+        return stmt.on_conflict_do_update(
+            index_elements=list(keys), set_={c: table.c[c] + stmt.excluded[c] for c in counters}
+        )
+    return stmt
@@ -0,0 +1,45 @@
+"""
+Compare two bench.run result files.
+
+    python -m bench.compare bench/results/old.json bench/results/new.json
+"""
+import json
+import sys
+
+# (section, metric, higher_is_better)
+METRICS = [
+    ("import", "rows_per_sec", True),
+    ("score", "rows_per_sec", True),
+]
+ROUTE_METRICS = [("p50_ms", False), ("p99_ms", False), ("rps", True)]
+
+
+def _fmt(old, new, higher_is_better):
+    if old in (None, 0) or new is None:
+        return f"{old} -> {new}"
+    change = (new - old) / old * 100.0
+    better = change > 0 if higher_is_better else change < 0
+    mark = "+" if better else "-" if abs(change) >= 5 else " "
+    return f"{old:>10} -> {new:>10}  ({change:+6.1f}%) {mark}"
+
+
+def main(old_path, new_path):
+    old = json.load(open(old_path))
+    new = json.load(open(new_path))
+    print(f"old: {old['meta'].get('git')}  new: {new['meta'].get('git')}")
+    for section, metric, hib in METRICS:
+        if section in old or section in new:
+            o = old.get(section, {}).get(metric)
+            n = new.get(section, {}).get(metric)
+            print(f"{section + '.' + metric:<45} {_fmt(o, n, hib)}")
+    for route in sorted(set(old.get("routes", {})) | set(new.get("routes", {}))):
+        for metric, hib in ROUTE_METRICS:
+            o = old.get("routes", {}).get(route, {}).get(metric)
+            n = new.get("routes", {}).get(route, {}).get(metric)
+            print(f"{route + ' ' + metric:<45} {_fmt(o, n, hib)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,214 @@
+"""
+End-to-end benchmark: synthetic load -> import -> scoring -> API latency.
+
+Creates (or reuses) a synthetic CSV, loads it into a scratch database
+(SQLite by default, or any DATABASE_URL such as a local MySQL), then records
+
+- import throughput of app.import_all (rows/sec)
+- throughput of app.sentiment_analyzer over the freshly imported rows
+- p50/p99/mean latency of every GET route in app.main under concurrency
+
+into a JSON results file with stable key order, so two runs can be compared
+with `python -m bench.compare old.json new.json` (or a plain diff).
+
+    python -m bench.run --rows 1000000 --concurrency 16
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+# extra query strings for routes that need them to do representative work
+ROUTE_PARAMS = {
+    "/sentiment/trend/overall": "start=2015-01&end=2016-12",
+    "/feedback/": "limit=50",
+}
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = min(len(sorted_vals) - 1, max(0, round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def fresh_database(url):
+    """Point the app at `url` and (re)create all tables."""
+    os.environ["DATABASE_URL"] = url
+    if url.startswith("sqlite:///"):
+        Path(url[len("sqlite:///"):]).unlink(missing_ok=True)
+    from app.database import Base, get_engine
+    import app.models  # noqa: F401  (register tables)
+    engine = get_engine()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def bench_import(csv_path, rows):
+    from app import import_all
+    t0 = time.perf_counter()
+    import_all.main(csv_path=csv_path)
+    secs = time.perf_counter() - t0
+    return {"rows": rows, "seconds": round(secs, 3), "rows_per_sec": round(rows / secs, 1)}
+
+
+def bench_score():
+    from app import sentiment_analyzer
+    from app.database import SessionLocal
+    from app.models import Feedback
+    db = SessionLocal()
+    rows = db.query(Feedback).filter(Feedback.sentiment_label == None).count()
+    db.close()
+    t0 = time.perf_counter()
+    sentiment_analyzer.main()
+    secs = time.perf_counter() - t0
+    return {"rows": rows, "seconds": round(secs, 3), "rows_per_sec": round(rows / secs, 1)}
+
+
+def get_routes():
+    """GET routes of app.main with path params filled in (id 1)."""
+    from fastapi.routing import APIRoute
+    from app.main import app
+    out = []
+    for r in app.routes:
+        if not isinstance(r, APIRoute) or "GET" not in r.methods:
+            continue
+        path = r.path
+        for name in r.param_convertors:
+            path = path.replace("{" + name + "}", "1")
+        qs = ROUTE_PARAMS.get(r.path)
+        out.append((r.path, path + ("?" + qs if qs else "")))
+    return out
+
+
+def start_server(url, port, workers):
+    env = dict(os.environ, DATABASE_URL=url)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=REPO_DIR, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/health", timeout=1).read()
+            return proc, base
+        except Exception:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not come up")
+
+
+def bench_route(base, path, requests, concurrency):
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + path, timeout=60) as resp:
+                resp.read()
+            ok = True
+        except urllib.error.HTTPError:
+            ok = False
+        return time.perf_counter() - t0, ok
+
+    # one warm-up request so connection/JIT-ish effects don't skew p99
+    one(None)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+
+    lat = sorted(r[0] * 1000.0 for r in results)
+    return {
+        "requests": requests,
+        "errors": sum(1 for r in results if not r[1]),
+        "p50_ms": round(percentile(lat, 50), 2),
+        "p99_ms": round(percentile(lat, 99), 2),
+        "mean_ms": round(sum(lat) / len(lat), 2),
+        "rps": round(requests / wall, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentiment System benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--csv", default=None, help="reuse an existing CSV instead of generating")
+    parser.add_argument("--db", default=f"sqlite:///{BENCH_DIR / 'data' / 'bench.db'}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the loaded --db")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args(argv)
+
+    (BENCH_DIR / "data").mkdir(exist_ok=True)
+    results = {
+        "meta": {
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "db": args.db.split(":", 1)[0],
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "uvicorn_workers": args.workers,
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+    }
+
+    if not args.skip_load:
+        csv_path = args.csv
+        if csv_path is None:
+            from bench.synthetic import generate
+            csv_path = str(BENCH_DIR / "data" / f"synthetic_{args.rows}.csv")
+            if not Path(csv_path).exists():
+                generate(args.rows, csv_path)
+        fresh_database(args.db)
+        results["import"] = bench_import(csv_path, args.rows)
+        results["score"] = bench_score()
+    else:
+        os.environ["DATABASE_URL"] = args.db
+
+    proc, base = start_server(args.db, args.port, args.workers)
+    try:
+        routes = {}
+        for name, path in get_routes():
+            routes[f"GET {name}"] = bench_route(base, path, args.requests, args.concurrency)
+            print(f"...{name}: {routes[f'GET {name}']}")
+        results["routes"] = routes
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    out = args.out or str(
+        BENCH_DIR / "results" / f"{datetime.utcnow():%Y%m%d-%H%M%S}-{results['meta']['git']}.json"
+    )
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"✅ Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
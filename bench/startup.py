@@ -0,0 +1,114 @@
+"""
+API cold-start benchmark and import-time budget check.
+
+Spawns fresh interpreters (like a newly scaled-out uvicorn worker) and
+measures `import app.main` plus the lifespan startup, then fails (exit 1)
+if the median exceeds the budget or if a heavy module got imported.
+
+The budget is relative to the machine: each run also times a bare
+`import fastapi` in its own interpreter, and the app may take at most
+--allowance-ms more than that baseline's median. --budget-ms sets a fixed
+budget instead.
+
+    python -m bench.startup --runs 10 --allowance-ms 400
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# must not be imported just by starting the API
+FORBIDDEN_MODULES = ("pandas", "textblob", "nltk")
+
+_PROBE = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+async def _startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        pass
+asyncio.run(_startup())
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "lifespan_ms": (t2 - t1) * 1000,
+    "heavy": sorted(m for m in %r if m in sys.modules),
+}))
+"""
+
+
+# what any FastAPI app pays before importing its own code
+_BASELINE = r"""
+import time
+t0 = time.perf_counter()
+import fastapi
+print((time.perf_counter() - t0) * 1000)
+"""
+
+
+def probe(database_url):
+    env = {"DATABASE_URL": database_url, "PATH": ""}
+    out = subprocess.check_output(
+        [sys.executable, "-c", _PROBE % (FORBIDDEN_MODULES,)], cwd=REPO_DIR, env=env, text=True,
+    )
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def baseline():
+    out = subprocess.check_output([sys.executable, "-c", _BASELINE], cwd=REPO_DIR, env={"PATH": ""}, text=True)
+    return float(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--allowance-ms", type=float, default=400.0,
+                        help="max median import+startup time above the bare `import fastapi` median")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fixed max median import+startup time (overrides --allowance-ms)")
+    parser.add_argument("--db", default="sqlite://", help="DATABASE_URL for the probe")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    # interleaved, so both medians see the same machine load
+    runs, base = [], []
+    for _ in range(args.runs):
+        base.append(baseline())
+        runs.append(probe(args.db))
+    total = sorted(r["import_ms"] + r["lifespan_ms"] for r in runs)
+    baseline_ms = round(statistics.median(base), 1)
+    budget_ms = args.budget_ms if args.budget_ms is not None else baseline_ms + args.allowance_ms
+    result = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "lifespan_ms_median": round(statistics.median(r["lifespan_ms"] for r in runs), 1),
+        "total_ms_median": round(statistics.median(total), 1),
+        "total_ms_max": round(total[-1], 1),
+        "baseline_ms_median": baseline_ms,
+        "budget_ms": round(budget_ms, 1),
+        "heavy_modules": runs[0]["heavy"],
+    }
+    print(json.dumps(result, indent=2, sort_keys=True))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+    failed = False
+    if result["heavy_modules"]:
+        print(f"❌ heavy modules imported at startup: {', '.join(result['heavy_modules'])}")
+        failed = True
+    if result["total_ms_median"] > budget_ms:
+        print(f"❌ startup {result['total_ms_median']} ms over budget {result['budget_ms']} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Synthetic review generator in the Datafiniti `7282_1.csv` schema.
+
+Produces any number of rows (1M–50M is the intended range) with roughly the
+shape of the real dump: Zipf-distributed product popularity (~25 reviews per
+hotel on average), a long tail of mostly one-off reviewers, skewed ratings,
+log-normal review lengths and more recent dates being more common.
+
+    python -m bench.synthetic --rows 1000000 --out bench/data/synth_1m.csv
+"""
+import argparse
+import csv
+import time
+
+import numpy as np
+
+COLUMNS = [
+    "address", "categories", "city", "country", "latitude", "longitude",
+    "name", "postalCode", "province",
+    "reviews.date", "reviews.dateAdded", "reviews.doRecommend", "reviews.id",
+    "reviews.rating", "reviews.text", "reviews.title",
+    "reviews.userCity", "reviews.username", "reviews.userProvince",
+]
+
+REVIEWS_PER_PRODUCT = 25
+REVIEWS_PER_USER = 1.3
+RATING_P = [0.05, 0.07, 0.13, 0.30, 0.45]  # 1..5 stars
+CHUNK_ROWS = 100_000
+
+CATEGORIES = [
+    "Hotels", "Hotels,Lodging", "Hotels and motels,Hotel",
+    "Motels,Hotels", "Resorts,Hotels,Lodging", "Bed & Breakfast,Lodging",
+]
+NAME_WORDS = [
+    "Grand", "Harbor", "Plaza", "Inn", "Suites", "Lodge", "Royal", "Park",
+    "Garden", "Bay", "Riverside", "Summit", "Central", "Airport", "Comfort",
+]
+STREETS = ["Main St", "Oak Ave", "Park Rd", "Broadway", "Ocean Dr", "Hwy 1", "Elm St"]
+
+POSITIVE = [
+    "The room was spotless and the bed was very comfortable.",
+    "Staff were friendly and helpful from check-in to check-out.",
+    "Great location, walking distance to everything.",
+    "Breakfast was excellent with plenty of choice.",
+    "Amazing value for the price, would definitely stay again.",
+    "The pool and gym were clean and well maintained.",
+]
+NEGATIVE = [
+    "The room was dirty and smelled of smoke.",
+    "Front desk staff were rude and unhelpful.",
+    "Terrible wifi, it kept dropping all night.",
+    "Very noisy, we could hear the street until 3am.",
+    "Overpriced for what you get, bathroom was broken.",
+    "Worst breakfast I have ever had at a hotel.",
+]
+NEUTRAL = [
+    "We stayed two nights for a conference.",
+    "Parking is available on site for a fee.",
+    "The hotel is close to the highway.",
+    "Check-in was at 3pm and check-out at 11am.",
+    "Rooms have a TV, a desk and a small fridge.",
+    "It is a typical chain hotel.",
+]
+TITLES = {
+    1: ["Awful", "Never again", "Disappointing"],
+    2: ["Not great", "Could be better", "Meh"],
+    3: ["Okay stay", "Average", "Fine for a night"],
+    4: ["Good hotel", "Nice stay", "Would return"],
+    5: ["Excellent!", "Loved it", "Perfect stay"],
+}
+
+# (city, province, lat, lon) — a few real anchors, jittered per product
+CITIES = [
+    ("New York", "NY", 40.71, -74.00), ("Los Angeles", "CA", 34.05, -118.24),
+    ("Chicago", "IL", 41.88, -87.63), ("Houston", "TX", 29.76, -95.37),
+    ("Phoenix", "AZ", 33.45, -112.07), ("Philadelphia", "PA", 39.95, -75.17),
+    ("San Antonio", "TX", 29.42, -98.49), ("San Diego", "CA", 32.72, -117.16),
+    ("Dallas", "TX", 32.78, -96.80), ("Austin", "TX", 30.27, -97.74),
+    ("Boston", "MA", 42.36, -71.06), ("Seattle", "WA", 47.61, -122.33),
+    ("Denver", "CO", 39.74, -104.99), ("Miami", "FL", 25.76, -80.19),
+    ("Orlando", "FL", 28.54, -81.38), ("Atlanta", "GA", 33.75, -84.39),
+    ("Las Vegas", "NV", 36.17, -115.14), ("Nashville", "TN", 36.16, -86.78),
+    ("New Orleans", "LA", 29.95, -90.07), ("Portland", "OR", 45.52, -122.68),
+]
+
+
+def _products(rng, n_products):
+    city_idx = rng.integers(0, len(CITIES), n_products)
+    jitter = rng.normal(0, 0.08, (n_products, 2))
+    out = []
+    for i in range(n_products):
+        city, prov, lat, lon = CITIES[city_idx[i]]
+        w1, w2 = rng.choice(NAME_WORDS, 2, replace=False)
+        out.append({
+            "address": f"{100 + i % 9900} {STREETS[i % len(STREETS)]}",
+            "categories": CATEGORIES[i % len(CATEGORIES)],
+            "city": city,
+            "country": "US",
+            "latitude": round(lat + jitter[i, 0], 6),
+            "longitude": round(lon + jitter[i, 1], 6),
+            "name": f"{w1} {w2} Hotel {i}",
+            "postalCode": f"{(i * 7919) % 100000:05d}",
+            "province": prov,
+        })
+    return out
+
+
+def _text(rng, rating, n_sentences):
+    # sentence mix leans with the rating so TextBlob labels look plausible
+    p_pos = (rating - 1) / 4.0
+    parts = []
+    for _ in range(n_sentences):
+        r = rng.random()
+        if r < 0.25:
+            pool = NEUTRAL
+        elif r < 0.25 + 0.75 * p_pos:
+            pool = POSITIVE
+        else:
+            pool = NEGATIVE
+        parts.append(pool[int(rng.integers(0, len(pool)))])
+    return " ".join(parts)
+
+
+def generate(rows, out_path, seed=42):
+    """Write `rows` synthetic reviews to `out_path`; returns (products, users)."""
+    rng = np.random.default_rng(seed)
+    n_products = max(1, rows // REVIEWS_PER_PRODUCT)
+    n_users = max(1, int(rows / REVIEWS_PER_USER))
+    products = _products(rng, n_products)
+
+    # Zipf-ish popularity: a few hotels get a lot of reviews
+    weights = 1.0 / np.arange(1, n_products + 1) ** 0.8
+    weights /= weights.sum()
+
+    start = np.datetime64("2005-01-01")
+    span_days = (np.datetime64("2018-12-31") - start).astype(int)
+
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        written = 0
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            pids = rng.choice(n_products, n, p=weights)
+            uids = rng.integers(0, n_users, n)
+            ratings = rng.choice(5, n, p=RATING_P) + 1
+            # ~2-3 sentences median, long tail of essays
+            n_sent = np.clip(rng.lognormal(1.0, 0.6, n).astype(int), 1, 40)
+            # recent years are busier: sqrt skews towards the end of the span
+            days = (np.sqrt(rng.random(n)) * span_days).astype(int)
+            dates = (start + days.astype("timedelta64[D]")).astype(str)
+
+            for k in range(n):
+                p = products[pids[k]]
+                rating = int(ratings[k])
+                w.writerow([
+                    p["address"], p["categories"], p["city"], p["country"],
+                    p["latitude"], p["longitude"], p["name"], p["postalCode"],
+                    p["province"],
+                    f"{dates[k]}T00:00:00Z", f"{dates[k]}T00:00:00Z",
+                    "", written + k + 1, rating,
+                    _text(rng, rating, int(n_sent[k])),
+                    TITLES[rating][k % 3],
+                    p["city"], f"user{uids[k]}", p["province"],
+                ])
+            written += n
+            print(f"...generated {written}/{rows} rows")
+    return n_products, n_users
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", default="bench/data/synthetic.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    n_products, n_users = generate(args.rows, args.out, args.seed)
+    print(f"✅ Wrote {args.rows} rows ({n_products} products, ~{n_users} users) "
+          f"to {args.out} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
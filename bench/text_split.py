@@ -0,0 +1,185 @@
+"""
+Wide vs split feedback layout: aggregate scan time and storage.
+
+Loads the same synthetic reviews into two SQLite files:
+
+- wide:  feedback with title/text inline (the layout before feedback_text)
+- split: narrow feedback + feedback_text (app.textstore, with the codec
+         given by --codec)
+
+It then times the aggregations the sentiment routes run (overview totals,
+per-product SUM(CASE ...) and monthly trend) on fresh connections with a
+small page cache, so every run has to pull the table's pages through it.
+It also reports the file size and, where SQLite has dbstat, the bytes per
+table.
+
+    python -m bench.text_split --rows 200000 --codec zlib --out bench/data/text_split.json
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from bench import synthetic
+
+WIDE_DDL = """
+CREATE TABLE feedback (
+    id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, user_id INTEGER, rating INTEGER,
+    title VARCHAR(255), text TEXT, review_date DATETIME, sentiment_label VARCHAR(20),
+    scored_with_version VARCHAR(20), text_hash VARCHAR(40), text_length INTEGER, created_at DATETIME
+)"""
+SPLIT_DDL = """
+CREATE TABLE feedback (
+    id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, user_id INTEGER, rating INTEGER,
+    review_date DATETIME, sentiment_label VARCHAR(20),
+    scored_with_version VARCHAR(20), text_hash VARCHAR(40), text_length INTEGER, created_at DATETIME
+);
+CREATE TABLE feedback_text (
+    feedback_id INTEGER PRIMARY KEY, title VARCHAR(255), codec VARCHAR(10) NOT NULL, body BLOB
+)"""
+INDEXES = """
+CREATE INDEX ix_feedback_product_id ON feedback (product_id);
+CREATE INDEX ix_feedback_review_date ON feedback (review_date)"""
+
+# the scans behind /sentiment/overview, /sentiment/by-product and the old trend query
+QUERIES = {
+    "overview": """
+        SELECT SUM(CASE WHEN sentiment_label = 'positive' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN sentiment_label = 'neutral' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN sentiment_label = 'negative' THEN 1 ELSE 0 END),
+               COUNT(id)
+        FROM feedback""",
+    "by_product": """
+        SELECT product_id,
+               SUM(CASE WHEN sentiment_label = 'positive' THEN 1 ELSE 0 END),
+               COUNT(id), AVG(rating)
+        FROM feedback GROUP BY product_id""",
+    "monthly": """
+        SELECT substr(review_date, 1, 7) AS period,
+               SUM(CASE WHEN sentiment_label = 'negative' THEN 1 ELSE 0 END), COUNT(id)
+        FROM feedback GROUP BY period""",
+}
+LABELS = ("positive", "neutral", "negative")
+
+
+def _rows(csv_path):
+    """(id, product_id, user_id, rating, title, text, review_date, label, length) from the CSV."""
+    products, users = {}, {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for i, r in enumerate(csv.DictReader(f), start=1):
+            pid = products.setdefault(r["name"], len(products) + 1)
+            uid = users.setdefault(r["reviews.username"], len(users) + 1)
+            rating = int(r["reviews.rating"])
+            text = r["reviews.text"]
+            label = LABELS[0] if rating >= 4 else LABELS[1] if rating == 3 else LABELS[2]
+            yield (i, pid, uid, rating, r["reviews.title"], text,
+                   r["reviews.date"][:10] + " 00:00:00.000000", label, len(text))
+
+
+def load(db_path, csv_path, layout, codec):
+    from app import textstore
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript((WIDE_DDL if layout == "wide" else SPLIT_DDL) + ";" + INDEXES)
+    batch, texts = [], []
+
+    def flush():
+        if layout == "wide":
+            conn.executemany("INSERT INTO feedback VALUES (?,?,?,?,?,?,?,?,'v',NULL,?,NULL)", batch)
+        else:
+            conn.executemany("INSERT INTO feedback VALUES (?,?,?,?,?,?,'v',NULL,?,NULL)", batch)
+            conn.executemany("INSERT INTO feedback_text VALUES (?,?,?,?)", texts)
+        batch.clear()
+        texts.clear()
+
+    for fid, pid, uid, rating, title, text, date, label, length in _rows(csv_path):
+        if layout == "wide":
+            batch.append((fid, pid, uid, rating, title, text, date, label, length))
+        else:
+            batch.append((fid, pid, uid, rating, date, label, length))
+            texts.append((fid, title, *textstore.encode(text, codec)))
+        if len(batch) >= 10_000:
+            flush()
+    flush()
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def table_bytes(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ('feedback', 'feedback_text') GROUP BY name"
+        ).fetchall()
+        return dict(rows)
+    except sqlite3.OperationalError:   # SQLite built without dbstat
+        return {}
+    finally:
+        conn.close()
+
+
+def time_queries(db_path, runs, cache_kib):
+    out = {}
+    for name, sql in QUERIES.items():
+        times = []
+        for _ in range(runs):
+            conn = sqlite3.connect(db_path)
+            conn.execute(f"PRAGMA cache_size = -{cache_kib}")
+            t0 = time.perf_counter()
+            conn.execute(sql).fetchall()
+            times.append((time.perf_counter() - t0) * 1000)
+            conn.close()
+        out[name] = round(statistics.median(times), 2)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wide vs split feedback layout benchmark")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--csv", default=None, help="existing synthetic CSV (default: generate one)")
+    parser.add_argument("--codec", choices=("plain", "zlib"), default="zlib")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cache-kib", type=int, default=2000, help="SQLite page cache per connection")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = tmp / "reviews.csv"
+            synthetic.generate(args.rows, csv_path)
+
+        result = {"rows": args.rows, "codec": args.codec, "runs": args.runs, "cache_kib": args.cache_kib}
+        for layout in ("wide", "split"):
+            db_path = tmp / f"{layout}.db"
+            load(db_path, csv_path, layout, args.codec)
+            result[layout] = {
+                "file_bytes": db_path.stat().st_size,
+                "table_bytes": table_bytes(db_path),
+                "query_ms": time_queries(db_path, args.runs, args.cache_kib),
+            }
+
+    wide, split = result["wide"], result["split"]
+    result["speedup"] = {
+        name: round(wide["query_ms"][name] / split["query_ms"][name], 2) if split["query_ms"][name] else None
+        for name in QUERIES
+    }
+    if wide["table_bytes"] and split["table_bytes"]:
+        result["feedback_table_shrink"] = round(
+            wide["table_bytes"]["feedback"] / split["table_bytes"]["feedback"], 2)
+    result["storage_saving_pct"] = round(100 * (1 - split["file_bytes"] / wide["file_bytes"]), 1)
+
+    text = json.dumps(result, indent=2, sort_keys=True)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
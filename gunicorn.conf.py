@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+"""
+Production serving profile: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+(gunicorn is a deployment-only dependency; `uvicorn app.main:app --workers N`
+with USE_SHARED_STORE=1 gives the same sharing without process recycling.)
+
+- preload_app: app code is imported once in the master and shared
+  copy-on-write; the DB engine is still created per worker in the lifespan
+  handler, so no connections cross the fork.
+- USE_SHARED_STORE=1: workers attach to the mmapped snapshots published by
+  `python -m app.cli store refresh` instead of building their own caches,
+  so memory per added worker stays roughly constant.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then to cap slow leaks; jitter avoids a thundering herd
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+raw_env = [
+    "USE_SHARED_STORE=1",
+]
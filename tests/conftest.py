@@ -0,0 +1,32 @@
+import pytest
+
+from app import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Session on an empty SQLite database with every table created."""
+    from app import models  # noqa: F401  (registers the tables)
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("USE_SHARED_STORE", "0")
+    database.dispose_engine()
+    database.Base.metadata.create_all(database.get_engine())
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        database.dispose_engine()
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Empty shared-store directory, with the per-process attach cache reset."""
+    from app import shared_store
+
+    path = tmp_path / "shared_store"
+    monkeypatch.setattr(shared_store, "STORE_DIR", path)
+    monkeypatch.setattr(shared_store, "_attached", {})
+    monkeypatch.setattr(shared_store, "_checked_at", {})
+    return path
@@ -0,0 +1,142 @@
+"""
+Shared test data: Datafiniti-shaped CSVs and an import wrapper.
+
+Tests run against a fresh SQLite file per test (the `db` fixture in
+conftest.py), the same stand-in the benchmarks use, so no MySQL is needed:
+
+    python -m pytest -q
+"""
+import csv
+
+FIELDS = [
+    "address", "categories", "city", "country", "latitude", "longitude", "name", "postalCode",
+    "province", "reviews.date", "reviews.rating", "reviews.text", "reviews.title",
+    "reviews.userCity", "reviews.username", "reviews.userProvince",
+]
+CITIES = ["Denver", "Miami", "Phoenix"]
+
+LONG_REVIEW = (
+    "We stayed four nights in a corner room on the sixth floor and the view over the harbour "
+    "was lovely every single morning. Breakfast had fresh fruit, eggs cooked to order and good "
+    "coffee, the staff at the front desk remembered our names and helped us book a boat trip, "
+    "and the bed was firm and comfortable. The only downside was the slow lift at peak times."
+)
+OTHER_REVIEW = (
+    "Terrible experience from start to finish. The room smelled of smoke, the air conditioning "
+    "rattled all night, the bathroom sink was blocked and nobody at reception seemed to care when "
+    "we complained twice. Parking cost a fortune and the promised late checkout was refused."
+)
+NEGATIVE_REVIEW = "Awful, dirty and rude staff. The worst hotel we have ever stayed in, horrible."
+SHORT_REVIEWS = ["Nice.", "Clean rooms and a friendly, helpful staff."]
+
+
+def edit_one_word(text):
+    return text.replace("lovely", "wonderful")
+
+
+def write_csv(path, reviews):
+    """CSV in the Datafiniti layout; reviews = [(product_no, rating, text, date), ...]."""
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        for i, (product_no, rating, text, date) in enumerate(reviews):
+            w.writerow({
+                "address": f"{100 + product_no} Main St",
+                "categories": "Hotels,Lodging" if product_no % 2 else "Hotels",
+                "city": CITIES[product_no % len(CITIES)],
+                "country": "US",
+                "latitude": 30 + product_no * 0.1,
+                "longitude": -100 - product_no * 0.1,
+                "name": f"Test Hotel {product_no}",
+                "postalCode": "80202",
+                "province": "CO",
+                "reviews.date": date,
+                "reviews.rating": rating,
+                "reviews.text": text,
+                "reviews.title": f"Review {i}",
+                "reviews.userCity": "",
+                "reviews.username": f"user{i % 7}",
+                "reviews.userProvince": "",
+            })
+    return path
+
+
+def random_reviews(rng, n=40, products=6):
+    """n reviews spread over products, ratings (some missing) and 2015-2017 dates."""
+    texts = [LONG_REVIEW, OTHER_REVIEW, NEGATIVE_REVIEW] + SHORT_REVIEWS
+    return [
+        (rng.randrange(products), rng.choice([1, 2, 3, 4, 5, None]), rng.choice(texts),
+         f"201{rng.randrange(5, 8)}-{rng.randrange(1, 13):02d}-15")
+        for _ in range(n)
+    ]
+
+
+def import_csv(path, **kwargs):
+    """app.import_all on `path` in small chunks, scorer in-process."""
+    from app import import_all
+
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("chunk_size", 4)
+    import_all.main(str(path), **kwargs)
+
+
+# =========================
+# ROLLUPS
+# =========================
+def rollup_rows(db, model):
+    """A rollup table as sorted tuples, without the all-zero rows a rebuild never creates."""
+    cols = [c.name for c in model.__table__.c]
+    rows = []
+    for r in db.query(*model.__table__.c):
+        values = dict(zip(cols, r))
+        if values.get("total", 1) == 0 or values.get("count", 1) == 0 or values.get("n", 1) == 0:
+            continue
+        rows.append(tuple(round(v, 6) if isinstance(v, float) else v for v in r))
+    return sorted(rows, key=repr)
+
+
+def assert_rollup_matches_rebuild(db, name, *models):
+    """The incrementally maintained rollup `name` (app.rollups.REBUILDERS) equals a rebuild from feedback."""
+    from app import rollups
+
+    db.expire_all()
+    incremental = {m: rollup_rows(db, m) for m in models}
+    rollups.rebuild(db, [name])
+    rebuilt = {m: rollup_rows(db, m) for m in models}
+    db.rollback()
+    for m in models:
+        assert incremental[m] == rebuilt[m], m.__tablename__
+
+
+def run_pipeline(db, tmp_path, check, seed=7):
+    """
+    Import, score, edit + rescore and re-import a random CSV, calling
+    check() after each step: every path that maintains rollups incrementally.
+    """
+    import random
+
+    from sqlalchemy import update
+
+    from app import sentiment_analyzer, textstore
+    from app.models import Feedback, FeedbackText
+
+    path = write_csv(tmp_path / "pipeline.csv", random_reviews(random.Random(seed)))
+
+    # unscored import, then the batched scorer
+    import_csv(path, dedup="off")
+    check()
+    sentiment_analyzer.main(batch_size=7)
+    check()
+
+    # edited texts (as the app would: reset scored_with_version), rescored
+    edited = [fid for (fid,) in db.query(Feedback.id).filter(Feedback.sentiment_label == "positive").limit(5)]
+    codec, body = textstore.encode(NEGATIVE_REVIEW)
+    db.execute(update(FeedbackText).where(FeedbackText.feedback_id.in_(edited)).values(codec=codec, body=body))
+    db.execute(update(Feedback).where(Feedback.id.in_(edited)).values(scored_with_version=None))
+    db.commit()
+    sentiment_analyzer.rescore(batch_size=3)
+    check()
+
+    # scored import (with duplicate links) on top of existing rows
+    import_csv(path, score=True, dedup="link")
+    check()
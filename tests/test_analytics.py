@@ -0,0 +1,72 @@
+import random
+
+import pytest
+from sqlalchemy import case, extract, func, update
+
+from app import analytics, shared_store, store_loader
+from app.import_all import to_rating
+from app.models import Feedback, Product
+
+from .helpers import import_csv, random_reviews, write_csv
+
+
+@pytest.fixture
+def snap(db, tmp_path, store_dir):
+    reviews = random_reviews(random.Random(8), n=60, products=5)
+    reviews += [(1, 9, "Rated nine out of five somehow.", "2016-01-15"), (2, -2, "Negative stars.", "2016-02-15")]
+    import_csv(write_csv(tmp_path / "reviews.csv", reviews), score=True, dedup="off")
+    # a row written before ratings were validated
+    db.execute(update(Feedback).where(Feedback.id == 1).values(rating=7))
+    db.commit()
+    store_loader.refresh(names=["analytics"], store_dir=store_dir)
+    return shared_store.attach("analytics")
+
+
+def _sql_group_by(db, columns, names, *filters):
+    valid = case((Feedback.rating.between(0, analytics.MAX_RATING), Feedback.rating))
+    rows = (
+        db.query(*columns, func.count(Feedback.id), func.avg(valid), func.avg(Feedback.text_length),
+                 func.sum(case((Feedback.sentiment_label == "positive", 1), else_=0)))
+        .join(Product, Product.id == Feedback.product_id)
+        .filter(*filters)
+        .group_by(*columns)
+        .all()
+    )
+    out = {}
+    for r in rows:
+        key = tuple("unscored" if v is None and n == "label" else v for n, v in zip(names, r[:len(names)]))
+        count, avg_rating, avg_length, positive = r[len(names):]
+        out[key] = (count, None if avg_rating is None else round(float(avg_rating), 4),
+                    round(float(avg_length), 2), positive)
+    return out
+
+
+def _snap_group_by(snap, dims, filters=None):
+    return {
+        tuple(r[d] for d in dims): (r["count"], r["avg_rating"], r["avg_text_length"], r["positive"])
+        for r in analytics.group_by(snap, dims, filters, limit=10_000)
+    }
+
+
+def test_importer_drops_out_of_range_ratings():
+    assert [to_rating(x) for x in ("4.0", 5, 0, 9, -2, None, "n/a")] == [4, 5, 0, None, None, None, None]
+
+
+def test_group_by_matches_sql(db, snap):
+    assert _snap_group_by(snap, ["city", "label"]) == _sql_group_by(
+        db, [Product.city, Feedback.sentiment_label], ["city", "label"])
+    assert _snap_group_by(snap, ["rating"]) == _sql_group_by(
+        db, [Feedback.rating], ["rating"], Feedback.rating.between(0, analytics.MAX_RATING))
+
+
+def test_group_by_filters_match_sql(db, snap):
+    city = db.query(Product.city).first()[0]
+    year = extract("year", Feedback.review_date)
+    assert _snap_group_by(snap, ["year"], {"rating": "4", "city": city}) == _sql_group_by(
+        db, [year], ["year"], Feedback.rating == 4, Product.city == city)
+    assert _snap_group_by(snap, ["label"], {"month": "2016-02"}) == _sql_group_by(
+        db, [Feedback.sentiment_label], ["label"], func.strftime("%Y-%m", Feedback.review_date) == "2016-02")
+    # values that match nothing
+    assert _snap_group_by(snap, ["label"], {"city": "Atlantis"}) == {}
+    assert _snap_group_by(snap, ["label"], {"rating": "9"}) == {}
+    assert _snap_group_by(snap, ["label"], {"product_id": "abc"}) == {}
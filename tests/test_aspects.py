@@ -0,0 +1,44 @@
+import pytest
+
+from app import aspects
+from app.models import ProductAspect
+from app.sentiment_analyzer import analyze_sentiment
+
+from .helpers import (LONG_REVIEW, NEGATIVE_REVIEW, OTHER_REVIEW, SHORT_REVIEWS,
+                      assert_rollup_matches_rebuild, run_pipeline)
+
+CORPUS = [
+    LONG_REVIEW, OTHER_REVIEW, NEGATIVE_REVIEW, *SHORT_REVIEWS,
+    # negation
+    "The room was not good.", "Not bad at all, the staff were not unfriendly.",
+    "I would never say the location is great.",
+    # intensifiers
+    "The bed was very very comfortable!", "Extremely dirty bathroom and really rude reception.",
+    "Somewhat nice, slightly overpriced.", "GREAT location!!! Totally worth the money.",
+    # emoticons and punctuation
+    "Lovely stay :)", "Broken shower :( never again", "ok i guess ;-)", "Breakfast was :D",
+    "Room fine... staff fine... price fine.",
+    # mixed, multi-sentence, no opinion words
+    "Great view but the room smelled of smoke. Parking was cheap though.",
+    "We arrived on Tuesday. We left on Friday.", "Das Zimmer war sauber und ruhig.",
+    "12345", "!!!",
+    # empty
+    "", "   ", "\n\t", None,
+]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_review_label_matches_analyze_sentiment(text):
+    assert aspects.analyze(text)[0] == analyze_sentiment(text)
+
+
+def test_aspects_per_sentence():
+    label, found = aspects.analyze("Great view but the room smelled of smoke. Parking was cheap though.")
+    assert set(found) == {"room", "cleanliness", "location", "price"}
+    # word-bounded: "rate" is not in "separate", "ac" not in "place"
+    assert aspects.matched_aspects("a separate place") == set()
+    assert aspects.analyze("") == ("neutral", {})
+
+
+def test_product_aspects_match_rebuild(db, tmp_path):
+    run_pipeline(db, tmp_path, lambda: assert_rollup_matches_rebuild(db, "product_aspects", ProductAspect))
@@ -0,0 +1,54 @@
+import random
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.models import Product
+from app.routes_feedback_sentiment import MAX_BATCH_IDS, sentiment_for_products
+
+from .helpers import import_csv, random_reviews, write_csv
+
+
+def _products(db, tmp_path):
+    import_csv(write_csv(tmp_path / "r.csv", random_reviews(random.Random(8), n=30, products=4)), score=True)
+    db.add(Product(name="No Reviews Inn", city="Denver", country="US"))
+    db.commit()
+    return sorted(pid for (pid,) in db.query(Product.id))
+
+
+def test_batch_matches_single_lookups_in_request_order(db, tmp_path):
+    ids = _products(db, tmp_path)
+    unknown = max(ids) + 100
+    asked = [ids[2], unknown, ids[0], ids[-1], ids[2], ids[1]]
+    with TestClient(app) as client:
+        single = {pid: client.get(f"/sentiment/product/{pid}").json() for pid in ids}
+        posted = client.post("/sentiment/products/batch", json={"ids": asked}).json()
+        got = client.get("/sentiment/products/batch", params={"ids": ",".join(map(str, asked))}).json()
+    # unknown ids dropped, repeats collapsed, order kept
+    assert posted == got == [single[pid] for pid in (ids[2], ids[0], ids[-1], ids[1])]
+    assert posted[2]["reviews_count"] == 0 and posted[2]["avg_rating"] is None
+
+
+def test_batch_is_one_query(db, tmp_path):
+    ids = _products(db, tmp_path)
+    statements = []
+    listen = lambda conn, cursor, stmt, *a: statements.append(stmt)   # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listen)
+    try:
+        rows = sentiment_for_products(db, ids)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listen)
+    assert [r["product_id"] for r in rows] == ids
+    assert len(statements) == 1
+
+
+def test_batch_rejects_bad_ids(db):
+    with TestClient(app) as client:
+        assert client.post("/sentiment/products/batch", json={"ids": []}).status_code == 422
+        assert client.post("/sentiment/products/batch", json={"ids": ["x"]}).status_code == 422
+        too_many = list(range(1, MAX_BATCH_IDS + 2))
+        assert client.post("/sentiment/products/batch", json={"ids": too_many}).status_code == 422
+        assert client.get("/sentiment/products/batch", params={"ids": "1,a"}).status_code == 422
+        assert client.get("/sentiment/products/batch", params={"ids": ","}).status_code == 422
+        assert client.get("/sentiment/products/batch", params={"ids": "999"}).json() == []
@@ -0,0 +1,48 @@
+import random
+
+from click.testing import CliRunner
+
+from app import jobs
+from app.cli import cli
+from app.models import Feedback, Job
+
+from .helpers import random_reviews, write_csv
+
+
+def _run(db, *args):
+    url = str(db.get_bind().url)
+    return CliRunner().invoke(cli, ["--database-url", url, "--no-refresh-store", *args])
+
+
+def test_import_then_score_in_batches(db, tmp_path):
+    path = write_csv(tmp_path / "reviews.csv", random_reviews(random.Random(1), n=15))
+
+    result = _run(db, "import", "all", "--source", str(path), "--chunk-size", "4", "--dedup", "off")
+    assert result.exit_code == 0, result.output
+    assert db.query(Feedback).filter(Feedback.sentiment_label.is_(None)).count() == 15
+
+    result = _run(db, "score", "--batch-size", "4")
+    assert result.exit_code == 0, result.output
+    assert "Updated 15 feedback rows" in result.output
+    assert db.query(Feedback).filter(Feedback.sentiment_label.is_(None)).count() == 0
+
+    # both runs were recorded as finished jobs and released the lock
+    assert [(j.kind, j.status) for j in db.query(Job).order_by(Job.id)] == [
+        ("import", "succeeded"), ("score", "succeeded"),
+    ]
+
+
+def test_dry_run_rolls_back(db, tmp_path):
+    path = write_csv(tmp_path / "reviews.csv", random_reviews(random.Random(2), n=5))
+    result = _run(db, "--dry-run", "import", "all", "--source", str(path), "--score")
+    assert result.exit_code == 0, result.output
+    assert db.query(Feedback).count() == 0
+
+
+def test_refuses_to_run_while_the_feedback_lock_is_held(db, tmp_path):
+    path = write_csv(tmp_path / "reviews.csv", random_reviews(random.Random(3), n=5))
+    with jobs.cli_job("score", {}):
+        result = _run(db, "import", "all", "--source", str(path))
+    assert result.exit_code != 0
+    assert "Error" in result.output
+    assert db.query(Feedback).count() == 0
@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+import pytest
+
+from app import correlation
+from app.correlation import Moments
+from app.models import CorrelationHistogram, CorrelationMoments, Feedback
+
+from .helpers import OTHER_REVIEW, SHORT_REVIEWS, assert_rollup_matches_rebuild, import_csv, run_pipeline, write_csv
+
+
+def test_moments_remove_matches_recomputation():
+    rng = random.Random(3)
+    points = [(rng.uniform(0, 2000), rng.choice([1, 2, 3, 4, 5])) for _ in range(500)]
+    kept, removed = points[:320], points[320:]
+
+    got = Moments.of(points).remove(Moments.of(removed))
+    want = Moments.of(kept)
+    assert got.n == want.n
+    for attr in ("mean_x", "mean_y", "m2_x", "m2_y", "c_xy"):
+        assert getattr(got, attr) == pytest.approx(getattr(want, attr), rel=1e-9, abs=1e-6)
+
+    assert Moments.of(points).remove(Moments.of(points)).n == 0
+    merged = Moments.of(kept).merge(Moments.of(removed))
+    assert merged.c_xy == pytest.approx(Moments.of(points).c_xy, rel=1e-9)
+    assert merged.pearson() == pytest.approx(np.corrcoef(np.array(points).T)[0, 1], rel=1e-9)
+
+
+def test_correlation_accumulators_match_rebuild(db, tmp_path):
+    run_pipeline(db, tmp_path, lambda: assert_rollup_matches_rebuild(
+        db, "correlation", CorrelationHistogram, CorrelationMoments))
+
+
+def test_rating_zero_is_not_missing(db, tmp_path):
+    texts = [OTHER_REVIEW] + SHORT_REVIEWS
+    reviews = [(i % 3, rating, texts[i % 3], "2016-03-15")
+               for i, rating in enumerate([0, 0, 0, None, None, 4, 5, 2])]
+    import_csv(write_csv(tmp_path / "r.csv", reviews), score=True, dedup="off")
+    assert db.query(Feedback).filter(Feedback.rating == 0).count() == 3
+
+    summary = correlation.summarize(db)
+    by_rating = {row["rating"]: row["reviews"] for row in summary["by_rating"]}
+    assert by_rating == {"none": 2, "0": 3, "2": 1, "4": 1, "5": 1}
+
+    # histogram and moments see the same rated rows
+    rated = [(r.text_length, r.rating) for r in db.query(Feedback).filter(Feedback.rating.isnot(None))]
+    length_rating = summary["pairs"]["length_rating"]
+    assert length_rating["n"] == len(rated) == 6
+    assert length_rating["mean_y"] == pytest.approx(sum(y for _, y in rated) / len(rated))
+    hist_rated = {int(k): n for k, n in by_rating.items() if k != "none"}
+    assert sum(hist_rated.values()) == length_rating["n"]
+    assert sum(k * n for k, n in hist_rated.items()) / sum(hist_rated.values()) == pytest.approx(
+        length_rating["mean_y"])
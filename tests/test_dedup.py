@@ -0,0 +1,53 @@
+import pytest
+
+from app import dedup
+from app.models import Feedback
+
+from .helpers import LONG_REVIEW, OTHER_REVIEW, edit_one_word, import_csv, write_csv
+
+
+def test_signature_similarity_at_threshold():
+    original = dedup.signature(LONG_REVIEW)
+    assert dedup.similarity(original, dedup.signature(edit_one_word(LONG_REVIEW))) >= dedup.THRESHOLD
+    assert dedup.similarity(original, dedup.signature(OTHER_REVIEW)) < dedup.THRESHOLD
+    assert dedup.signature("Great hotel!") is None   # too short to compare
+
+
+@pytest.mark.parametrize("policy, stored", [("link", 3), ("skip", 2), ("off", 3)])
+def test_dedup_policies(db, tmp_path, policy, stored):
+    path = write_csv(tmp_path / "reviews.csv", [
+        (1, 5, LONG_REVIEW, "2016-05-01"),
+        (2, 4, edit_one_word(LONG_REVIEW), "2016-06-01"),
+        (3, 1, OTHER_REVIEW, "2016-07-01"),
+    ])
+    import_csv(path, score=True, dedup=policy)
+
+    rows = db.query(Feedback).order_by(Feedback.id).all()
+    assert len(rows) == stored
+    assert all(r.sentiment_label is not None for r in rows)
+    if policy == "link":
+        assert rows[1].duplicate_of == rows[0].id
+        assert rows[1].sentiment_label == rows[0].sentiment_label
+        assert rows[2].duplicate_of is None
+    else:
+        assert all(r.duplicate_of is None for r in rows)
+
+
+def test_link_ignores_unscored_originals(db, tmp_path):
+    import_csv(write_csv(tmp_path / "first.csv", [(1, 5, LONG_REVIEW, "2016-05-01")]), dedup="link")
+    import_csv(write_csv(tmp_path / "second.csv", [(2, 4, edit_one_word(LONG_REVIEW), "2016-06-01")]),
+               score=True, dedup="link")
+
+    second = db.query(Feedback).order_by(Feedback.id.desc()).first()
+    assert second.duplicate_of is None      # nothing to copy a label from
+    assert second.sentiment_label is not None
+
+
+def test_unindexed_rows_never_match(db, tmp_path):
+    import_csv(write_csv(tmp_path / "first.csv", [(1, 5, LONG_REVIEW, "2016-05-01")]), dedup="link")
+    original = db.query(Feedback.id).scalar()
+    dedup.unindex(db, [original])
+    db.commit()
+
+    _, matches = dedup.Deduplicator(db).match([edit_one_word(LONG_REVIEW)])
+    assert matches == [None]
@@ -0,0 +1,67 @@
+import math
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import geo
+from app.main import app
+from app.models import Product
+
+
+def _random_point_within(rng, lat, lon, radius_km):
+    # bearing + distance, uniform over the disc
+    d = radius_km * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    p_lat = lat + d * math.cos(bearing) / geo.KM_PER_DEG_LAT
+    p_lon = lon + d * math.sin(bearing) / (geo.KM_PER_DEG_LAT * math.cos(math.radians(lat)))
+    return p_lat, (p_lon + 180) % 360 - 180
+
+
+def test_encode_decode_round_trip():
+    gh = geo.encode(39.7392, -104.9903)
+    assert len(gh) == geo.PRECISION and gh.startswith("9xj")
+    lat, lon = geo.decode(gh)
+    assert lat == pytest.approx(39.7392, abs=1e-4) and lon == pytest.approx(-104.9903, abs=1e-4)
+    assert geo.encode(None, 10.0) is None
+
+
+@pytest.mark.parametrize("lat, lon, radius_km", [
+    (39.7392, -104.9903, 5.0),    # Denver
+    (-33.8688, 151.2093, 25.0),   # Sydney
+    (64.1466, -21.9426, 50.0),    # Reykjavik, narrow cells in longitude
+    (0.0, 179.99, 10.0),          # across the antimeridian
+])
+def test_covering_prefixes_contain_every_point_in_radius(lat, lon, radius_km):
+    prefixes = geo.covering_prefixes(lat, lon, radius_km)
+    assert 0 < len(prefixes) <= geo.MAX_COVER_CELLS
+
+    rng = random.Random(11)
+    for _ in range(500):
+        p_lat, p_lon = _random_point_within(rng, lat, lon, radius_km)
+        if geo.haversine_km(lat, lon, p_lat, p_lon) > radius_km:
+            continue
+        gh = geo.encode(p_lat, p_lon)
+        assert any(gh.startswith(p) for p in prefixes), (p_lat, p_lon)
+
+
+def test_nearby_matches_brute_force(db):
+    rng = random.Random(5)
+    center = (39.7392, -104.9903)
+    points = [_random_point_within(rng, *center, 40.0) for _ in range(200)]
+    db.add_all([
+        Product(name=f"P{i}", address=f"{i} Main St", city="Denver", country="US",
+                latitude=lat, longitude=lon, geohash=geo.encode(lat, lon))
+        for i, (lat, lon) in enumerate(points)
+    ])
+    db.commit()
+
+    expected = sorted(
+        (geo.haversine_km(*center, lat, lon), i + 1) for i, (lat, lon) in enumerate(points)
+    )
+    expected = [pid for d, pid in expected if d <= 12.5]
+    with TestClient(app) as client:
+        got = client.get("/products/nearby", params={"lat": center[0], "lon": center[1],
+                                                     "radius_km": 12.5, "limit": 200}).json()
+    assert [p["product_id"] for p in got] == expected
+    assert all(p["reviews_count"] == 0 for p in got)
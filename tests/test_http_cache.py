@@ -0,0 +1,98 @@
+import gzip
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import http_cache, partitioning, rollups
+from app.main import app
+from app.models import Product
+
+from .helpers import import_csv, random_reviews, write_csv
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "CHECK_SECONDS", 0.0)   # re-read the version on every request
+    import_csv(write_csv(tmp_path / "r.csv", random_reviews(random.Random(9), n=30)), score=True)
+    with TestClient(app) as c:
+        yield c
+
+
+def _get(client, url):
+    r = client.get(url)
+    assert r.status_code == 200
+    return r.headers["x-cache"], r.json()
+
+
+def test_hit_until_an_event_is_written(client, db, tmp_path):
+    assert _get(client, "/sentiment/overview")[0] == "miss"
+    cached = _get(client, "/sentiment/overview")
+    assert cached[0] == "hit"
+    assert client.get("/sentiment/overview?x=1").headers["x-cache"] == "miss"   # query string is part of the key
+
+    import_csv(write_csv(tmp_path / "more.csv", random_reviews(random.Random(1), n=5)), score=True)
+    state, body = _get(client, "/sentiment/overview")
+    assert state == "miss" and body["total"] == cached[1]["total"] + 5
+
+
+def test_rebuild_archive_and_restore_invalidate(client, db, tmp_path):
+    def fresh_after(change):
+        _get(client, "/sentiment/overview")
+        assert _get(client, "/sentiment/overview")[0] == "hit"
+        change()
+        return _get(client, "/sentiment/overview")
+
+    assert fresh_after(lambda: rollups.rebuild(db, ["sentiment_monthly"]))[0] == "miss"
+    total = _get(client, "/sentiment/overview")[1]["total"]
+
+    state, body = fresh_after(lambda: partitioning.archive_year(db, 2015, out_dir=tmp_path))
+    assert state == "miss" and body["total"] < total
+    state, body = fresh_after(lambda: partitioning.restore_year(db, 2015))
+    assert state == "miss" and body["total"] == total
+
+
+def test_aspect_only_changes_invalidate(client, db):
+    pid = db.query(Product.id).first()[0]
+    url = f"/sentiment/product/{pid}/aspects"
+    _get(client, url)
+    before = _get(client, url)
+    assert before[0] == "hit"
+
+    delta = rollups.RollupDelta()
+    delta.reaspect(pid, {}, {"price": "negative"})
+    delta.apply(db)
+    db.commit()
+    state, body = _get(client, url)
+    price = [a["mentions"] for a in body if a["aspect"] == "price"]
+    assert state == "miss" and price == [a["mentions"] + 1 for a in before[1] if a["aspect"] == "price"]
+
+
+def test_compression_and_streamed_passthrough(db):
+    tiny = FastAPI()
+    tiny.add_middleware(http_cache.ResponseMiddleware, cache=http_cache.ResponseCache())
+    big = {"rows": ["sentiment"] * 500}
+
+    @tiny.get("/sentiment/big")
+    def big_json():
+        return JSONResponse(big)
+
+    @tiny.get("/sentiment/stream")
+    def stream():
+        return StreamingResponse(iter([b'{"a":', b"1}"]), media_type="application/json")
+
+    with TestClient(tiny) as c:
+        r = c.get("/sentiment/big", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip" and r.json() == big
+        raw = c.get("/sentiment/big", headers={"Accept-Encoding": "gzip"})
+        assert raw.headers["x-cache"] == "hit" and raw.headers["vary"] == "Accept-Encoding"
+        assert c.get("/sentiment/big", headers={"Accept-Encoding": "identity"}).headers.get(
+            "content-encoding") is None
+
+        for _ in range(2):
+            s = c.get("/sentiment/stream", headers={"Accept-Encoding": "gzip"})
+            assert s.json() == {"a": 1}
+            assert "content-encoding" not in s.headers and "x-cache" not in s.headers
+    assert gzip.decompress(http_cache.compress(b"x" * 2000, "gzip")) == b"x" * 2000
@@ -0,0 +1,93 @@
+import random
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app import jobs
+from app.main import app
+from app.models import CategorySentiment, Feedback, Job, JobLock, SentimentMonthly
+
+from .helpers import assert_rollup_matches_rebuild, import_csv, random_reviews, write_csv
+
+
+def _status(db, job_id):
+    db.expire_all()
+    return db.query(Job.status).filter(Job.id == job_id).scalar()
+
+
+def test_claim_runs_jobs_in_order_one_per_lock(db):
+    first = jobs.submit(db, "import", {"chunk_size": 10})
+    second = jobs.submit(db, "score", {"batch_size": 10})
+
+    claimed = jobs.claim(db, "w1")
+    assert (claimed.id, claimed.status, claimed.worker) == (first.id, "running", "w1")
+    assert jobs.claim(db, "w2") is None          # both share the "feedback" lock
+    assert db.query(JobLock.job_id).scalar() == first.id
+
+    jobs._finish(first.id, None, "succeeded", None)
+    assert jobs.claim(db, "w2").id == second.id
+    assert _status(db, first.id) == "succeeded"
+
+
+def test_stale_job_is_reaped_and_its_lock_released(db):
+    stuck = jobs.submit(db, "import", {})
+    waiting = jobs.submit(db, "score", {})
+    jobs.claim(db, "dead-worker")
+    old = datetime.utcnow() - timedelta(seconds=jobs.STALE_SECONDS + 5)
+    db.execute(update(Job).where(Job.id == stuck.id).values(heartbeat_at=old))
+    db.commit()
+
+    assert jobs.claim(db, "w2").id == waiting.id
+    db.expire_all()
+    job = db.query(Job).get(stuck.id)
+    assert job.status == "failed" and "dead-worker" in job.error
+    assert [k for (k,) in db.query(JobLock.job_id)] == [waiting.id]
+
+
+def test_cancel_queued_job(db):
+    job = jobs.submit(db, "score", {})
+    assert jobs.cancel(db, job.id).status == "cancelled"
+    assert jobs.claim(db, "w1") is None
+    assert jobs.cancel(db, 12345) is None
+
+
+def test_cancel_running_job_keeps_committed_batches(db, tmp_path, store_dir, monkeypatch):
+    monkeypatch.setattr(jobs, "HEARTBEAT_SECONDS", 0.005)
+    import_csv(write_csv(tmp_path / "r.csv", random_reviews(random.Random(4), n=80)), dedup="off")
+    job = jobs.submit(db, "score", {"batch_size": 1})
+    claimed = jobs.claim(db, "w1")
+    db.execute(update(Job).where(Job.id == job.id).values(cancel_requested=True))
+    db.commit()
+
+    assert jobs.run(claimed) == "cancelled"
+    assert db.query(JobLock).count() == 0
+    scored = db.query(Feedback).filter(Feedback.sentiment_label.isnot(None)).count()
+    assert scored < 80
+    # the batches that did commit brought their rollups along
+    assert_rollup_matches_rebuild(db, "sentiment_monthly", SentimentMonthly)
+    assert_rollup_matches_rebuild(db, "category_sentiment", CategorySentiment)
+
+
+def test_worker_runs_a_queued_import(db, tmp_path, store_dir, monkeypatch):
+    monkeypatch.setattr(jobs, "DATA_DIR", tmp_path)
+    path = write_csv(tmp_path / "r.csv", random_reviews(random.Random(5), n=12))
+    with TestClient(app) as client:
+        r = client.post("/jobs/import", json={"source": str(path), "score": True, "chunk_size": 5})
+        assert r.status_code == 202
+        job_id = r.json()["id"]
+
+        jobs.worker_loop(once=True, poll_seconds=0)
+        done = client.get(f"/jobs/{job_id}").json()
+    assert done["status"] == "succeeded" and done["progress_done"] == 12
+    assert db.query(Feedback).filter(Feedback.sentiment_label.isnot(None)).count() == 12
+
+
+def test_job_parameters_are_validated(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "DATA_DIR", tmp_path)
+    with TestClient(app) as client:
+        for body in ({"source": "/etc/passwd"}, {"source": str(tmp_path / ".." / "x.csv")},
+                     {"chunk_size": 0}, {"workers": jobs.MAX_WORKERS + 1}):
+            assert client.post("/jobs/import", json=body).status_code == 422, body
+        assert client.post("/jobs/score", json={"max_rate": 0}).status_code == 422
+    assert db.query(Job).count() == 0
@@ -0,0 +1,56 @@
+import random
+
+from fastapi.testclient import TestClient
+from app import live, partitioning
+from app.main import app
+from app.models import Feedback
+from app.routes_feedback_sentiment import overview_totals
+
+from .helpers import import_csv, random_reviews, write_csv
+
+
+def test_totals_from_rollups_match_feedback(db, tmp_path):
+    reviews = random_reviews(random.Random(6), n=25)
+    # rows without a review date have no month in the rollup
+    reviews[3:5] = [(p, rating, text, "") for p, rating, text, _ in reviews[3:5]]
+    import_csv(write_csv(tmp_path / "r.csv", reviews), score=True, dedup="off")
+    assert db.query(Feedback).filter(Feedback.review_date.is_(None)).count() == 2
+
+    totals, cursor = live._load_totals()
+    assert totals == overview_totals(db)
+    assert totals["total"] == 25 and cursor > 0
+
+
+def test_clients_get_snapshot_then_coalesced_deltas(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(live, "BROADCAST_SECONDS", 0.05)
+    rng = random.Random(7)
+    import_csv(write_csv(tmp_path / "a.csv", random_reviews(rng, n=10)), score=True, dedup="off")
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/sentiment") as first, client.websocket_connect("/ws/sentiment") as second:
+            snapshots = [first.receive_json(), second.receive_json()]
+            assert [m["type"] for m in snapshots] == ["snapshot", "snapshot"]
+            assert snapshots[0]["totals"] == overview_totals(db)
+
+            import_csv(write_csv(tmp_path / "b.csv", random_reviews(rng, n=12)), score=True, dedup="off")
+            want = overview_totals(db)
+            for ws in (first, second):
+                message = ws.receive_json()
+                while message["totals"] != want:   # the import may span several ticks
+                    message = ws.receive_json()
+                assert message["type"] == "delta" and message["cursor"] > snapshots[0]["cursor"]
+                assert sum(v[3] for v in message["products"].values()) <= 12
+
+
+def test_archiving_a_year_resyncs_the_hub(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(live, "BROADCAST_SECONDS", 0.05)
+    import_csv(write_csv(tmp_path / "a.csv", random_reviews(random.Random(2), n=20)), score=True, dedup="off")
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/sentiment") as ws:
+            before = ws.receive_json()["totals"]
+            partitioning.archive_year(db, 2016, out_dir=tmp_path)
+            message = ws.receive_json()
+            assert message["type"] == "delta" and message["truncated"]
+            assert message["totals"] == live._load_totals()[0]
+            assert message["totals"]["total"] < before["total"]
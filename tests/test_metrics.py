@@ -0,0 +1,35 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app import database, metrics
+from app.main import app
+
+
+def test_hooks_only_on_the_api_engine(db):
+    # batch jobs / CLI: engine without the hooks
+    assert not event.contains(database.get_engine(), "before_cursor_execute", metrics._before_cursor_execute)
+    with TestClient(app):
+        assert event.contains(database.get_engine(), "before_cursor_execute", metrics._before_cursor_execute)
+
+
+def test_request_db_counters_and_failed_statements(db):
+    with TestClient(app) as client:
+        engine = database.get_engine()
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                conn.rollback()
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+
+        r = client.get("/sentiment/overview")
+        assert r.status_code == 200
+        timing = r.headers["server-timing"]
+        queries = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+        assert queries >= 1   # the overview (plus the response cache's version check)
+
+        body = client.get("/metrics").text
+        assert 'http_request_db_queries_count{method="GET",route="/sentiment/overview"}' in body
@@ -0,0 +1,39 @@
+import random
+
+from sqlalchemy import update
+
+from app import sentiment_analyzer, textstore
+from app.models import Feedback, FeedbackText
+
+from .helpers import NEGATIVE_REVIEW, import_csv, random_reviews, write_csv
+
+
+def test_scorer_version_fits_column():
+    assert len(sentiment_analyzer.SCORER_VERSION) <= Feedback.scored_with_version.type.length
+
+
+def _versions(db):
+    db.expire_all()
+    return {v for (v,) in db.query(Feedback.scored_with_version)}
+
+
+def test_rescore_only_touches_stale_rows(db, tmp_path, capsys):
+    import_csv(write_csv(tmp_path / "reviews.csv", random_reviews(random.Random(5), n=20)), score=True, dedup="off")
+    assert _versions(db) == {sentiment_analyzer.SCORER_VERSION}
+
+    sentiment_analyzer.rescore(batch_size=6)
+    assert "Rescored 0 feedback rows (scanned 0)" in capsys.readouterr().out
+
+    # edited text + reset version (what app code does) and an outdated version
+    positive = [fid for (fid,) in db.query(Feedback.id).filter(Feedback.sentiment_label == "positive").limit(3)]
+    codec, body = textstore.encode(NEGATIVE_REVIEW)
+    db.execute(update(FeedbackText).where(FeedbackText.feedback_id.in_(positive)).values(codec=codec, body=body))
+    db.execute(update(Feedback).where(Feedback.id.in_(positive)).values(scored_with_version=None))
+    db.execute(update(Feedback).where(Feedback.id.notin_(positive)).values(scored_with_version="textblob-0"))
+    db.commit()
+
+    sentiment_analyzer.rescore(batch_size=6)
+    assert "Rescored 20 feedback rows (scanned 20)" in capsys.readouterr().out
+    assert _versions(db) == {sentiment_analyzer.SCORER_VERSION}
+    labels = {label for (label,) in db.query(Feedback.sentiment_label).filter(Feedback.id.in_(positive))}
+    assert labels == {"negative"}
@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import upsert
+from app.main import app
+from app.models import Category, CategorySentiment, Product
+
+from .helpers import LONG_REVIEW, assert_rollup_matches_rebuild, import_csv, run_pipeline, write_csv
+
+
+def test_category_sentiment_matches_rebuild(db, tmp_path):
+    run_pipeline(db, tmp_path, lambda: assert_rollup_matches_rebuild(db, "category_sentiment", CategorySentiment))
+
+
+def test_upserts_tolerate_existing_keys(db):
+    db.add(Category(id=1, name="Hotels"))
+    db.flush()
+    table = CategorySentiment.__table__
+    db.execute(upsert.insert_ignore(db, table, ["category_id"]), [{"category_id": 1, "positive": 3}])
+    db.execute(upsert.insert_ignore(db, table, ["category_id"]), [{"category_id": 1, "positive": 5}])
+    assert db.scalar(select(CategorySentiment.positive)) == 3
+
+    add = upsert.insert_or_add(db, table, ["category_id"], ["positive", "total"])
+    db.execute(add, [{"category_id": 1, "positive": 2, "total": 4}])
+    row = db.query(CategorySentiment).one()
+    db.refresh(row)
+    assert (row.positive, row.total) == (5, 4)
+
+
+def test_product_search_matches_category_names(db, tmp_path):
+    # odd product numbers get "Hotels,Lodging", even ones "Hotels"
+    import_csv(write_csv(tmp_path / "r.csv", [(n, 4, LONG_REVIEW, "2016-05-01") for n in range(4)]),
+               dedup="off")
+    lodging = {pid for (pid,) in db.query(Product.id).filter(Product.name.in_(["Test Hotel 1", "Test Hotel 3"]))}
+
+    with TestClient(app) as client:
+        by_q = {p["id"] for p in client.get("/products/", params={"q": "lodg"}).json()}
+        by_category = {p["id"] for p in client.get("/products/", params={"category": "Lodging"}).json()}
+        everything = client.get("/products/", params={"q": "hotel"}).json()
+    assert by_q == by_category == lodging
+    assert len(everything) == db.query(func.count(Product.id)).scalar() == 4
@@ -0,0 +1,48 @@
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import shared_store, store_loader
+from app.main import app
+from app.models import Product
+
+from .helpers import import_csv, random_reviews, write_csv
+
+
+def test_publish_attach_and_generations(store_dir):
+    names, offsets = shared_store.encode_strings(["Denver", None, "Zürich"])
+    shared_store.publish("demo", {"id": np.array([3, 7, 9]), "name_blob": names, "name_offsets": offsets},
+                         {"rows": 3})
+    snap = shared_store.attach("demo")
+    assert snap.meta["rows"] == 3
+    assert [snap.string("name", i) for i in range(3)] == ["Denver", None, "Zürich"]
+    assert snap.lookup("id", 7) == 1 and snap.lookup("id", 8) is None
+    first = shared_store.generations()["demo"]
+
+    for n in range(3):
+        shared_store.publish("demo", {"id": np.array([n])})
+    assert shared_store.generations()["demo"] != first
+    assert len(list((store_dir / "demo").glob("gen-*"))) == shared_store.KEEP_GENERATIONS
+    assert list(shared_store.current("demo")["id"]) == [2]
+
+
+def test_snapshot_answers_match_sql(db, tmp_path, store_dir, monkeypatch):
+    import_csv(write_csv(tmp_path / "reviews.csv", random_reviews(random.Random(4), n=30)), score=True)
+    ids = [pid for (pid,) in db.query(Product.id).order_by(Product.id)]
+
+    with TestClient(app) as client:
+        from_sql = [client.get(f"/sentiment/product/{pid}").json() for pid in ids]
+        overview_sql = client.get("/sentiment/overview").json()
+
+        store_loader.refresh(names=["products", "product_sentiment"], store_dir=store_dir)
+        monkeypatch.setenv("USE_SHARED_STORE", "1")
+        # a different query string, so the response cache cannot answer
+        responses = [client.get(f"/sentiment/product/{pid}?via=store") for pid in ids]
+        assert {r.headers["x-cache"] for r in responses} == {"miss"}
+        from_store = [r.json() for r in responses]
+        overview_store = client.get("/sentiment/overview?via=store").json()
+
+    assert shared_store.attach("product_sentiment") is not None
+    assert from_store == from_sql
+    assert overview_store == overview_sql
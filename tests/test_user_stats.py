@@ -0,0 +1,34 @@
+import random
+
+from fastapi.testclient import TestClient
+from sqlalchemy import case, func
+
+from app.main import app
+from app.models import Feedback, UserReviewStats
+
+from .helpers import assert_rollup_matches_rebuild, import_csv, random_reviews, run_pipeline, write_csv
+
+
+def test_user_review_stats_match_rebuild(db, tmp_path):
+    run_pipeline(db, tmp_path, lambda: assert_rollup_matches_rebuild(db, "user_review_stats", UserReviewStats))
+
+
+def test_stats_and_top_endpoints(db, tmp_path):
+    import_csv(write_csv(tmp_path / "r.csv", random_reviews(random.Random(9), n=30)), score=True, dedup="off")
+    expected = {
+        uid: (total, negative)
+        for uid, total, negative in db.query(
+            Feedback.user_id, func.count(Feedback.id),
+            func.sum(case((Feedback.sentiment_label == "negative", 1), else_=0)),
+        ).group_by(Feedback.user_id)
+    }
+
+    with TestClient(app) as client:
+        for uid, (total, negative) in expected.items():
+            stats = client.get(f"/users/{uid}/stats").json()
+            assert (stats["reviews_count"], stats["negative"]) == (total, negative)
+        top = client.get("/users/top", params={"sort": "reviews_count"}).json()
+        assert client.get("/users/999999/stats").status_code == 404
+
+    counts = [u["reviews_count"] for u in top]
+    assert counts == sorted(expected_total for expected_total, _ in expected.values())[::-1]